@@ -53,7 +53,6 @@ requires+=('python3-setuptools')
 
 recommends=()
 recommends+=('gtksourceview4')
-recommends+=('python3-igraph')
 #recommends+=('python3-gnomevfs')
 
 recommends+=('lxqt-openssh-askpass')
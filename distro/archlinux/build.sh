@@ -52,7 +52,6 @@ depends+=('python-six')
 
 optdepends=()
 optdepends+=('libappindicator-gtk3')
-optdepends+=('python-igraph' 'igraph' 'icu')
 #optdepends+=('python-gnomevfs')
 optdepends+=('lxqt-openssh-askpass')
 optdepends+=('python-pygit2')
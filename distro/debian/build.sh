@@ -62,7 +62,6 @@ depends+=('python3-six')
 
 recommends=()
 recommends+=('gir1.2-gtksource-4')
-recommends+=('python3-igraph')
 recommends+=('python3-gnomevfs')
 recommends+=('ssh-askpass-gnome')
 recommends+=('python3-pygit2')
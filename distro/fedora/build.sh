@@ -54,7 +54,6 @@ requires+=('python3-six')
 
 recommends=()
 recommends+=('gtksourceview4')
-recommends+=('python3-igraph') # since Fedora 27
 #recommends+=('python3-gnomevfs')
 
 recommends+=('lxqt-openssh-askpass')
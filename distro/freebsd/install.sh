@@ -46,13 +46,8 @@ pkg install "$PYV-dateutil" || \
 	python3 -m pip install dateutil || \
 	python3 -m pip install git+https://github.com/dateutil/dateutil
 
-pkg install "$PYV-igraph" || \
-	python3 -m pip install igraph || \
-	echo "Failed to install igraph"
-
 #pkg: No packages available to install matching 'packaging' have been found in the repositories
 #pkg: No packages available to install matching 'py311-dateutil' have been found in the repositories
-#pkg: No packages available to install matching 'py311-python-igraph' have been found in the repositories
 
 
 # /usr/sbin/ntpdate exists by default, but couldn't figure out which package
@@ -66,7 +61,6 @@ pkg install "$PYV-igraph" || \
 # cachetools		https://freebsd.pkgs.org/12/freebsd-aarch64/py38-cachetools-4.2.2.txz.html
 # requests			https://www.freshports.org/www/py-requests
 # ujson				https://www.freshports.org/devel/py-ujson/
-# python-igraph		https://www.freshports.org/math/py-python-igraph/
 # pygit2			https://www.freshports.org/devel/py-pygit2
 
 
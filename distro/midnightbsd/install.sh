@@ -31,7 +31,6 @@ mport install \
 	"$PYV-cachetools" \
 	"$PYV-requests" \
 	"$PYV-ujson" \
-	"$PYV-python-igraph" \
 	"$PYV-pygit2"
 
 
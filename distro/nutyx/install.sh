@@ -30,7 +30,6 @@ $PIP install httplib2
 $PIP install python-dateutil
 $PIP install cachetools
 
-$PIP install python-igraph
 $PIP install pygit2
 
 
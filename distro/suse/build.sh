@@ -65,7 +65,6 @@ requires+=('python3-six')
 
 recommends=()
 recommends+=('typelib(AppIndicator3)')
-#recommends+=('python3-igraph')
 recommends+=('openssh-askpass-gnome')
 recommends+=('python3-pygit2')
 
@@ -40,6 +40,10 @@ class TimeZone(datetime.tzinfo):
 	def tzname(self, dt):
 		return self._tz.tzname(dt)
 
+	def fromutc(self, dt):
+		# default tzinfo.fromutc only works for fixed std/dst offsets
+		return self._tz.fromutc(dt.replace(tzinfo=self._tz)).replace(tzinfo=self)
+
 
 def readEtcLocaltime():
 	# TODO: maybe use tzlocal -> unix.py -> _get_localzone_name:
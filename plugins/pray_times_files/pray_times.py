@@ -26,6 +26,7 @@ import gettext
 import time
 from time import localtime
 from time import time as now
+from time import perf_counter
 
 from os.path import join, isfile, isdir, dirname
 
@@ -46,6 +47,8 @@ from scal3 import plugin_api as api
 
 from scal3.path import *
 from pray_times_backend import PrayTimes
+from pray_times_locations import loadCityIndex
+from pray_times_locations import guessLocation as guessLocationByTz
 
 # DO NOT IMPORT core IN PLUGINS
 from scal3.json_utils import *
@@ -87,67 +90,20 @@ def getCurrentJd() -> int:
 
 
 def readLocationData():
-	locationsDir = join(sourceDir, "data", "locations")
-	placeTransDict = {}
+	"""
+		returns CityIndex of world cities, compiled and cached on first use
+		cityIndex[i] is (name, lname, lat, lng)
+	"""
+	return loadCityIndex(
+		join(sourceDir, "data", "locations"),
+		join(cacheDir, "plugins"),
+		langSh,
+		_,
+	)
 
-	def readTransFile(transPath):
-		if not isfile(transPath):
-			return
-		log.info(f"------------- reading {transPath}")
-		with open(transPath, encoding="utf8") as fp:
-			placeTransDict.update(json.load(fp))
-		log.info(f"------------- {len(placeTransDict)=}")
-
-
-	readTransFile(join(locationsDir, f"{langSh}.json"))
-
-	for dirName in os.listdir(locationsDir):
-		dirPath = join(locationsDir, dirName)
-		if not isdir(dirPath):
-			continue
-		readTransFile(join(dirPath, f"{langSh}.json"))
-
-	def translatePlaceName(name: str) -> str:
-		nameTrans = placeTransDict.get(name)
-		if nameTrans:
-			return nameTrans
-		return _(name)
-
-	fpath = join(locationsDir, "world.txt.bz2")
-	log.info(f"------------- reading {fpath}")
-	import bz2
-	with bz2.open(fpath, mode="rt", encoding="utf8") as fp:
-		lines = fp.read().split("\n")
-	cityData = []
-	country = ""
-	for l in lines:
-		p = l.split("\t")
-		if len(p) < 2:
-			# log.debug(p)
-			continue
-		if p[0] == "":
-			if p[1] == "":
-				city, lat, lng = p[2:5]
-				log.debug(f"{city=}")
-				if len(p) > 4:
-					cityData.append((
-						country + "/" + city,
-						translatePlaceName(country) + "/" + translatePlaceName(city),
-						float(lat),
-						float(lng)
-					))
-				else:
-					log.debug(f"{country=}, {p=}")
-			else:
-				country = p[1]
-	return cityData
-
-
-def guessLocation(cityData):
-	tzname = str(localTz)
-	# TODO
-	# for countryCity, countryCityLocale, lat, lng in cityData:
-	return "Tehran", 35.705, 51.4216
+
+def guessLocation(getCityData):
+	return guessLocationByTz(str(localTz), getCityData)
 
 
 """
@@ -172,6 +128,10 @@ class PrayTimeEventRule(EventRule):
 
 class TextPlugin(BaseJsonPlugin, TextPluginUI):
 	name = "pray_times"
+	# has no holidays, BasePlugin.isHolidayJd is used
+	hasHolidays = True
+	# config UI and location database are loaded on first use
+	startupNeeds = ("text",)
 	# all options (except for "enable" and "show_date") will be
 	# saved in file confPath
 	confPath = join(confDir, "pray_times.json")
@@ -208,6 +168,8 @@ class TextPlugin(BaseJsonPlugin, TextPluginUI):
 		)
 		self.lastDayMerge = False
 		self._cityData = None
+		self.confDialog = None
+		self.dialog = None  # main window, see set_dialog
 		##############
 		confNeedsSave = False
 		######
@@ -262,7 +224,6 @@ class TextPlugin(BaseJsonPlugin, TextPluginUI):
 		if confNeedsSave:
 			self.saveConfig()
 		#######
-		self.makeWidget()  # FIXME
 		# self.onCurrentDateChange(localtime()[:3])
 		###
 		# self.doPlayPreAzan()
@@ -274,11 +235,25 @@ class TextPlugin(BaseJsonPlugin, TextPluginUI):
 	def getCityData(self):
 		if self._cityData is not None:
 			return self._cityData
+		t0 = perf_counter()
 		self._cityData = readLocationData()
+		log.info(
+			f"pray_times: {len(self._cityData)} locations loaded in " +
+			f"{(perf_counter() - t0) * 1000:.1f} ms"
+		)
 		return self._cityData
 
 	def guessLocation(self):
-		return guessLocation(self.getCityData())
+		return guessLocation(self.getCityData)
+
+	def loadNeed(self, need):
+		if need == "config":
+			if self.confDialog is None:
+				self.makeWidget()
+		elif need == "locations":
+			self.getCityData()
+		else:
+			BaseJsonPlugin.loadNeed(self, need)
 
 	def checkShowDisclaimer(self):
 		if not self.shouldShowDisclaimer():
@@ -84,7 +84,7 @@ def showDisclaimer(plug):
 class LocationDialog(gtk.Dialog):
 	def __init__(
 		self,
-		cityData,
+		cityData,  # CityIndex, see pray_times_locations.py
 		maxResults=200,
 		width=600,
 		height=600,
@@ -204,12 +204,10 @@ class LocationDialog(gtk.Dialog):
 		lng = self.spin_lng.get_value()
 		md = earthR * 2 * math.pi
 		city = ""
-		for (name, lname, lat2, lng2) in self.cityData:
-			d = earthDistance(lat, lng, lat2, lng2)
-			assert d >= 0
-			if d < md:
-				md = d
-				city = lname
+		j, d = self.cityData.nearest(lat, lng)
+		if j is not None:
+			md = d
+			city = self.cityData[j][1]
 		self.lowerLabel.set_label(
 			_("{distanceKM} kilometers from {place}").format(
 				distanceKM=md,
@@ -257,7 +255,7 @@ class LocationDialog(gtk.Dialog):
 		)
 
 	def update_list(self, s=""):
-		s = s.lower()
+		s = s.strip()
 		t = self.trees
 		t.clear()
 		d = self.cityData
@@ -266,14 +264,9 @@ class LocationDialog(gtk.Dialog):
 			for i in range(n):
 				t.append((i, d[i][0]))
 		else:  # here check also translations
-			mr = self.maxResults
-			r = 0
-			for i in range(n):
-				if s in (d[i][0] + "\n" + d[i][1]).lower():
-					t.append((i, d[i][1]))
-					r += 1
-					if r >= mr:
-						break
+			# matches start of words of name and translated name
+			for i in d.search(s, self.maxResults):
+				t.append((i, d[i][1]))
 		self.treev.scroll_to_cell((0, 0))
 		self.okB.set_sensitive(self.checkbEdit.get_active())
 
@@ -483,7 +476,6 @@ class TextPluginUI:
 		self.menuitem.set_submenu(submenu)
 		self.menuitem.show_all()
 		"""
-		self.dialog = None
 
 	def updateAzanSensitiveWidgets(self, w=None):
 		for cb in (self.preAzanEnableCheck, self.azanEnableCheck):
@@ -553,6 +545,7 @@ class TextPluginUI:
 		self.dialog = dialog
 
 	def open_configure(self):
+		self.loadNeed("config")
 		self.confDialog.run()
 
 	def open_about(self):
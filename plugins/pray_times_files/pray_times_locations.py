@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/lgpl.txt>.
+# Also avalable in /usr/share/common-licenses/LGPL on Debian systems
+# or /usr/share/licenses/common/LGPL/license.txt on ArchLinux
+
+from scal3 import logger
+log = logger.get()
+
+import os
+import json
+import math
+import mmap
+import struct
+from hashlib import sha1
+from os.path import join, isfile, isdir
+
+from pray_times_utils import greatCircleDistance, earthR, cosd, sind
+
+# Compiled index of city database (world.txt.bz2), with translated names
+#
+# <cacheDir>/plugins/locations-<lang>.idx:
+# 	header
+# 	(lat, lng, textOffset, nameSize, lnameSize) of each city, in the
+# 	same order as world.txt, name and lname are in text blob
+# 	sorted (start, end, city index) of search tokens: each token is
+# 	the rest of lowercase name (or lname) from start of a word, and
+# 	start/end point to search blob, so a prefix search is a bisect
+# 	cell start of each grid cell (gridStep x gridStep degrees),
+# 	then city indexes sorted by grid cell
+# 	text blob (utf-8), then search blob (utf-8)
+#
+# header contains a hash of mtime and size of source files and language,
+# so index is re-compiled when they change
+
+indexVersion = 1
+indexMagic = b"SCLI"
+# magic, version, key hash, city count, token count, grid step (degrees),
+# text blob size, search blob size
+headerStruct = struct.Struct("<4sI20sIIIII")
+cityStruct = struct.Struct("<ddIII")  # lat, lng, textOffset, nameSize, lnameSize
+tokenStruct = struct.Struct("<III")  # start, end, city index
+uintStruct = struct.Struct("<I")
+gridStep = 5
+
+# used when the time zone is not found
+defaultLocation = ("Tehran", 35.705, 51.4216)
+
+zoneTabPaths = (
+	"/usr/share/zoneinfo/zone1970.tab",
+	"/usr/share/zoneinfo/zone.tab",
+)
+
+
+def getTransFiles(locationsDir, langSh):
+	paths = [join(locationsDir, f"{langSh}.json")]
+	for dirName in sorted(os.listdir(locationsDir)):
+		dirPath = join(locationsDir, dirName)
+		if isdir(dirPath):
+			paths.append(join(dirPath, f"{langSh}.json"))
+	return [path for path in paths if isfile(path)]
+
+
+def parseLocationData(locationsDir, langSh, translate):
+	"""
+		returns a list of (name, lname, lat, lng)
+		name is "Country/City", lname is its translation
+	"""
+	placeTransDict = {}
+	for transPath in getTransFiles(locationsDir, langSh):
+		log.info(f"------------- reading {transPath}")
+		with open(transPath, encoding="utf8") as fp:
+			placeTransDict.update(json.load(fp))
+	log.info(f"------------- {len(placeTransDict)=}")
+
+	def translatePlaceName(name: str) -> str:
+		nameTrans = placeTransDict.get(name)
+		if nameTrans:
+			return nameTrans
+		return translate(name)
+
+	fpath = join(locationsDir, "world.txt.bz2")
+	log.info(f"------------- reading {fpath}")
+	import bz2
+	with bz2.open(fpath, mode="rt", encoding="utf8") as fp:
+		lines = fp.read().split("\n")
+	cityData = []
+	country = ""
+	for l in lines:
+		p = l.split("\t")
+		if len(p) < 2:
+			continue
+		if p[0] == "":
+			if p[1] == "":
+				if len(p) > 4:
+					city, lat, lng = p[2:5]
+					cityData.append((
+						country + "/" + city,
+						translatePlaceName(country) + "/" + translatePlaceName(city),
+						float(lat),
+						float(lng)
+					))
+				else:
+					log.debug(f"{country=}, {p=}")
+			else:
+				country = p[1]
+	return cityData
+
+
+def iterWordStarts(text):
+	prev = ""
+	for pos, c in enumerate(text):
+		if c.isalnum() and not prev.isalnum():
+			yield pos
+		prev = c
+
+
+def getGridSize():
+	return 180 // gridStep, 360 // gridStep
+
+
+def getGridCell(lat, lng):
+	rows, cols = getGridSize()
+	i = min(max(int((lat + 90) // gridStep), 0), rows - 1)
+	j = int((lng + 180) // gridStep) % cols
+	return i, j
+
+
+def compileCityIndex(cityData, key=b""):
+	"""
+		cityData: list of (name, lname, lat, lng)
+		key: bytes (up to 20) stored in header
+	"""
+	cities = bytearray()
+	textBlob = bytearray()
+	searchBlob = bytearray()
+	tokens = []
+	for index, (name, lname, lat, lng) in enumerate(cityData):
+		nameBytes = name.encode("utf-8")
+		lnameBytes = lname.encode("utf-8")
+		cities += cityStruct.pack(
+			lat,
+			lng,
+			len(textBlob),
+			len(nameBytes),
+			len(lnameBytes),
+		)
+		textBlob += nameBytes + lnameBytes
+		texts = [name.lower()]
+		if lname.lower() != texts[0]:
+			texts.append(lname.lower())
+		for text in texts:
+			start = len(searchBlob)
+			textBytes = text.encode("utf-8")
+			searchBlob += textBytes
+			end = len(searchBlob)
+			for pos in iterWordStarts(text):
+				tokenStart = start + len(text[:pos].encode("utf-8"))
+				tokens.append((
+					bytes(searchBlob[tokenStart:end]),
+					tokenStart,
+					end,
+					index,
+				))
+	tokens.sort()
+	rows, cols = getGridSize()
+	cellCities = [[] for _ in range(rows * cols)]
+	for index, (name, lname, lat, lng) in enumerate(cityData):
+		i, j = getGridCell(lat, lng)
+		cellCities[i * cols + j].append(index)
+	cellStarts = bytearray()
+	gridCities = bytearray()
+	count = 0
+	for indexes in cellCities:
+		cellStarts += uintStruct.pack(count)
+		for index in indexes:
+			gridCities += uintStruct.pack(index)
+		count += len(indexes)
+	cellStarts += uintStruct.pack(count)
+	header = headerStruct.pack(
+		indexMagic,
+		indexVersion,
+		key,
+		len(cityData),
+		len(tokens),
+		gridStep,
+		len(textBlob),
+		len(searchBlob),
+	)
+	return b"".join([
+		header,
+		bytes(cities),
+		b"".join(
+			tokenStruct.pack(start, end, index)
+			for _, start, end, index in tokens
+		),
+		bytes(cellStarts),
+		bytes(gridCities),
+		bytes(textBlob),
+		bytes(searchBlob),
+	])
+
+
+class CityIndex:
+	"""
+		read-only view of compiled city index, `data` is bytes or mmap
+		index[i] is (name, lname, lat, lng), like items of parseLocationData
+	"""
+
+	def __init__(self, data):
+		if len(data) < headerStruct.size:
+			raise ValueError("city index is too short")
+		(
+			magic,
+			version,
+			key,
+			count,
+			tokenCount,
+			step,
+			textSize,
+			searchSize,
+		) = headerStruct.unpack_from(data, 0)
+		if magic != indexMagic:
+			raise ValueError("invalid city index")
+		if version != indexVersion:
+			raise ValueError(f"unsupported city index version {version}")
+		if step != gridStep:
+			raise ValueError(f"unsupported city index grid step {step}")
+		self.data = data
+		self.key = key
+		self.count = count
+		self.tokenCount = tokenCount
+		rows, cols = getGridSize()
+		self.cityOffset = headerStruct.size
+		self.tokenOffset = self.cityOffset + cityStruct.size * count
+		self.cellOffset = self.tokenOffset + tokenStruct.size * tokenCount
+		self.gridOffset = self.cellOffset + uintStruct.size * (rows * cols + 1)
+		self.textOffset = self.gridOffset + uintStruct.size * count
+		self.searchOffset = self.textOffset + textSize
+		if len(data) < self.searchOffset + searchSize:
+			raise ValueError("city index is truncated")
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, index):
+		if not 0 <= index < self.count:
+			raise IndexError(index)
+		lat, lng, offset, nameSize, lnameSize = cityStruct.unpack_from(
+			self.data,
+			self.cityOffset + cityStruct.size * index,
+		)
+		start = self.textOffset + offset
+		middle = start + nameSize
+		return (
+			self.data[start:middle].decode("utf-8"),
+			self.data[middle:middle + lnameSize].decode("utf-8"),
+			lat,
+			lng,
+		)
+
+	def getLatLng(self, index):
+		return cityStruct.unpack_from(
+			self.data,
+			self.cityOffset + cityStruct.size * index,
+		)[:2]
+
+	def getToken(self, tokenIndex):
+		"""
+			returns (token bytes, city index)
+		"""
+		start, end, index = tokenStruct.unpack_from(
+			self.data,
+			self.tokenOffset + tokenStruct.size * tokenIndex,
+		)
+		offset = self.searchOffset
+		return self.data[offset + start:offset + end], index
+
+	def search(self, text, maxResults=200):
+		"""
+			returns list of city indexes that a word of name or
+			translated name starts with text (case-insensitive)
+			sorted by the matched text
+		"""
+		prefix = text.strip().lower().encode("utf-8")
+		if not prefix:
+			return list(range(min(self.count, maxResults)))
+
+		result = []
+		found = set()
+		low = 0
+		high = self.tokenCount
+		while low < high:
+			mid = (low + high) // 2
+			if self.getToken(mid)[0] < prefix:
+				low = mid + 1
+			else:
+				high = mid
+		tokenIndex = low
+		while tokenIndex < self.tokenCount and len(result) < maxResults:
+			token, index = self.getToken(tokenIndex)
+			if not token.startswith(prefix):
+				break
+			if index not in found:
+				found.add(index)
+				result.append(index)
+			tokenIndex += 1
+		return result
+
+	def iterCellCities(self, i, j):
+		cols = getGridSize()[1]
+		start, end = struct.unpack_from(
+			"<II",
+			self.data,
+			self.cellOffset + uintStruct.size * (i * cols + j),
+		)
+		offset = self.gridOffset
+		for pos in range(start, end):
+			yield uintStruct.unpack_from(self.data, offset + uintStruct.size * pos)[0]
+
+	def nearest(self, lat, lng):
+		"""
+			returns (city index, distance in km) of the nearest city,
+			or (None, None) if there is no city
+			searches cells of grid in rings around (lat, lng), until
+			cities out of ring can not be nearer
+		"""
+		if self.count == 0:
+			return None, None
+		rows, cols = getGridSize()
+		i0, j0 = getGridCell(lat, lng)
+		best = None
+		bestDistance = None
+		visited = set()
+		for r in range(max(rows, cols // 2 + 1) + 1):
+			for i in range(max(i0 - r, 0), min(i0 + r, rows - 1) + 1):
+				for dj in range(-r, r + 1):
+					if max(abs(i - i0), abs(dj)) != r:
+						continue
+					cell = (i, (j0 + dj) % cols)
+					if cell in visited:
+						continue
+					visited.add(cell)
+					for index in self.iterCellCities(*cell):
+						distance = greatCircleDistance(
+							lat,
+							lng,
+							*self.getLatLng(index),
+						)
+						if (
+							best is None or
+							distance < bestDistance or
+							(distance == bestDistance and index < best)
+						):
+							best = index
+							bestDistance = distance
+			if best is not None and bestDistance < self.ringMinDistance(lat, i0, r):
+				break
+		return best, bestDistance
+
+	@staticmethod
+	def ringMinDistance(lat, i0, r):
+		"""
+			minimum distance (in km) from (lat, lng) to cities that are
+			not in the first r rings of cells around cell of (lat, lng)
+			they are at least r * gridStep degrees away in latitude, or
+			in longitude with latitude in rows i0-r to i0+r
+		"""
+		delta = r * gridStep
+		latMin = delta * math.pi / 180 * earthR
+		if delta >= 180:
+			return latMin
+		maxAbsLat = min(
+			max(
+				abs((i0 - r) * gridStep - 90),
+				abs((i0 + r + 1) * gridStep - 90),
+			),
+			90,
+		)
+		h = cosd(lat) * cosd(maxAbsLat) * sind(delta / 2) ** 2
+		lngMin = 2 * earthR * math.asin(min(1, math.sqrt(h)))
+		return min(latMin, lngMin)
+
+	def close(self):
+		if isinstance(self.data, mmap.mmap):
+			self.data.close()
+
+
+def getIndexKey(locationsDir, langSh):
+	parts = [str(indexVersion), langSh]
+	for path in [join(locationsDir, "world.txt.bz2")] + getTransFiles(
+		locationsDir,
+		langSh,
+	):
+		st = os.stat(path)
+		parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+	return sha1("\n".join(parts).encode("utf-8")).digest()
+
+
+def mapIndexFile(fpath):
+	try:
+		with open(fpath, "rb") as fp:
+			return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+	except FileNotFoundError:
+		return None
+	except (OSError, ValueError):
+		log.exception(f"error mapping city index {fpath}")
+		return None
+
+
+def loadCityIndex(locationsDir, cacheDir, langSh, translate):
+	"""
+		memory-maps the compiled city index, compiles it
+		(and writes it in cacheDir) if it's missing or outdated
+	"""
+	key = getIndexKey(locationsDir, langSh)
+	indexPath = join(cacheDir, f"locations-{langSh}.idx")
+	data = mapIndexFile(indexPath)
+	if data is not None:
+		try:
+			index = CityIndex(data)
+		except ValueError as e:
+			log.info(f"re-compiling city index {indexPath}: {e}")
+			data.close()
+		else:
+			if index.key == key:
+				return index
+			index.close()
+	compiled = compileCityIndex(
+		parseLocationData(locationsDir, langSh, translate),
+		key,
+	)
+	tmpPath = indexPath + ".tmp"
+	try:
+		os.makedirs(cacheDir, exist_ok=True)
+		with open(tmpPath, "wb") as fp:
+			fp.write(compiled)
+		os.replace(tmpPath, indexPath)
+	except Exception:
+		log.exception(f"error saving city index {indexPath}")
+		return CityIndex(compiled)
+	data = mapIndexFile(indexPath)
+	if data is None:
+		return CityIndex(compiled)
+	return CityIndex(data)
+
+
+def parseZoneTabCoord(coord):
+	"""
+		parses ISO 6709 coordinates of zone.tab, like "+3540+05126"
+		returns (lat, lng)
+	"""
+	for pos in range(1, len(coord)):
+		if coord[pos] in "+-":
+			break
+	else:
+		raise ValueError(f"bad coordinates {coord!r}")
+	values = []
+	for part in (coord[:pos], coord[pos:]):
+		sign = -1 if part[0] == "-" else 1
+		digits = part[1:]
+		degLen = len(digits) - 4 if len(digits) in (6, 7) else len(digits) - 2
+		value = int(digits[:degLen]) + int(digits[degLen:degLen + 2]) / 60
+		if len(digits) - degLen == 4:
+			value += int(digits[degLen + 2:]) / 3600
+		values.append(sign * value)
+	return tuple(values)
+
+
+def getZoneCoord(tzname):
+	"""
+		returns (lat, lng) of time zone from zone.tab, or None
+	"""
+	for path in zoneTabPaths:
+		if not isfile(path):
+			continue
+		with open(path, encoding="utf-8") as fp:
+			for line in fp:
+				if line.startswith("#"):
+					continue
+				parts = line.split("\t")
+				if len(parts) >= 3 and parts[2].strip() == tzname:
+					try:
+						return parseZoneTabCoord(parts[1])
+					except ValueError:
+						log.exception("")
+						return None
+	return None
+
+
+def guessLocation(tzname, getCityIndex):
+	"""
+		returns (locName, lat, lng) of nearest city to time zone location
+		or the city with the same name as time zone
+	"""
+	coord = getZoneCoord(tzname)
+	if coord is not None:
+		cityIndex = getCityIndex()
+		index, distance = cityIndex.nearest(*coord)
+		if index is not None:
+			return cityIndex[index][1:]
+	cityName = tzname.split("/")[-1].replace("_", " ")
+	if cityName:
+		cityIndex = getCityIndex()
+		for index in cityIndex.search(cityName):
+			name, lname, lat, lng = cityIndex[index]
+			if name.split("/")[-1].lower() == cityName.lower():
+				return lname, lat, lng
+	return defaultLocation
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import unittest
+
+import os
+import sys
+import bz2
+import random
+import tempfile
+from os.path import dirname, abspath, join
+
+rootDir = dirname(dirname(dirname(abspath(__file__))))
+sys.path.insert(0, rootDir)
+sys.path.insert(0, dirname(abspath(__file__)))
+
+import pray_times_locations
+from pray_times_locations import (
+	CityIndex,
+	compileCityIndex,
+	loadCityIndex,
+	parseLocationData,
+	parseZoneTabCoord,
+)
+from pray_times_utils import greatCircleDistance
+
+locationsDir = join(rootDir, "data", "locations")
+cityData = parseLocationData(locationsDir, "fa", lambda name: name)
+cityIndex = CityIndex(compileCityIndex(cityData))
+
+
+def nearestBruteForce(cityData, lat, lng):
+	return min(
+		(greatCircleDistance(lat, lng, cityLat, cityLng), index)
+		for index, (_, _, cityLat, cityLng) in enumerate(cityData)
+	)
+
+
+def getMatchedText(name, lname, prefix):
+	"""
+		returns the smallest rest of name or lname (lowercase)
+		that starts with prefix at start of a word, or None
+	"""
+	matched = None
+	for text in (name.lower(), lname.lower()):
+		pos = text.find(prefix)
+		while pos >= 0:
+			if text[pos].isalnum() and (pos == 0 or not text[pos - 1].isalnum()):
+				rest = text[pos:].encode("utf-8")
+				if matched is None or rest < matched:
+					matched = rest
+			pos = text.find(prefix, pos + 1)
+	return matched
+
+
+def searchBruteForce(cityData, text):
+	prefix = text.strip().lower()
+	found = []
+	for index, (name, lname, _, _) in enumerate(cityData):
+		matched = getMatchedText(name, lname, prefix)
+		if matched is not None:
+			found.append((matched, index))
+	return [index for _, index in sorted(found)]
+
+
+class TestCityIndex(unittest.TestCase):
+	def test_getitem(self):
+		self.assertEqual(len(cityIndex), len(cityData))
+		for index in range(0, len(cityData), 97):
+			self.assertEqual(cityIndex[index], cityData[index])
+		with self.assertRaises(IndexError):
+			cityIndex[len(cityData)]
+
+	def test_nearest(self):
+		rand = random.Random(0)
+		points = [
+			(rand.uniform(-90, 90), rand.uniform(-180, 180))
+			for _ in range(200)
+		] + [
+			(90, 0),
+			(-90, 0),
+			(35.7, 51.4),
+			(-33.9, 179.99),
+			(10, -180),
+			(0.1, 0.1),
+		]
+		for lat, lng in points:
+			distance, index = nearestBruteForce(cityData, lat, lng)
+			self.assertEqual(
+				cityIndex.nearest(lat, lng),
+				(index, distance),
+				msg=f"{lat=}, {lng=}",
+			)
+
+	def test_nearestSparse(self):
+		rand = random.Random(1)
+		data = [
+			(f"C/{i}", f"C/{i}", rand.uniform(-90, 90), rand.uniform(-180, 180))
+			for i in range(5)
+		]
+		index = CityIndex(compileCityIndex(data))
+		for _ in range(100):
+			lat, lng = rand.uniform(-90, 90), rand.uniform(-180, 180)
+			distance, cityIndex = nearestBruteForce(data, lat, lng)
+			self.assertEqual(index.nearest(lat, lng), (cityIndex, distance))
+		self.assertEqual(
+			CityIndex(compileCityIndex([])).nearest(0, 0),
+			(None, None),
+		)
+
+	def test_search(self):
+		for text in (
+			"teh",
+			"Tehran",
+			"  SAN ",
+			"san j",
+			"new",
+			"york",
+			"iran/",
+			"/",
+			"ran",
+			"تهر",
+			"ایران/ت",
+			"xyzxyz",
+		):
+			self.assertEqual(
+				cityIndex.search(text, maxResults=len(cityData)),
+				searchBruteForce(cityData, text),
+				msg=f"{text=}",
+			)
+		self.assertEqual(cityIndex.search("s", maxResults=5), searchBruteForce(
+			cityData,
+			"s",
+		)[:5])
+		self.assertEqual(cityIndex.search(" ", maxResults=3), [0, 1, 2])
+
+
+class TestParseZoneTabCoord(unittest.TestCase):
+	def assertCoord(self, coord, expected):
+		result = parseZoneTabCoord(coord)
+		self.assertEqual(len(result), 2)
+		for value, expectedValue in zip(result, expected):
+			self.assertAlmostEqual(value, expectedValue, places=9)
+
+	def test_degMin(self):
+		self.assertCoord("+3540+05126", (35 + 40 / 60, 51 + 26 / 60))
+		self.assertCoord("-3352+15113", (-(33 + 52 / 60), 151 + 13 / 60))
+		self.assertCoord("+5130-00007", (51 + 30 / 60, -(7 / 60)))
+
+	def test_degMinSec(self):
+		self.assertCoord(
+			"+404251-0740023",
+			(40 + 42 / 60 + 51 / 3600, -(74 + 0 / 60 + 23 / 3600)),
+		)
+		self.assertCoord(
+			"-720041+0023206",
+			(-(72 + 0 / 60 + 41 / 3600), 2 + 32 / 60 + 6 / 3600),
+		)
+
+	def test_bad(self):
+		with self.assertRaises(ValueError):
+			parseZoneTabCoord("+3540")
+
+
+class TestLoadCityIndex(unittest.TestCase):
+	def setUp(self):
+		self.tmpDir = tempfile.TemporaryDirectory()
+		self.locationsDir = join(self.tmpDir.name, "locations")
+		self.cacheDir = join(self.tmpDir.name, "cache")
+		os.makedirs(self.locationsDir)
+		with bz2.open(
+			join(self.locationsDir, "world.txt.bz2"),
+			mode="wt",
+			encoding="utf8",
+		) as fp:
+			fp.write(
+				"\tIran\n"
+				"\t\tTehran\t35.705\t51.4216\n"
+				"\t\tShiraz\t29.61\t52.53\n"
+				"\tFrance\n"
+				"\t\tParis\t48.85\t2.35\n"
+			)
+		self.writeTrans('{"Iran": "ایران"}')
+		self.parseCount = 0
+		self.parseLocationData = pray_times_locations.parseLocationData
+
+		def parseLocationDataCount(*args):
+			self.parseCount += 1
+			return self.parseLocationData(*args)
+
+		pray_times_locations.parseLocationData = parseLocationDataCount
+
+	def tearDown(self):
+		pray_times_locations.parseLocationData = self.parseLocationData
+		self.tmpDir.cleanup()
+
+	def writeTrans(self, text):
+		with open(join(self.locationsDir, "fa.json"), "w", encoding="utf8") as fp:
+			fp.write(text)
+
+	def load(self):
+		index = loadCityIndex(
+			self.locationsDir,
+			self.cacheDir,
+			"fa",
+			lambda name: name,
+		)
+		self.addCleanup(index.close)
+		return index
+
+	def test_reuse(self):
+		index = self.load()
+		self.assertEqual(self.parseCount, 1)
+		self.assertEqual(index[0], ("Iran/Tehran", "ایران/Tehran", 35.705, 51.4216))
+		index = self.load()
+		self.assertEqual(self.parseCount, 1)
+		self.assertEqual(len(index), 3)
+		self.assertEqual(index[2][:2], ("France/Paris", "France/Paris"))
+
+	def test_keyMismatch(self):
+		self.load()
+		self.writeTrans('{"Iran": "ایران", "France": "فرانسه"}')
+		index = self.load()
+		self.assertEqual(self.parseCount, 2)
+		self.assertEqual(index[2][1], "فرانسه/Paris")
+		self.load()
+		self.assertEqual(self.parseCount, 2)
+
+	def test_invalidFile(self):
+		index = self.load()
+		indexPath = join(self.cacheDir, "locations-fa.idx")
+		with open(indexPath, "rb") as fp:
+			data = fp.read()
+		index.close()
+		with open(indexPath, "wb") as fp:
+			fp.write(b"XXXX" + data[4:])
+		index = self.load()
+		self.assertEqual(self.parseCount, 2)
+		self.assertEqual(len(index), 3)
+		with open(indexPath, "wb") as fp:
+			fp.write(data[:100])
+		index = self.load()
+		self.assertEqual(self.parseCount, 3)
+		self.assertEqual(len(index), 3)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -39,3 +39,14 @@ def earthDistance(lat1, lng1, lat2, lng2):
 		deg = 2 * pi - deg
 	return deg * earthR
 	#return ang * 180 / pi
+
+
+def greatCircleDistance(lat1, lng1, lat2, lng2):
+	"""
+		haversine distance in km
+	"""
+	h = (
+		sind((lat2 - lat1) / 2) ** 2 +
+		cosd(lat1) * cosd(lat2) * sind((lng2 - lng1) / 2) ** 2
+	)
+	return 2 * earthR * math.asin(min(1, math.sqrt(h)))
@@ -6,6 +6,11 @@ log = logger.get()
 import sys
 from os.path import join
 from time import localtime
+from typing import Any, Tuple, List, Dict
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from hashlib import sha1
 
 from scal3.cal_types import gregorian
 from scal3.path import *
@@ -185,23 +190,237 @@ class CalTypesHolder:
 calTypes = CalTypesHolder()
 
 
+# span of conversion tables (see ConvTable) in years before and after today
+# jd_to and to_jd outside this span are calculated by the calendar module
+convTableYearsBefore = 150
+convTableYearsAfter = 150
+
+
+class ConvTable:
+	"""
+		jd of the first day of consecutive months of one calendar
+		jd_to is a bisect on month starts, and to_jd is an index lookup
+
+		days that calendar module is not consistent about (for example
+		the end of hijri month database) are kept as a gap (month 0)
+		and are converted by the module, so results are always the same
+		as the module's jd_to and to_jd
+	"""
+
+	maxGapDays = 90
+
+	def __init__(self, module: "module", startJd: int, endJd: int) -> None:
+		self.module = module
+		# monthStart[i] is jd of first day of i'th month,
+		# and monthStart[-1] is end of the last month (exclusive)
+		self.monthStart = array("i")
+		self.years = array("i")
+		self.months = array("i")
+		# year -> index of month 1 of that year, maybe negative for first year
+		self.yearIndex = {}
+		jd, y, m = self.findMonthStart(startJd, endJd)
+		while jd < endJd:
+			mLen = module.getMonthLen(y, m)
+			nextJd = jd + mLen
+			if mLen > 0 and module.jd_to(nextJd - 1) == (y, m, mLen) and \
+				module.jd_to(nextJd)[2] == 1:
+				if y not in self.yearIndex:
+					self.yearIndex[y] = len(self.years) - (m - 1)
+				self.add(jd, y, m)
+				jd = nextJd
+				y, m, _ = module.jd_to(jd)
+				continue
+			self.add(jd, 0, 0)
+			jd, y, m = self.findMonthStart(jd + 1, endJd)
+		self.monthStart.append(jd)
+		self.startJd = self.monthStart[0]
+		self.endJd = jd
+
+	def add(self, jd: int, year: int, month: int) -> None:
+		self.monthStart.append(jd)
+		self.years.append(year)
+		self.months.append(month)
+
+	def findMonthStart(
+		self,
+		startJd: int,
+		endJd: int,
+	) -> "Tuple[int, int, int]":
+		"""
+			returns (jd, year, month) of first month that starts
+			at or after startJd, or (endJd, 0, 0) if not found
+		"""
+		module = self.module
+		for jd in range(startJd, min(startJd + self.maxGapDays, endJd)):
+			y, m, d = module.jd_to(jd)
+			if d == 1 and module.to_jd(y, m, 1) == jd:
+				return jd, y, m
+		return endJd, 0, 0
+
+	def jd_to(self, jd: int) -> "Tuple[int, int, int]":
+		if self.startJd <= jd < self.endJd:
+			i = bisect_right(self.monthStart, jd) - 1
+			month = self.months[i]
+			if month:
+				return self.years[i], month, jd - self.monthStart[i] + 1
+		return self.module.jd_to(jd)
+
+	def to_jd(self, year: int, month: int, day: int) -> int:
+		i = self.yearIndex.get(year)
+		if i is not None:
+			i += month - 1
+			if 0 <= i < len(self.months) and self.months[i] == month and \
+				self.years[i] == year:
+				jd = self.monthStart[i] + day - 1
+				if 0 < day and jd < self.monthStart[i + 1]:
+					return jd
+		return self.module.to_jd(year, month, day)
+
+
+_convTables = {}  # type: Dict[int, ConvTable]
+
+
+def getConvTable(calType: int) -> ConvTable:
+	table = _convTables.get(calType)
+	if table is None:
+		todayJd = gregorian.to_jd(*localtime()[:3])
+		table = _convTables[calType] = ConvTable(
+			modules[calType],
+			todayJd - int(convTableYearsBefore * 365.25),
+			todayJd + int(convTableYearsAfter * 365.25),
+		)
+	return table
+
+
 def jd_to(jd, target):
-	return modules[target].jd_to(jd)
+	table = _convTables.get(target)
+	if table is None:
+		table = getConvTable(target)
+	# same as table.jd_to(jd), inlined because it is called very often
+	if table.startJd <= jd < table.endJd:
+		monthStart = table.monthStart
+		i = bisect_right(monthStart, jd) - 1
+		month = table.months[i]
+		if month:
+			return table.years[i], month, jd - monthStart[i] + 1
+	return table.module.jd_to(jd)
 
 
 def to_jd(y, m, d, source):
-	return modules[source].to_jd(y, m, d)
+	table = _convTables.get(source)
+	if table is None:
+		table = getConvTable(source)
+	return table.to_jd(y, m, d)
 
 
 def convert(y, m, d, source, target):
 	return (
 		(y, m, d) if source == target
-		else modules[target].jd_to(
-			modules[source].to_jd(y, m, d)
-		)
+		else jd_to(to_jd(y, m, d, source), target)
 	)
 
 
+@lru_cache(maxsize=8)
+def jd_to_range(startJd, endJd, target):
+	"""
+		converts all jds in range(startJd, endJd) to dates of calendar `target`
+		returns (years, months, days), each one an array of length endJd-startJd
+
+		jd_to is called twice per month instead of once per day,
+		the rest of days are filled using getMonthLen of calendar module
+		returned arrays are cached, do not modify them
+		call clearCache() after changing a calendar module's data or options
+	"""
+	module = modules[target]
+	years = array("i")
+	months = array("i")
+	days = array("i")
+	jd = startJd
+	while jd < endJd:
+		y, m, d = module.jd_to(jd)
+		count = min(
+			module.getMonthLen(y, m) - d + 1,
+			endJd - jd,
+		)
+		if count < 1 or (
+			count > 1 and
+			module.jd_to(jd + count - 1) != (y, m, d + count - 1)
+		):
+			# month length is not consistent with jd_to
+			# for example on the end of hijri month database
+			count = 1
+		years.extend([y] * count)
+		months.extend([m] * count)
+		days.extend(range(d, d + count))
+		jd += count
+	return years, months, days
+
+
+# incremented by clearCache, so other caches that are built from calendar
+# conversions (like HolidayPlugin) can find out they are outdated
+cacheVersion = 0
+
+
+def clearCache():
+	global cacheVersion
+	jd_to_range.cache_clear()
+	_convTables.clear()
+	cacheVersion += 1
+
+
+def getConfigData() -> "List[Tuple[str, Dict[str, Any]]]":
+	"""
+		options of calendar modules (and hijri month database) that affect
+		conversions, as plain data, see setConfigData
+	"""
+	data = []
+	for module in modules:
+		values = {
+			opt[0]: getattr(module, opt[0], None)
+			for opt in module.options
+			if opt[0] != "button"
+		}
+		monthDb = getattr(module, "monthDb", None)
+		if monthDb is not None:
+			values["monthDb"] = {
+				"startDate": list(monthDb.startDate),
+				"startJd": monthDb.startJd,
+				"monthLen": [
+					[year] + mLenList
+					for year, mLenList in monthDb.getMonthLenByYear().items()
+				],
+			}
+		data.append((module.name, values))
+	return data
+
+
+def setConfigData(data: "List[Tuple[str, Dict[str, Any]]]") -> None:
+	"""
+		applies the result of getConfigData, for example in another process
+	"""
+	moduleByName = {module.name: module for module in modules}
+	for name, values in data:
+		module = moduleByName.get(name)
+		if module is None:
+			log.error(f"setConfigData: calendar module {name!r} not found")
+			continue
+		for key, value in values.items():
+			if key == "monthDb":
+				module.monthDb.setData(value)
+				continue
+			setattr(module, key, value)
+	clearCache()
+
+
+def getConfigHash() -> str:
+	"""
+		hash of getConfigData(), for caches that are saved to file and
+		are built from calendar conversions
+		unlike cacheVersion it's the same in all runs
+	"""
+	return sha1(repr(getConfigData()).encode("utf-8")).hexdigest()
+
+
 def getMonthLen(year: int, month: int, calType: int) -> int:
 	module, ok = calTypes[calType]
 	if not ok:
@@ -0,0 +1,119 @@
+import unittest
+import random
+from time import perf_counter
+
+from scal3 import logger
+log = logger.get()
+
+from scal3.cal_types import (
+	modules,
+	jd_to,
+	to_jd,
+	getConvTable,
+	clearCache,
+)
+
+# 1901 to 2101
+testStartJd = 2415386
+testEndJd = 2488435
+
+
+class TestConvTable(unittest.TestCase):
+	def setUp(self):
+		clearCache()
+
+	def test_jd_to(self):
+		for calType, module in enumerate(modules):
+			table = getConvTable(calType)
+			for jd in range(testStartJd, testEndJd):
+				self.assertEqual(
+					jd_to(jd, calType),
+					module.jd_to(jd),
+					msg=f"{module.name}, {jd=}",
+				)
+				self.assertEqual(
+					table.jd_to(jd),
+					module.jd_to(jd),
+					msg=f"{module.name}, {jd=}",
+				)
+
+	def test_to_jd(self):
+		for calType, module in enumerate(modules):
+			for jd in range(testStartJd, testEndJd):
+				date = module.jd_to(jd)
+				self.assertEqual(
+					to_jd(*date, calType),
+					module.to_jd(*date),
+					msg=f"{module.name}, {date=}",
+				)
+
+	def test_to_jd_invalid(self):
+		# invalid dates are passed to calendar module
+		for calType, module in enumerate(modules):
+			y = module.jd_to(2460000)[0]
+			for date in [
+				(y, 1, 0),
+				(y, 1, 40),
+				(y, 2, 31),
+				(y, 14, 1),
+				(y, 0, 1),
+			]:
+				try:
+					expected = module.to_jd(*date)
+				except Exception:
+					continue
+				self.assertEqual(
+					to_jd(*date, calType),
+					expected,
+					msg=f"{module.name}, {date=}",
+				)
+
+	def test_outside(self):
+		for calType, module in enumerate(modules):
+			table = getConvTable(calType)
+			for jd in (table.startJd - 1000, table.endJd + 1000):
+				self.assertEqual(jd_to(jd, calType), module.jd_to(jd))
+				date = module.jd_to(jd)
+				self.assertEqual(to_jd(*date, calType), module.to_jd(*date))
+
+	def test_clearCache(self):
+		table = getConvTable(0)
+		clearCache()
+		self.assertIsNot(getConvTable(0), table)
+
+
+def benchmark(count=200000):
+	"""
+		compare jd_to and to_jd of calendar modules with conversion tables
+	"""
+	jds = [random.randint(testStartJd, testEndJd) for _ in range(count)]
+	for calType, module in enumerate(modules):
+		t0 = perf_counter()
+		getConvTable(calType)
+		buildTime = perf_counter() - t0
+		t0 = perf_counter()
+		dates = [module.jd_to(jd) for jd in jds]
+		moduleJdTo = perf_counter() - t0
+		t0 = perf_counter()
+		tableDates = [jd_to(jd, calType) for jd in jds]
+		tableJdTo = perf_counter() - t0
+		t0 = perf_counter()
+		moduleJds = [module.to_jd(y, m, d) for y, m, d in dates]
+		moduleToJd = perf_counter() - t0
+		t0 = perf_counter()
+		tableJds = [to_jd(y, m, d, calType) for y, m, d in dates]
+		tableToJd = perf_counter() - t0
+		assert tableDates == dates, module.name
+		assert tableJds == moduleJds, module.name
+		log.info(
+			f"{module.name:20s} build={buildTime * 1000:.0f} ms, " +
+			f"jd_to: {moduleJdTo / count * 1e6:.2f} -> " +
+			f"{tableJdTo / count * 1e6:.2f} us, " +
+			f"to_jd: {moduleToJd / count * 1e6:.2f} -> " +
+			f"{tableToJd / count * 1e6:.2f} us"
+		)
+
+
+if __name__ == "__main__":
+	benchmark()
+	unittest.main()
@@ -103,6 +103,8 @@ options = (
 import os
 from os.path import join, isfile
 from collections import OrderedDict
+from bisect import bisect_right
+from array import array
 
 from scal3.path import sysConfDir, confDir, modDir
 from scal3.json_utils import *
@@ -145,6 +147,25 @@ class MonthDbHolder:
 		self.monthLenByYm = {}  # hijriMonthLen
 		self.userDbPath = join(confDir, "hijri-monthes.json")
 		self.sysDbPath = f"{modDir}/hijri-monthes.json"
+		# ym of first month, and monthStartList[i] is jd of first day of
+		# month (startYm + i), last item is start of month after database
+		self.startYm = 0
+		self.monthStartList = array("i")
+
+	def updateIndex(self):
+		"""
+			builds monthStartList from startDate, startJd and monthLenByYm
+			must be called after changing them
+		"""
+		y, m, d = self.startDate
+		ym = self.startYm = y * 12 + m - 1
+		jd = self.startJd - d + 1
+		starts = array("i", [jd])
+		while ym in self.monthLenByYm:
+			jd += self.monthLenByYm[ym]
+			starts.append(jd)
+			ym += 1
+		self.monthStartList = starts
 
 	def setMonthLenByYear(self, monthLenByYear):
 		self.endJd = self.startJd
@@ -160,6 +181,7 @@ class MonthDbHolder:
 				self.endJd += ml
 		if self.expJd is None:
 			self.expJd = self.endJd
+		self.updateIndex()
 
 	def setData(self, data):
 		self.startDate = tuple(data["startDate"])
@@ -227,39 +249,22 @@ class MonthDbHolder:
 	def getDateFromJd(self, jd):
 		if not self.endJd >= jd >= self.startJd:
 			return
-		y, m, d = self.startDate
-		ym = y * 12 + m - 1
-		startJd = self.startJd
-		while jd > startJd:
-			monthLen = self.monthLenByYm[ym]
-			jdm0 = jd - monthLen
-
-			if jdm0 <= startJd - d:
-				d = d + jd - startJd
-				break
-
-			if startJd - d < jdm0 <= startJd :
-				ym += 1
-				d = d + jd - startJd - monthLen
-				break
-
-			# assert(jdm0 > startJd)
-			ym += 1
-			jd -= monthLen
-
-		year, mm = divmod(ym, 12)
-		return (year, mm + 1, d)
+		starts = self.monthStartList
+		index = bisect_right(starts, jd) - 1
+		if index < 0:
+			return
+		year, mm = divmod(self.startYm + index, 12)
+		return (year, mm + 1, jd - starts[index] + 1)
 
 	def getJdFromDate(self, year, month, day):
 		ym = year * 12 + month - 1
-		y0, m0, d0 = monthDb.startDate
-		if ym - 1 not in monthDb.monthLenByYm:
+		if ym - 1 not in self.monthLenByYm:
+			return
+		index = ym - self.startYm
+		if not 0 < index < len(self.monthStartList):
 			return
-		ym0 = y0 * 12 + m0 - 1
-		jd = monthDb.startJd
-		for ymi in range(ym0, ym):
-			jd += monthDb.monthLenByYm[ymi]
-		return jd + day - 1
+		# startJd is day startDate[2] of first month
+		return self.monthStartList[index] + self.startDate[2] - 1 + day - 1
 
 
 monthDb = MonthDbHolder()
@@ -492,6 +492,30 @@ class TestHijri(unittest.TestCase):
 				f"{jd=}, {date=}, {dateActual=}",
 			)
 
+	def test_monthDb_index(self):
+		db = hijri.monthDb
+		try:
+			monthLenByYear = db.getMonthLenByYear()
+			year = sorted(monthLenByYear)[2]
+			mLen = monthLenByYear[year][5]
+			monthLenByYear[year][5] = 59 - mLen
+			db.setMonthLenByYear(monthLenByYear)
+			jd6 = db.getJdFromDate(year, 6, 1)
+			jd7 = db.getJdFromDate(year, 7, 1)
+			self.assertEqual(jd7 - jd6, 59 - mLen)
+			# getJdFromDate does not use database for first month
+			for jd in range(db.monthStartList[1], db.endJd):
+				date = db.getDateFromJd(jd)
+				self.assertEqual(db.getJdFromDate(*date), jd, f"{jd=}, {date=}")
+			# edits like ui_gtk/hijri.py: change monthLenByYm and updateIndex
+			ym = year * 12 + 5
+			db.monthLenByYm[ym] = mLen
+			db.updateIndex()
+			self.assertEqual(db.getJdFromDate(year, 7, 1) - jd6, mLen)
+		finally:
+			db.load()
+
+
 def print_to_jd_diff():
 	for ym in hijri.monthDb.monthLenByYm:
 		y, m = divmod(ym, 12)
@@ -0,0 +1,32 @@
+import unittest
+from scal3.cal_types import modules, jd_to, jd_to_range, clearCache
+
+
+class TestJdToRange(unittest.TestCase):
+	def setUp(self):
+		# other tests may change calendar options (like jalaliAlg)
+		clearCache()
+
+	def test_jd_to_range(self):
+		startJd = 2440000  # 1968
+		endJd = startJd + 366 * 80
+		for calType, module in enumerate(modules):
+			years, months, days = jd_to_range(startJd, endJd, calType)
+			self.assertEqual(len(years), endJd - startJd)
+			for jd in range(startJd, endJd):
+				i = jd - startJd
+				self.assertEqual(
+					(years[i], months[i], days[i]),
+					jd_to(jd, calType),
+					msg=f"{module.name}, {jd=}",
+				)
+
+	def test_empty(self):
+		self.assertEqual(
+			[list(arr) for arr in jd_to_range(2450000, 2450000, 0)],
+			[[], [], []],
+		)
+
+
+if __name__ == "__main__":
+	unittest.main()
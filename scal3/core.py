@@ -27,6 +27,7 @@ import os.path
 from os.path import join, isfile, isdir
 from collections import namedtuple
 import re
+from time import perf_counter
 
 import typing
 from typing import Union, Tuple, List, Any
@@ -395,7 +396,12 @@ def initPlugins(fs: "s_object.FileSystem") -> None:
 			# 	continue
 			if not isfile(path):
 				continue
+			t0 = perf_counter()
 			plug = loadPlugin(path)
+			log.info(
+				f"plugin {fname}: created in " +
+				f"{(perf_counter() - t0) * 1000:.1f} ms"
+			)
 			if plug is None:
 				log.error(f"failed to load plugin {path}")
 				continue
@@ -416,14 +422,18 @@ def getHolidayPlugins() -> List[BasePlugin]:
 
 
 def updatePlugins() -> None:
+	enabled = []
 	for i in plugIndex:
 		plug = allPlugList[i]
 		if plug is None:
 			continue
 		if plug.enable:
-			plug.load()
+			enabled.append(plug)
 		else:
-			plug.clear()
+			plug.unload()
+	deferred = loadPluginsAtStartup(enabled)
+	if deferred:
+		loadPluginsInBackground(deferred)
 
 
 PluginTuple = namedtuple("PluginTuple", [
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from scal3 import logger
+log = logger.get()
+
+from cachetools import Cache, LRUCache
+from threading import RLock
+from typing import Optional, Dict, Any, Iterator
+
+# approximate memory usage of an Event object (in bytes),
+# measured with tracemalloc for custom and yearly events loaded from disk
+eventBaseSize = 1600
+eventRuleSize = 300
+eventNotifierSize = 300
+
+
+def getEventSize(event: "Event") -> int:
+	"""
+		returns approximate memory usage of event, in bytes
+	"""
+	return (
+		eventBaseSize +
+		eventRuleSize * len(event.rulesOd) +
+		eventNotifierSize * len(event.notifiers) +
+		2 * (len(event.summary) + len(event.description))
+	)
+
+
+class EventCache(LRUCache):
+	"""
+		LRU cache of Event objects that is shared by all groups
+		key is event id, and size of each item is its approximate memory
+		usage (getEventSize), so maxsize is a memory budget in bytes
+
+		hits, misses and evictions are counted for tuning the budget
+
+		it's used by loader threads and main thread, so methods of this
+		class hold a lock (LRU order is changed even by getEvent)
+	"""
+
+	def __init__(self, maxBytes: int) -> None:
+		LRUCache.__init__(self, maxsize=maxBytes, getsizeof=getEventSize)
+		self._lock = RLock()
+		self.resetStats()
+
+	def resetStats(self) -> None:
+		with self._lock:
+			self.hits = 0
+			self.misses = 0
+			self.evictions = 0
+
+	def popitem(self):
+		with self._lock:
+			self.evictions += 1
+			return LRUCache.popitem(self)
+
+	def pop(self, eid: int, *args) -> "Optional[Event]":
+		with self._lock:
+			return LRUCache.pop(self, eid, *args)
+
+	def peek(self, eid: int) -> "Optional[Event]":
+		"""
+			returns cached event without counting or changing LRU order
+		"""
+		with self._lock:
+			try:
+				return Cache.__getitem__(self, eid)
+			except KeyError:
+				return None
+
+	def getEvent(self, eid: int, parent: "EventGroup") -> "Optional[Event]":
+		with self._lock:
+			event = LRUCache.get(self, eid)
+			if event is None or event.parent is not parent:
+				self.misses += 1
+				return None
+			self.hits += 1
+			return event
+
+	def put(self, event: "Event") -> None:
+		with self._lock:
+			try:
+				self[event.id] = event
+			except ValueError:  # bigger than the whole budget
+				self.pop(event.id, None)
+
+	def remove(self, eid: int, parent: "EventGroup") -> None:
+		"""
+			removes event if it's cached for this parent
+		"""
+		with self._lock:
+			event = self.peek(eid)
+			if event is not None and event.parent is parent:
+				self.pop(eid, None)
+
+	def iterParent(self, parent: "EventGroup") -> "Iterator[Event]":
+		with self._lock:
+			events = [
+				event for event in self.values()
+				if event.parent is parent
+			]
+		yield from events
+
+	def removeParent(self, parent: "EventGroup") -> None:
+		with self._lock:
+			for event in list(self.iterParent(parent)):
+				self.pop(event.id, None)
+
+	def getStats(self) -> "Dict[str, Any]":
+		with self._lock:
+			total = self.hits + self.misses
+			return {
+				"count": len(self),
+				"size": self.currsize,
+				"maxSize": self.maxsize,
+				"hits": self.hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"hitRate": self.hits / total if total else 0.0,
+			}
+
+	def getCountByParent(self) -> "Dict[Any, int]":
+		counts = {}
+		with self._lock:
+			for event in self.values():
+				counts[event.parent] = counts.get(event.parent, 0) + 1
+		return counts
+
+	def getStatsText(self) -> str:
+		stats = self.getStats()
+		return (
+			f"events={stats['count']}, " +
+			f"size={stats['size'] / 1024:.0f} / " +
+			f"{stats['maxSize'] / 1024:.0f} KiB, " +
+			f"hits={stats['hits']}, misses={stats['misses']}, " +
+			f"hitRate={stats['hitRate']:.1%}, " +
+			f"evictions={stats['evictions']}"
+		)
+
+	def logStats(self) -> None:
+		log.info(f"EventCache: {self.getStatsText()}")
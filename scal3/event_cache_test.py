@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+import random
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.event_cache import EventCache, getEventSize
+
+
+class MockEvent:
+	def __init__(self, _id, parent, description=""):
+		self.id = _id
+		self.parent = parent
+		self.rulesOd = {}
+		self.notifiers = []
+		self.summary = ""
+		self.description = description
+
+
+class TestEventCache(unittest.TestCase):
+	def test_budget(self):
+		group = object()
+		size = getEventSize(MockEvent(1, group))
+		cache = EventCache(size * 10)
+		for eid in range(1, 21):
+			cache.put(MockEvent(eid, group))
+		self.assertEqual(len(cache), 10)
+		self.assertEqual(cache.evictions, 10)
+		self.assertLessEqual(cache.currsize, cache.maxsize)
+		# an event with a big description takes 3 items of the budget
+		cache.put(MockEvent(100, group, description="x" * size))
+		self.assertEqual(len(cache), 8)
+		# bigger than the whole budget is not cached
+		cache.put(MockEvent(101, group, description="x" * size * 10))
+		self.assertIsNone(cache.peek(101))
+
+	def test_stats(self):
+		group1 = object()
+		group2 = object()
+		cache = EventCache(10 ** 6)
+		cache.put(MockEvent(1, group1))
+		cache.put(MockEvent(2, group2))
+		self.assertIsNotNone(cache.getEvent(1, group1))
+		self.assertIsNone(cache.getEvent(1, group2))  # moved to another group
+		self.assertIsNone(cache.getEvent(3, group1))
+		stats = cache.getStats()
+		self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+		self.assertEqual(cache.getCountByParent(), {group1: 1, group2: 1})
+		cache.removeParent(group1)
+		self.assertEqual(list(cache), [2])
+
+	def test_threads(self):
+		group = object()
+		size = getEventSize(MockEvent(1, group))
+		cache = EventCache(size * 50)
+		callCount = 2000
+
+		def run(seed):
+			rand = random.Random(seed)
+			for _ in range(callCount):
+				eid = rand.randint(1, 200)
+				op = rand.randint(0, 2)
+				if op == 0:
+					cache.put(MockEvent(eid, group))
+				elif op == 1:
+					cache.getEvent(eid, group)
+				else:
+					cache.remove(eid, group)
+
+		with ThreadPoolExecutor(max_workers=4) as executor:
+			list(executor.map(run, range(8)))
+		self.assertLessEqual(cache.currsize, cache.maxsize)
+		self.assertEqual(cache.currsize, size * len(cache))
+		self.assertEqual(len(list(cache.iterParent(group))), len(cache))
+		stats = cache.getStats()
+		self.assertLessEqual(stats["hits"] + stats["misses"], 8 * callCount)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -24,7 +24,9 @@ import os.path
 from os.path import join, split, dirname, splitext, isabs
 from contextlib import suppress
 import math
+from array import array
 from time import time as now
+from threading import Thread, Lock
 from cachetools import LRUCache
 
 from typing import Tuple, List, Dict, Set, Any, ClassVar, Callable, Iterator
@@ -46,23 +48,31 @@ from scal3.utils import (
 from scal3.interval_utils import *
 from scal3.time_utils import *
 from scal3.date_utils import *
-from scal3.json_utils import jsonToData
+from scal3.json_utils import jsonToData, dataToCompactJson
 
 
 from scal3.s_object import *
+from scal3.object_pack import repackObjects
+from scal3.event_cache import EventCache
+from scal3.occur_density import OccurDensity
 
 from scal3.cal_types import (
 	calTypes,
 	jd_to,
+	jd_to_range,
 	to_jd,
 	convert,
 	GREGORIAN,
 	getSysDate,
+	getConfigHash as getCalTypesConfigHash,
+	getConfigData as getCalTypesConfigData,
+	setConfigData as setCalTypesConfigData,
 )
 from scal3 import ics
 from scal3.locale_man import tr as _
 from scal3.locale_man import getMonthName, textNumEncode
 from scal3 import core
+from scal3 import instrument
 from scal3.core import (
 	log,
 	getAbsWeekNumberFromJd,
@@ -88,6 +98,42 @@ icsMaxEndYear = 2050
 eventsDir = join("event", "events")
 groupsDir = join("event", "groups")
 accountsDir = join("event", "accounts")
+occurIndexDir = join("event", "occur_index")
+
+occurEngineNames = (
+	"tree",
+	"array",
+)
+
+# for groups with lazyOccurrence enabled
+lazyOccurSliceDays = 64
+lazyOccurMaxCount = 50000  # max number of loaded occurrences per group
+
+# for EventContainer.loadEvents
+loadEventsThreads = 4
+loadEventsMinCount = 16  # load fewer events in the calling thread
+# set to False to skip sha1 check of objects when loading events in bulk
+loadEventsVerify = True
+
+# for EventGroupsHolder.updateOccurrence
+occurProcesses = min(os.cpu_count() or 1, 8)
+occurProcessesMinEvents = 500  # calculate fewer events in this process
+# "fork", "spawn" or "forkserver", None for default of platform
+# options are passed to workers (see getOccurrenceConfig) in all methods
+# "fork" may deadlock, because other threads (like loading plugins)
+# may be running, "spawn" is used if "forkserver" is not supported
+occurProcessesStartMethod = "forkserver"
+
+# for EventGroup.getOccurDensity in lazyOccurrence mode
+occurDensityLock = Lock()
+
+# memory budget of Event objects cached for all groups (see event_cache.py)
+eventCacheMaxBytes = 32 * 1024 ** 2
+eventCache = EventCache(eventCacheMaxBytes)
+
+# bump this when the format of occurrence index files changes
+# or when occurrence calculation changes in a way that invalidates old files
+occurIndexVersion = 2
 
 hms_zero = HMS()
 hms_24 = HMS(24)
@@ -109,6 +155,7 @@ def init(fs: FileSystem) -> None:
 	fs.makeDir(eventsDir)
 	fs.makeDir(groupsDir)
 	fs.makeDir(accountsDir)
+	fs.makeDir(occurIndexDir)
 
 	import scal3.account.starcal
 	from scal3.lockfile import checkAndSaveJsonLockFile
@@ -247,7 +294,13 @@ lastIds = None  # type: LastIdsWrapper
 ###########################################################################
 
 
-def removeUnusedObjects(fs: FileSystem):
+def removeUnusedObjects(fs: FileSystem, repack: bool = False):
+	"""
+		removes objects that are not in history of any event, group,
+		account or trash
+		if repack=True, also folds the remaining loose objects and
+		old packs into one pack (see scal3.object_pack)
+	"""
 	global allReadOnly
 	if allReadOnly:
 		raise RuntimeError("removeUnusedObjects: EVENTS ARE READ-ONLY")
@@ -267,6 +320,9 @@ def removeUnusedObjects(fs: FileSystem):
 					hashSet.add(revHash)
 
 		log.info(f"Found {len(hashSet)} used objects")
+		if repack:
+			repackObjects(fs, keepHashes=hashSet)
+			return
 		removedCount = 0
 		for _hash, fpath in iterObjectFiles(fs):
 			if _hash not in hashSet:
@@ -372,39 +428,133 @@ class OccurSet(SObj):
 	# 	return iter(self.getTimeRangeList())
 
 
+def _intersectJdRanges(r1: range, r2: range) -> "Optional[range]":
+	"""
+		intersection of two ranges (with positive steps), or None if it
+		can not be expressed simply (different steps both more than 1)
+	"""
+	if r1.step != 1 and r2.step == 1:
+		r1, r2 = r2, r1
+	if r1.step == 1:
+		step = r2.step
+		start = r2.start
+		if start < r1.start:
+			start += (r1.start - start + step - 1) // step * step
+		return range(start, min(r1.stop, r2.stop), step)
+	if r1.step == r2.step:
+		if (r1.start - r2.start) % r1.step != 0:
+			return range(0)
+		return range(
+			max(r1.start, r2.start),
+			min(r1.stop, r2.stop),
+			r1.step,
+		)
+	return None
+
+
 class JdOccurSet(OccurSet):
+	"""
+		a set of jds, kept as a list of disjoint range objects, like
+		range(jd0, jd1) for consecutive days or range(jd0, jd1, 7) for a weekly
+		occurrence, so that large occurrences do not need a set of all days
+	"""
 	name = "jdSet"
+	# intersection falls back to set intersection above this number of
+	# pairs of ranges
+	maxRangePairs = 10000
 
 	def __init__(self, jdSet: Optional[Set[int]] = None) -> None:
 		OccurSet.__init__(self)
 		if not jdSet:
-			jdSet = []
-		self.jdSet = set(jdSet)
+			self.ranges = []
+		elif isinstance(jdSet, range):
+			self.ranges = [jdSet] if jdSet.step > 0 else [jdSet[::-1]]
+		else:
+			self.ranges = [
+				range(jd0, jd1)
+				for jd0, jd1 in self.findRuns(sorted(set(jdSet)))
+			]
+
+	@classmethod
+	def fromRanges(cls, ranges: List[range]) -> "JdOccurSet":
+		"""
+			ranges must be disjoint, with positive steps
+		"""
+		occur = cls()
+		occur.ranges = [r for r in ranges if r]
+		return occur
+
+	@staticmethod
+	def findRuns(jdList: List[int]) -> List[Tuple[int, int]]:
+		"""
+			jdList must be sorted and without duplicates
+			returns list of (startJd, endJd) of consecutive days
+		"""
+		if not jdList:
+			return []
+		startJd = jdList[0]
+		endJd = startJd + 1
+		jdRanges = []
+		for jd in jdList[1:]:
+			if jd == endJd:
+				endJd += 1
+			else:
+				jdRanges.append((startJd, endJd))
+				startJd = jd
+				endJd = startJd + 1
+		jdRanges.append((startJd, endJd))
+		return jdRanges
+
+	@property
+	def jdSet(self) -> Set[int]:
+		jdSet = set()
+		for r in self.ranges:
+			jdSet.update(r)
+		return jdSet
 
 	def __repr__(self) -> str:
-		return f"JdOccurSet({list(self.jdSet)})"
+		return f"JdOccurSet({self.getDaysJdList()})"
 
 	def __bool__(self) -> bool:
-		return bool(self.jdSet)
+		return any(self.ranges)
 
 	def __len__(self) -> int:
-		return len(self.jdSet)
+		return sum(len(r) for r in self.ranges)
 
 	def getStartJd(self) -> int:
-		if not self.jdSet:
+		if not self:
 			return
-		return min(self.jdSet)
+		return min(r[0] for r in self.ranges if r)
 
 	def getEndJd(self) -> int:
-		if not self.jdSet:
+		if not self:
 			return
-		return max(self.jdSet) + 1
+		return max(r[-1] for r in self.ranges if r) + 1
+
+	def intersectionJd(self, other: "JdOccurSet") -> "JdOccurSet":
+		if len(self.ranges) * len(other.ranges) > self.maxRangePairs:
+			return JdOccurSet(self.jdSet.intersection(other.jdSet))
+		ranges = []
+		for r1 in self.ranges:
+			if not r1:
+				continue
+			for r2 in other.ranges:
+				if not r2 or r2[0] > r1[-1] or r2[-1] < r1[0]:
+					continue
+				r = _intersectJdRanges(r1, r2)
+				if r is None:
+					r = sorted(set(r1).intersection(r2))
+					ranges += [
+						range(jd0, jd1)
+						for jd0, jd1 in self.findRuns(r)
+					]
+				elif r:
+					ranges.append(r)
+		return JdOccurSet.fromRanges(ranges)
 
 	def intersection(self, occur: OccurSet) -> OccurSet:
 		if isinstance(occur, JdOccurSet):
-			return JdOccurSet(
-				self.jdSet.intersection(occur.jdSet)
-			)
+			return self.intersectionJd(occur)
 		elif isinstance(occur, IntervalOccurSet):
 			return IntervalOccurSet(
 				intersectionOfTwoIntervalList(
@@ -418,32 +568,34 @@ class JdOccurSet(OccurSet):
 			raise TypeError
 
 	def getDaysJdList(self) -> List[int]:
+		if len(self.ranges) == 1 and self.ranges[0].step == 1:
+			return list(self.ranges[0])
 		return sorted(self.jdSet)
 
 	def getTimeRangeList(self) -> List[Tuple[int, int]]:
+		"""
+			consecutive days are merged into one time range
+		"""
 		return [
 			(
-				getEpochFromJd(jd),
-				getEpochFromJd(jd + 1),
-			) for jd in self.jdSet
+				getEpochFromJd(jd0),
+				getEpochFromJd(jd1),
+			) for jd0, jd1 in self.calcJdRanges()
 		]
 
 	def calcJdRanges(self) -> List[Tuple[int, int]]:
-		jdList = sorted(self.jdSet)  # jdList is sorted
-		if not jdList:
-			return []
-		startJd = jdList[0]
-		endJd = startJd + 1
-		jdRanges = []
-		for jd in jdList[1:]:
-			if jd == endJd:
-				endJd += 1
-			else:
-				jdRanges.append((startJd, endJd))
-				startJd = jd
-				endJd = startJd + 1
-		jdRanges.append((startJd, endJd))
-		return jdRanges
+		if all(r.step == 1 for r in self.ranges):
+			jdRanges = []
+			for r in sorted(
+				(r for r in self.ranges if r),
+				key=lambda r: r.start,
+			):
+				if jdRanges and jdRanges[-1][1] == r.start:
+					jdRanges[-1] = (jdRanges[-1][0], r.stop)
+				else:
+					jdRanges.append((r.start, r.stop))
+			return jdRanges
+		return self.findRuns(self.getDaysJdList())
 
 
 class IntervalOccurSet(OccurSet):
@@ -669,6 +821,8 @@ class MultiValueAllDayEventRule(AllDayEventRule):
 	)
 	params = ("values",)
 	expand = True  # FIXME
+	# index of year, month or day in date tuple, set by sub-classes
+	dateIndex = None
 
 	def __init__(self, parent: "Event") -> None:
 		EventRule.__init__(self, parent)
@@ -697,6 +851,30 @@ class MultiValueAllDayEventRule(AllDayEventRule):
 				return True
 		return False
 
+	def valueMatches(self, value: int) -> bool:
+		return self.hasValue(value)
+
+	def jdMatches(self, jd: int) -> bool:
+		return self.valueMatches(jd_to(jd, self.getCalType())[self.dateIndex])
+
+	def calcOccurrence(
+		self,
+		startJd: int,
+		endJd: int,
+		event: "Event",
+	) -> OccurSet:
+		if startJd >= endJd:
+			return JdOccurSet()
+		values = jd_to_range(startJd, endJd, self.getCalType())[self.dateIndex]
+		matchByValue = {
+			value: self.valueMatches(value)
+			for value in set(values)
+		}
+		return JdOccurSet([
+			jd for jd, value in zip(range(startJd, endJd), values)
+			if matchByValue[value]
+		])
+
 	def getValuesPlain(self) -> List[Union[int, Tuple[int, int]]]:
 		ls = []
 		for item in self.values:
@@ -722,13 +900,12 @@ class YearEventRule(MultiValueAllDayEventRule):
 	def getServerString(self) -> str:
 		return numRangesEncode(self.values, " ")  # no comma
 
+	dateIndex = 0
+
 	def __init__(self, parent: "Event") -> None:
 		MultiValueAllDayEventRule.__init__(self, parent)
 		self.values = [getSysDate(self.getCalType())[0]]
 
-	def jdMatches(self, jd: int) -> bool:
-		return self.hasValue(jd_to(jd, self.getCalType())[0])
-
 	def newCalTypeValues(
 		self,
 		newCalType: int,
@@ -766,13 +943,12 @@ class MonthEventRule(MultiValueAllDayEventRule):
 	def getServerString(self) -> str:
 		return numRangesEncode(self.values, " ")  # no comma
 
+	dateIndex = 1
+
 	def __init__(self, parent: "Event") -> None:
 		MultiValueAllDayEventRule.__init__(self, parent)
 		self.values = [1]
 
-	def jdMatches(self, jd: int) -> bool:
-		return self.hasValue(jd_to(jd, self.getCalType())[1])
-
 
 @classes.rule.register
 class DayOfMonthEventRule(MultiValueAllDayEventRule):
@@ -783,13 +959,12 @@ class DayOfMonthEventRule(MultiValueAllDayEventRule):
 	def getServerString(self) -> str:
 		return numRangesEncode(self.values, " ")  # no comma
 
+	dateIndex = 2
+
 	def __init__(self, parent: "Event") -> None:
 		MultiValueAllDayEventRule.__init__(self, parent)
 		self.values = [1]
 
-	def jdMatches(self, jd: int) -> bool:
-		return self.hasValue(jd_to(jd, self.getCalType())[2])
-
 
 @classes.rule.register
 class WeekNumberModeEventRule(EventRule):
@@ -903,6 +1078,21 @@ class WeekDayEventRule(AllDayEventRule):
 	def jdMatches(self, jd: int) -> None:
 		return jwday(jd) in self.weekDayList
 
+	def calcOccurrence(
+		self,
+		startJd: int,
+		endJd: int,
+		event: "Event",
+	) -> OccurSet:
+		return JdOccurSet.fromRanges([
+			range(
+				startJd + (wd - jwday(startJd)) % 7,
+				endJd,
+				7,
+			)
+			for wd in set(self.weekDayList)
+		])
+
 	def __str__(self) -> str:
 		if self.weekDayList == list(range(7)):
 			return ""
@@ -1622,8 +1812,8 @@ class ExYearEventRule(YearEventRule):
 	name = "ex_year"
 	desc = "[" + _("Exception") + "] " + _("Year")
 
-	def jdMatches(self, jd: int) -> bool:
-		return not YearEventRule.jdMatches(self, jd)
+	def valueMatches(self, value: int) -> bool:
+		return not YearEventRule.valueMatches(self, value)
 
 
 @classes.rule.register
@@ -1636,8 +1826,8 @@ class ExMonthEventRule(MonthEventRule):
 		"weekMonth",
 	)
 
-	def jdMatches(self, jd: int) -> bool:
-		return not MonthEventRule.jdMatches(self, jd)
+	def valueMatches(self, value: int) -> bool:
+		return not MonthEventRule.valueMatches(self, value)
 
 
 @classes.rule.register
@@ -1645,8 +1835,8 @@ class ExDayOfMonthEventRule(DayOfMonthEventRule):
 	name = "ex_day"
 	desc = "[" + _("Exception") + "] " + _("Day of Month")
 
-	def jdMatches(self, jd: int) -> bool:
-		return not DayOfMonthEventRule.jdMatches(self, jd)
+	def valueMatches(self, value: int) -> bool:
+		return not DayOfMonthEventRule.valueMatches(self, value)
 
 
 @classes.rule.register
@@ -1684,10 +1874,16 @@ class ExDatesEventRule(EventRule):
 		endJd: int,
 		event: "Event",
 	) -> OccurSet:
-		# improve performance # FIXME
-		return JdOccurSet(
-			set(range(startJd, endJd)).difference(self.jdList)
-		)
+		ranges = []
+		for jd in sorted(set(self.jdList)):
+			if jd < startJd:
+				continue
+			if jd >= endJd:
+				break
+			ranges.append(range(startJd, jd))
+			startJd = jd + 1
+		ranges.append(range(startJd, endJd))
+		return JdOccurSet.fromRanges(ranges)
 
 	def getData(self) -> List[str]:
 		datesConf = []
@@ -3752,6 +3948,14 @@ class EventContainer(BsonHistEventObj):
 		return self._getEvent(eid)
 
 	def _getEvent(self, eid):
+		return self._makeEvent(eid, *self._loadEventData(eid))
+
+	def _loadEventData(self, eid, verify=True):
+		"""
+			reads and decodes files of event, without creating Event object
+			returns (data, lastEpoch, lastHash)
+			called from worker threads by loadEvents
+		"""
 		eventFile = Event.getFile(eid)
 		if not self.fs.isfile(eventFile):
 			# self.idList.remove(eid)
@@ -3768,7 +3972,11 @@ class EventContainer(BsonHistEventObj):
 			eventFile,
 			"event",
 			self.fs,
+			verify=verify,
 		)
+		return data, lastEpoch, lastHash
+
+	def _makeEvent(self, eid, data, lastEpoch, lastHash):
 		event = classes.event.byName[data["type"]](eid)
 		event.fs = self.fs
 		event.parent = self
@@ -3786,6 +3994,78 @@ class EventContainer(BsonHistEventObj):
 			else:
 				yield event
 
+	def loadEvents(self, eids, verify=None, failedIds=None):
+		"""
+			loads events of given ids, reading and decoding files
+			in a thread pool, and yields Event objects in the same order
+			verify: check sha1 of objects, default: loadEventsVerify
+			failedIds: if it's None, error of an event that fails to load
+				is raised, otherwise the event is logged and skipped, and
+				its id is appended to failedIds (a list)
+		"""
+		for eid, res in self.loadEventsData(
+			eids,
+			verify=verify,
+			failedIds=failedIds,
+		):
+			try:
+				event = self._makeEvent(eid, *res)
+			except Exception:
+				if failedIds is None:
+					raise
+				log.exception(f"error while loading event {eid}")
+				failedIds.append(eid)
+				continue
+			yield event
+
+	def loadEventsData(self, eids, verify=None, failedIds=None):
+		"""
+			same as loadEvents, but yields (eid, (data, lastEpoch, lastHash))
+			without creating Event objects
+		"""
+		if verify is None:
+			verify = loadEventsVerify
+		eids = list(eids)
+		if len(eids) < loadEventsMinCount or not self.fs.threadSafe:
+			results = map(
+				lambda eid: self._tryLoadEventData(eid, verify),
+				eids,
+			)
+			yield from self._iterLoadedData(eids, results, failedIds)
+			return
+		from concurrent.futures import ThreadPoolExecutor
+		from scal3.object_pack import getPacks
+		getPacks(self.fs)  # open packs before starting threads
+		with ThreadPoolExecutor(max_workers=loadEventsThreads) as executor:
+			results = executor.map(
+				lambda eid: self._tryLoadEventData(eid, verify),
+				eids,
+			)
+			yield from self._iterLoadedData(eids, results, failedIds)
+
+	def _tryLoadEventData(self, eid, verify):
+		try:
+			return self._loadEventData(eid, verify=verify)
+		except Exception as e:
+			return e
+
+	def _iterLoadedData(self, eids, results, failedIds):
+		for eid, res in zip(eids, results):
+			if isinstance(res, Exception):
+				if failedIds is None:
+					raise res
+				log.error(f"error while loading event {eid}", exc_info=res)
+				failedIds.append(eid)
+				continue
+			yield eid, res
+
+	def logFailedIds(self, failedIds: "List[int]") -> None:
+		if failedIds:
+			log.error(
+				f"{len(failedIds)} events of {self!r} failed to load " +
+				f"and were skipped: {failedIds}"
+			)
+
 	def __len__(self):
 		return len(self.idList)
 
@@ -3963,6 +4243,8 @@ class EventGroup(EventContainer):
 		"eventTextSep",
 		"startJd",
 		"endJd",
+		"occurEngine",
+		"lazyOccurrence",
 		"remoteIds",
 		"remoteSyncEnable",
 		"remoteSyncDuration",
@@ -3992,6 +4274,8 @@ class EventGroup(EventContainer):
 		"eventTextSep",
 		"startJd",
 		"endJd",
+		"occurEngine",
+		"lazyOccurrence",
 		"remoteIds",
 		"remoteSyncEnable",
 		"remoteSyncDuration",
@@ -4125,9 +4409,10 @@ class EventGroup(EventContainer):
 			self.defaultEventType = "custom"
 		self.eventTextSep = core.eventTextSep
 		###
+		# events are cached in global eventCache (shared by all groups)
+		# eventCacheSize=0 disables caching for this group
+		# other values are only kept for compatibility
 		self.eventCacheSize = 100
-		self.resetCache()
-		# eventCache: key is eid, value is Event object
 		###
 		year, month, day = getSysDate(self.calType)
 		self.startJd = to_jd(
@@ -4143,6 +4428,10 @@ class EventGroup(EventContainer):
 			self.calType,
 		)
 		##
+		# "tree": EventSearchTree, "array": EventSearchArray
+		self.occurEngine = "tree"
+		# calculate occurrences only for the time ranges that are viewed
+		self.lazyOccurrence = False
 		self.initOccurrence()
 		###
 		self.setDefaults()
@@ -4150,14 +4439,10 @@ class EventGroup(EventContainer):
 		self.clearRemoteAttrs()
 
 	def resetCache(self):
-		if self.eventCacheSize < 1:
-			self.eventCache = None
-			return
-		self.eventCache = LRUCache(maxsize=self.eventCacheSize)
+		self.clearCache()
 
 	def clearCache(self):
-		if self.eventCache:
-			self.eventCache.clear()
+		eventCache.removeParent(self)
 
 	def setRandomColor(self) -> None:
 		import random
@@ -4250,6 +4535,8 @@ class EventGroup(EventContainer):
 
 	def setData(self, data: Dict[str, Any]) -> None:
 		eventCacheSize = self.eventCacheSize
+		occurEngine = self.occurEngine
+		lazyOccurrence = self.lazyOccurrence
 		if "showInCal" in data:  # for compatibility
 			data["showInDCal"] = data["showInWCal"] = \
 				data["showInMCal"] = data["showInCal"]
@@ -4282,6 +4569,16 @@ class EventGroup(EventContainer):
 				self.eventCacheSize = self.eventCacheSizeMin
 			self.resetCache()
 
+		if self.occurEngine not in occurEngineNames:
+			log.error(f"invalid {self.occurEngine=}, group {self.id}")
+			self.occurEngine = "tree"
+		if (
+			self.occurEngine != occurEngine or
+			self.lazyOccurrence != lazyOccurrence or
+			self.lazyOccurrence  # startJd or endJd may be changed
+		):
+			self.initOccurrence()
+
 		####
 		# if "defaultEventType" in data:
 		# 	self.defaultEventType = data["defaultEventType"]
@@ -4293,29 +4590,55 @@ class EventGroup(EventContainer):
 	# getEvent, getEventNoCache, create
 
 	def removeFromCache(self, eid: int) -> None:
-		if not self.eventCache:
-			return
-		if self.eventCache.get(eid) is not None:
-			self.eventCache.pop(eid)
+		eventCache.remove(eid, self)
 
 	def setToCache(self, event: "Event"):
-		if not self.eventCache:
+		if self.eventCacheSize < 1:
 			return
-		self.eventCache[event.id] = event
+		eventCache.put(event)
 
 	def getEvent(self, eid: int) -> "Event":
 		if eid not in self.idList:
 			raise ValueError(f"{self} does not contain {eid!r}")
-		if self.eventCache:
-			event = self.eventCache.get(eid)
-			if event is not None:
-				return event
+		event = eventCache.getEvent(eid, self)
+		if event is not None:
+			return event
 		event = EventContainer.getEvent(self, eid)
 		event.rulesHash = event.getRulesHash()
 		if self.enable:
 			self.setToCache(event)
 		return event
 
+	def loadEvents(self, eids, verify=None, failedIds=None):
+		"""
+			bulk version of getEvent, see EventContainer.loadEvents
+			events are taken from eventCache if they are there, but new ones
+			are not added to cache, so a pass over a big group does not
+			evict the events that user is working with
+		"""
+		eids = list(eids)
+		cached = {}
+		for eid in eids:
+			event = eventCache.getEvent(eid, self)
+			if event is not None:
+				cached[eid] = event
+		loaded = {}
+		for event in EventContainer.loadEvents(
+			self,
+			[eid for eid in eids if eid not in cached],
+			verify=verify,
+			failedIds=failedIds,
+		):
+			event.rulesHash = event.getRulesHash()
+			loaded[event.id] = event
+		for eid in eids:
+			# Event.__bool__ is False for events with no rule
+			event = cached.get(eid)
+			if event is None:
+				event = loaded.get(eid)
+			if event is not None:
+				yield event
+
 	def create(self, eventType: str) -> "Event":
 		# if not eventType in self.acceptsEventTypes: # FIXME
 		# 	raise ValueError(
@@ -4339,18 +4662,20 @@ class EventGroup(EventContainer):
 		# except:
 		# 	pass
 		self.occurCount -= self.occur.delete(event.id)
+		self.updateOccurDensityEvent(event.id, [])
 		return index
 
 	# clearEvents or excludeAll or removeAll?
 	def removeAll(self) -> None:
-		if self.eventCache:
-			for event in self.eventCache.values():
-				event.parent = None  # needed? FIXME
+		events = list(eventCache.iterParent(self))
+		self.clearCache()
+		for event in events:
+			event.parent = None  # needed? FIXME
 		###
 		self.idList = []
-		self.clearCache()
 		self.occur.clear()
 		self.occurCount = 0
+		self.resetOccurDensity()
 
 	def postAdd(self, event: "Event") -> None:
 		EventContainer.postAdd(self, event)
@@ -4364,8 +4689,8 @@ class EventGroup(EventContainer):
 			self.updateOccurrenceEvent(event)
 
 	def updateCache(self, event: "Event"):
-		if self.eventCache and self.eventCache.get(event.id) is not None:
-			self.setToCache(event)
+		if eventCache.peek(event.id) is event:
+			self.setToCache(event)  # size may be changed
 		event.afterModify()
 
 	def copy(self) -> "EventGroup":
@@ -4431,21 +4756,181 @@ class EventGroup(EventContainer):
 			f" title={self.title} eid={event.id}"
 		)
 		eid = event.id
+		if self.lazyOccurrence:
+			self.occur.reloadEvent(eid)
+			self.occurCount = self.occur.getLoadedCount()
+			self.updateOccurDensityEvent(eid)
+			return
 		self.occurCount -= self.occur.delete(eid)
-		for t0, t1 in event.calcOccurrenceAll().getTimeRangeList():
+		rangeList = event.calcOccurrenceAll().getTimeRangeList()
+		for t0, t1 in rangeList:
 			self.addOccur(t0, t1, eid)
+		self.updateOccurDensityEvent(eid, [t0 for t0, _t1 in rangeList])
 
 	def initOccurrence(self) -> None:
-		from scal3.event_search_tree import EventSearchTree
 		# from scal3.time_line_tree import TimeLineTree
 		# self.occur = TimeLineTree(offset=self.getEpochFromJd(self.endJd))
-		self.occur = EventSearchTree()
+		if self.occurEngine == "array":
+			from scal3.event_search_array import EventSearchArray
+			engineClass = EventSearchArray
+		else:
+			from scal3.event_search_tree import EventSearchTree
+			engineClass = EventSearchTree
+		if self.lazyOccurrence:
+			from scal3.event_search_window import WindowedEventSearch
+			self.occur = WindowedEventSearch(
+				self.calcOccurrenceSlice,
+				self.startJd,
+				self.endJd,
+				engineClass=engineClass,
+				sliceDays=lazyOccurSliceDays,
+				maxCount=lazyOccurMaxCount,
+			)
+		else:
+			self.occur = engineClass()
 		# self.occurLoaded = False
 		self.occurCount = 0
+		self.resetOccurDensity()
+
+	def calcOccurrenceSlice(
+		self,
+		startJd: int,
+		endJd: int,
+		eids: "Optional[List[int]]" = None,
+	) -> "Iterator[Tuple[int, int, int]]":
+		"""
+			yields (t0, t1, eid) for occurrences in range(startJd, endJd)
+			used by lazyOccurrence mode
+		"""
+		if eids is None:
+			eids = self.idList
+		for eid in eids:
+			try:
+				event = self.getEvent(eid)
+			except Exception:
+				log.exception("")
+				continue
+			occur = event.calcOccurrence(startJd, endJd)
+			if not occur:
+				continue
+			for t0, t1 in occur.getTimeRangeList():
+				yield t0, t1, eid
 
 	def clear(self) -> None:
 		self.occur.clear()
 		self.occurCount = 0
+		self.resetOccurDensity()
+
+	def resetOccurDensity(self) -> None:
+		# OccurDensity, calculated by getOccurDensity
+		self.occurDensity = None
+		# for lazyOccurrence mode, see getOccurDensity
+		with occurDensityLock:
+			self.occurDensityGen = getattr(self, "occurDensityGen", 0) + 1
+			self.occurDensityThread = None
+			self.occurDensityPending = None
+		self.occurDensityDirtyIds = set()
+
+	def getOccurDensity(
+		self,
+		onReady: "Optional[Callable[[], None]]" = None,
+	) -> "Optional[OccurDensity]":
+		"""
+			returns number of occurrences by day, calculated on first call
+			after occurrences are rebuilt, and updated per event after that
+
+			in lazyOccurrence mode, it's calculated in a thread (without
+			loading slices of self.occur), and None is returned until it's
+			ready, then onReady() is called from that thread
+		"""
+		if self.occurDensity is not None:
+			return self.occurDensity
+		if not self.lazyOccurrence:
+			self.occurDensity = OccurDensity.fromEventStarts(
+				self.startJd,
+				self.endJd,
+				(
+					(eid, t0) for t0, _t1, eid, _odt in
+					self.occur.search(self.getStartEpoch(), self.getEndEpoch())
+				),
+			)
+			return self.occurDensity
+		with occurDensityLock:
+			pending = self.occurDensityPending
+			self.occurDensityPending = None
+			if pending is None and self.occurDensityThread is None:
+				gen = self.occurDensityGen
+				self.occurDensityThread = Thread(
+					target=self._calcOccurDensity,
+					args=(gen, onReady),
+					daemon=True,
+				)
+				self.occurDensityThread.start()
+		if pending is None:
+			return None
+		# events that are changed while it was being calculated
+		for eid in self.occurDensityDirtyIds:
+			self._updateOccurDensityEvent(pending, eid)
+		self.occurDensityDirtyIds = set()
+		with occurDensityLock:
+			self.occurDensityThread = None
+		self.occurDensity = pending
+		return pending
+
+	def _calcOccurDensity(
+		self,
+		gen: int,
+		onReady: "Optional[Callable[[], None]]",
+	) -> None:
+		"""
+			runs in a thread, see getOccurDensity
+		"""
+		try:
+			density = OccurDensity.fromEventStarts(
+				self.startJd,
+				self.endJd,
+				(
+					(eid, t0) for t0, _t1, eid in
+					self.calcOccurrenceSlice(self.startJd, self.endJd)
+				),
+			)
+		except Exception:
+			log.exception(f"error calculating density of group {self.id}")
+			return
+		with occurDensityLock:
+			if gen != self.occurDensityGen:
+				return
+			self.occurDensityPending = density
+		if onReady is not None:
+			onReady()
+
+	def _updateOccurDensityEvent(
+		self,
+		density: "OccurDensity",
+		eid: int,
+		starts: "Optional[List[float]]" = None,
+	) -> None:
+		if starts is None:
+			starts = []
+			if eid in self.idList:
+				occur = self.getEvent(eid).calcOccurrence(self.startJd, self.endJd)
+				if occur:
+					starts = [t0 for t0, _t1 in occur.getTimeRangeList()]
+		density.setEvent(eid, starts)
+
+	def updateOccurDensityEvent(
+		self,
+		eid: int,
+		starts: "Optional[List[float]]" = None,
+	) -> None:
+		"""
+			updates density (if it's calculated) after event is changed
+			starts: start epoch of occurrences of event, calculated if None
+		"""
+		if self.occurDensity is not None:
+			self._updateOccurDensityEvent(self.occurDensity, eid, starts)
+		elif self.occurDensityThread is not None:
+			self.occurDensityDirtyIds.add(eid)
 
 	def addOccur(self, t0: float, t1: float, eid: int) -> None:
 		self.occur.add(t0, t1, eid)
@@ -4457,12 +4942,109 @@ class EventGroup(EventContainer):
 			f"count={self.occurCount}, time={now() - stm0}"
 		)
 
+	def getOccurIndexFile(self) -> str:
+		return join(occurIndexDir, f"{self.id}.json")
+
+	def getOccurIndexHeader(self) -> Dict[str, Any]:
+		# anything other than event data that affects calcOccurrence
+		return {
+			"version": occurIndexVersion,
+			"startJd": self.startJd,
+			"endJd": self.endJd,
+			"localTz": str(core.localTz),
+			"firstWeekDay": core.firstWeekDay,
+			"calTypes": getCalTypesConfigHash(),
+		}
+
+	def loadOccurIndex(self) -> "Dict[int, Tuple[str, List[Tuple[int, int]]]]":
+		"""
+			returns a dict: eid -> (eventHash, timeRangeList)
+			returns empty dict if index file is missing, broken or outdated
+		"""
+		if self.id is None:
+			return {}
+		try:
+			with self.fs.open(self.getOccurIndexFile()) as fp:
+				data = jsonToData(fp.read())
+		except FileNotFoundError:
+			return {}
+		except Exception:
+			log.exception(f"error loading occurrence index of group {self.id}")
+			return {}
+		if data.get("header") != self.getOccurIndexHeader():
+			return {}
+		index = {}
+		for eid, eventHash, rangeList in data.get("events", []):
+			index[eid] = (eventHash, rangeList)
+		return index
+
+	def saveOccurIndex(
+		self,
+		index: "Dict[int, Tuple[str, List[Tuple[int, int]]]]",
+	) -> None:
+		if self.id is None or allReadOnly:
+			return
+		data = {
+			"header": self.getOccurIndexHeader(),
+			"events": [
+				[eid, eventHash, rangeList]
+				for eid, (eventHash, rangeList) in index.items()
+			],
+		}
+		try:
+			with self.fs.open(self.getOccurIndexFile(), "w") as fp:
+				fp.write(dataToCompactJson(data))
+		except Exception:
+			log.exception(f"error saving occurrence index of group {self.id}")
+
+	def removeOccurIndex(self) -> None:
+		if self.id is None:
+			return
+		with suppress(FileNotFoundError):
+			self.fs.removeFile(self.getOccurIndexFile())
+
+	def getEventLastHash(self, eid: int) -> "Optional[str]":
+		"""
+			reads the hash of last revision of event from its json file
+			without loading the bson object
+		"""
+		try:
+			with self.fs.open(Event.getFile(eid)) as fp:
+				data = jsonToData(fp.read())
+			return data["history"][0][1]
+		except FileNotFoundError:
+			return None
+		except Exception:
+			log.exception(f"error reading history of event {eid}")
+			return None
+
+	@instrument.timed("EventGroup.updateOccurrence")
 	def updateOccurrence(self) -> None:
+		"""
+			rebuilds self.occur
+			occurrences of events that are not changed since last run
+			are read from occurrence index file, instead of being calculated
+		"""
 		stm0 = now()
 		self.clear()
-		for event, occur in self.calcOccurrenceAll():
-			for t0, t1 in occur.getTimeRangeList():
-				self.addOccur(t0, t1, event.id)
+		if self.lazyOccurrence:
+			# occurrences are calculated on search
+			return
+		if self.fs is None:
+			for event, occur in self.calcOccurrenceAll():
+				for t0, t1 in occur.getTimeRangeList():
+					self.addOccur(t0, t1, event.id)
+			return
+		oldIndex, index, changedIds = self.loadOccurrenceFromIndex()
+		calcCount = 0
+		failedIds = []
+		for event in self.loadEvents(changedIds, failedIds=failedIds):
+			occur = event.calcOccurrence(self.startJd, self.endJd)
+			rangeList = occur.getTimeRangeList() if occur else []
+			self.addEventOccurrence(event.id, event.lastHash, rangeList, index)
+			calcCount += 1
+		self.logFailedIds(failedIds)
+		self.finishOccurrence(oldIndex, index, calcCount)
 		# self.occurLoaded = True
 		log.debug(f"time = {(now() - stm0) * 1000} ms")
 		# log.debug(
@@ -4471,6 +5053,65 @@ class EventGroup(EventContainer):
 		# )
 		# log.debug(f"{self.id} {1000*(now()-stm0)} {self.occur.calcAvgDepth():.1f}")
 
+	def loadOccurrenceFromIndex(self) -> "Tuple[Dict, Dict, List[int]]":
+		"""
+			adds occurrences of events that are not changed since index was
+			saved, returns (oldIndex, index, changedIds)
+			occurrences of changedIds must be added by addEventOccurrence
+			and then finishOccurrence must be called
+		"""
+		oldIndex = self.loadOccurIndex()
+		index = {}
+		changedIds = []
+		for eid in self.idList:
+			eventHash = self.getEventLastHash(eid)
+			item = oldIndex.get(eid)
+			if not (eventHash and item and item[0] == eventHash):
+				changedIds.append(eid)
+				continue
+			rangeList = item[1]
+			for t0, t1 in rangeList:
+				self.addOccur(t0, t1, eid)
+			index[eid] = (eventHash, rangeList)
+		return oldIndex, index, changedIds
+
+	def addEventOccurrence(
+		self,
+		eid: int,
+		eventHash: "Optional[str]",
+		rangeList: "List[Tuple[int, int]]",
+		index: "Dict[int, Tuple[str, List[Tuple[int, int]]]]",
+	) -> None:
+		for t0, t1 in rangeList:
+			self.addOccur(t0, t1, eid)
+		if eventHash:
+			index[eid] = (eventHash, rangeList)
+
+	def finishOccurrence(
+		self,
+		oldIndex: "Dict[int, Tuple[str, List[Tuple[int, int]]]]",
+		index: "Dict[int, Tuple[str, List[Tuple[int, int]]]]",
+		calcCount: int,
+	) -> None:
+		if calcCount > 0 or len(index) != len(oldIndex):
+			self.saveOccurIndex(index)
+		log.debug(
+			f"updateOccurrence: id={self.id}, calculated {calcCount}" +
+			f" of {len(self.idList)} events"
+		)
+
+	def canUpdateOccurrenceInProcess(self) -> bool:
+		"""
+			whether occurrences can be calculated from plain event data
+			in another process, see EventGroupsHolder.updateOccurrence
+		"""
+		return (
+			self.id is not None and
+			self.fs is not None and
+			not self.lazyOccurrence and
+			type(self).updateOccurrence is EventGroup.updateOccurrence
+		)
+
 	def _exportToIcsFpEvent(
 		self,
 		fp: "file",
@@ -4541,7 +5182,7 @@ class EventGroup(EventContainer):
 
 	def exportToIcsFp(self, fp: "file") -> None:
 		currentTimeStamp = ics.getIcsTimeByEpoch(now())
-		for event in self:
+		for event in self.loadEvents(self.idList):
 			self._exportToIcsFpEvent(fp, event, currentTimeStamp)
 
 	def exportData(self) -> Dict[str, Any]:
@@ -4550,8 +5191,7 @@ class EventGroup(EventContainer):
 			del data[attr]
 		data = makeOrderedData(data, self.paramsOrder)
 		data["events"] = []
-		for eventId in self.idList:
-			event = EventContainer.getEvent(self, eventId)
+		for event in EventContainer.loadEvents(self, self.idList):
 			modified = event.modified
 			if event.uuid is None:
 				event.save()
@@ -4663,11 +5303,19 @@ class EventGroup(EventContainer):
 	def search(self, conds):
 		conds = dict(conds)  # take a copy, we may modify it
 
-		for eid in self._searchTimeFilter(conds):
-			try:
-				event = self[eid]
-			except Exception:
-				log.exception("")
+		eids = list(self._searchTimeFilter(conds))
+		failedIds = []
+		eventById = {
+			event.id: event
+			for event in self.loadEvents(
+				OrderedDict.fromkeys(eids),
+				failedIds=failedIds,
+			)
+		}
+		self.logFailedIds(failedIds)
+		for eid in eids:
+			event = eventById.get(eid)
+			if event is None:
 				continue
 			for key, value in conds.items():
 				func = self.simpleFilters[key]
@@ -4681,7 +5329,7 @@ class EventGroup(EventContainer):
 	def createPatchList(self, sinceEpoch: int) -> "List[Dict[str, Any]]":
 		patchList = []
 
-		for event in self:
+		for event in self.loadEvents(self.idList):
 			# if not event.remoteIds:  # FIXME
 			eventHist = event.loadHistory()
 			if not eventHist:
@@ -5650,6 +6298,91 @@ class VcsDailyStatEventGroup(VcsBaseEventGroup):
 		return event
 
 
+def calcOccurrenceData(
+	group: "EventGroup",
+	eventsData: "List[Tuple[int, Dict[str, Any]]]",
+) -> "Tuple[array, array, array]":
+	"""
+		calculates occurrences of events from their data (in group)
+		returns (eids, counts, epochs) arrays, counts[i] is the number
+		of (t0, t1) pairs of eids[i] in epochs
+		epochs is an array of int64, or float64 if any epoch is not int
+	"""
+	startJd = group.startJd
+	endJd = group.endJd
+	eids = array("q")
+	counts = array("L")
+	epochs = array("q")
+	for eid, data in eventsData:
+		try:
+			event = classes.event.byName[data["type"]](eid)
+			event.parent = group
+			event.setData(data)
+			occur = event.calcOccurrence(startJd, endJd)
+		except Exception:
+			log.exception(f"error calculating occurrences of event {eid}")
+			continue
+		rangeList = occur.getTimeRangeList() if occur else []
+		eids.append(eid)
+		counts.append(len(rangeList))
+		for t0, t1 in rangeList:
+			if epochs.typecode == "q" and not (
+				isinstance(t0, int) and isinstance(t1, int)
+			):
+				epochs = array("d", epochs)
+			epochs.extend((t0, t1))
+	return eids, counts, epochs
+
+
+def getOccurrenceConfig() -> "Dict[str, Any]":
+	"""
+		options (other than data of group and events) that affect
+		calcOccurrence, to be applied in worker processes by
+		setOccurrenceConfig, which may not have the same options, for
+		example if they are not started by "fork" and options are
+		changed but not saved
+	"""
+	return {
+		"localTz": str(core.localTz),
+		"firstWeekDay": core.firstWeekDay,
+		"weekNumberMode": core.weekNumberMode,
+		"calTypes": getCalTypesConfigData(),
+	}
+
+
+def initOccurrenceWorker(config: "Dict[str, Any]") -> None:
+	"""
+		initializer of worker processes of EventGroupsHolder.updateOccurrence
+	"""
+	global lastIds
+	if lastIds is None:
+		# not started by "fork", ids are only needed to create objects
+		lastIds = LastIdsWrapper()
+	setOccurrenceConfig(config)
+
+
+def setOccurrenceConfig(config: "Dict[str, Any]") -> None:
+	if config["localTz"] != str(core.localTz):
+		core.localTz = natz.gettz(config["localTz"])
+		clearTzTables(core.localTz)
+	core.firstWeekDay = config["firstWeekDay"]
+	core.weekNumberMode = config["weekNumberMode"]
+	setCalTypesConfigData(config["calTypes"])
+
+
+def calcGroupOccurrenceData(
+	groupType: str,
+	groupData: "Dict[str, Any]",
+	eventsData: "List[Tuple[int, Dict[str, Any]]]",
+) -> "Tuple[array, array, array]":
+	"""
+		calcOccurrenceData in a worker process, from plain (picklable) data
+	"""
+	group = classes.group.byName[groupType]()
+	group.setData(groupData)
+	return calcOccurrenceData(group, eventsData)
+
+
 ###########################################################################
 ###########################################################################
 
@@ -5773,6 +6506,7 @@ class EventGroupsHolder(JsonObjectsHolder):
 	def delete(self, obj: EventGroup) -> None:
 		assert not obj.idList  # FIXME
 		obj.parent = None
+		obj.removeOccurIndex()
 		JsonObjectsHolder.delete(self, obj)
 
 	def setData(self, data: List[Any]) -> None:
@@ -5784,8 +6518,8 @@ class EventGroupsHolder(JsonObjectsHolder):
 					group.save()
 					log.info(f"saved group {group.id} with uuid = {group.uuid}")
 				self.idByUuid[group.uuid] = group.id
-				if group.enable:
-					group.updateOccurrence()
+			self.updateOccurrence()
+			eventCache.logStats()
 		else:
 			for name in (
 				"noteBook",
@@ -5802,6 +6536,126 @@ class EventGroupsHolder(JsonObjectsHolder):
 				self.append(obj)
 			self.save()
 
+	def updateOccurrence(
+		self,
+		groups: "Optional[List[EventGroup]]" = None,
+		progress: "Optional[Callable[[int, int, EventGroup], None]]" = None,
+	) -> None:
+		"""
+			rebuilds occurrences of given groups (default: enabled groups)
+			like group.updateOccurrence(), but occurrences of changed events
+			of all groups are calculated in parallel, in a process pool
+			(if there are at least occurProcessesMinEvents of them)
+
+			progress(doneCount, totalCount, group) is called after each group
+		"""
+		stm0 = now()
+		if groups is None:
+			groups = [group for group in self if group.enable]
+		doneCount = 0
+
+		def groupDone(group):
+			nonlocal doneCount
+			doneCount += 1
+			if progress is not None:
+				progress(doneCount, len(groups), group)
+
+		jobs = []  # list of (group, oldIndex, index, eventsData, hashById)
+		for group in groups:
+			if not group.canUpdateOccurrenceInProcess():
+				group.updateOccurrence()
+				groupDone(group)
+				continue
+			group.clear()
+			oldIndex, index, changedIds = group.loadOccurrenceFromIndex()
+			if not changedIds:
+				group.finishOccurrence(oldIndex, index, 0)
+				groupDone(group)
+				continue
+			eventsData = []
+			hashById = {}
+			failedIds = []
+			for eid, (data, lastEpoch, lastHash) in group.loadEventsData(
+				changedIds,
+				failedIds=failedIds,
+			):
+				eventsData.append((eid, data))
+				hashById[eid] = lastHash
+			group.logFailedIds(failedIds)
+			jobs.append((group, oldIndex, index, eventsData, hashById))
+
+		def finishJob(job, result):
+			group, oldIndex, index, eventsData, hashById = job
+			eids, counts, epochs = result
+			if epochs.typecode == "d":
+				epochs = [int(t) if t.is_integer() else t for t in epochs]
+			pos = 0
+			for eid, count in zip(eids, counts):
+				rangeList = [
+					(epochs[i], epochs[i + 1])
+					for i in range(pos, pos + 2 * count, 2)
+				]
+				pos += 2 * count
+				group.addEventOccurrence(eid, hashById.get(eid), rangeList, index)
+			group.finishOccurrence(oldIndex, index, len(eids))
+			groupDone(group)
+
+		eventCount = sum(len(job[3]) for job in jobs)
+		if len(jobs) > 1 and occurProcesses > 1 and \
+			eventCount >= occurProcessesMinEvents:
+			jobs = self._updateOccurrenceInProcesses(jobs, finishJob)
+		for job in jobs:
+			finishJob(job, calcOccurrenceData(job[0], job[3]))
+		log.info(
+			f"updateOccurrence: {len(groups)} groups, calculated " +
+			f"{eventCount} events, time={now() - stm0:.3f}"
+		)
+
+	def _updateOccurrenceInProcesses(self, jobs, finishJob):
+		"""
+			returns the jobs that are not finished (because of an error)
+		"""
+		from concurrent.futures import ProcessPoolExecutor, as_completed
+		import multiprocessing
+		mpContext = None
+		if occurProcessesStartMethod:
+			startMethod = occurProcessesStartMethod
+			if startMethod not in multiprocessing.get_all_start_methods():
+				startMethod = "spawn"
+			mpContext = multiprocessing.get_context(startMethod)
+		remaining = {id(job): job for job in jobs}
+		try:
+			with ProcessPoolExecutor(
+				max_workers=min(occurProcesses, len(jobs)),
+				mp_context=mpContext,
+				initializer=initOccurrenceWorker,
+				initargs=(getOccurrenceConfig(),),
+			) as executor:
+				futures = {
+					executor.submit(
+						calcGroupOccurrenceData,
+						job[0].name,
+						job[0].getData(),
+						job[3],
+					): job
+					for job in jobs
+				}
+				for future in as_completed(futures):
+					job = futures[future]
+					try:
+						result = future.result()
+					except Exception:
+						log.exception(
+							f"error calculating occurrences of group {job[0].id}"
+							" in worker process"
+						)
+						continue
+					finishJob(job, result)
+					del remaining[id(job)]
+		except Exception:
+			log.exception("error in occurrence process pool")
+		return list(remaining.values())
+
 	def getEnableIds(self) -> List[int]:
 		ids = []
 		for group in self:
@@ -5885,6 +6739,10 @@ class EventGroupsHolder(JsonObjectsHolder):
 		])
 
 	def importData(self, data: Dict[str, Any]) -> EventGroupsImportResult:
+		with self.fs.transaction():
+			return self._importData(data)
+
+	def _importData(self, data: Dict[str, Any]) -> EventGroupsImportResult:
 		newGroups = []  # type: List[EventGroup]
 		res = EventGroupsImportResult()
 		for gdata in data["groups"]:
@@ -6246,6 +7104,8 @@ WeekOccurData = namedtuple(
 		"time",
 		"text",
 		"icon",
+		"ids",
+		"show",
 	],
 )
 
@@ -6259,7 +7119,177 @@ MonthOccurData = namedtuple(
 	],
 )
 
-def getDayOccurrenceData(curJd, groups, tfmt="HM$"):
+
+class DayOccurrenceCache:
+	"""
+		Occurrences of groups, bucketed by jd, built by searching group.occur
+		once for a range of days
+		byJd: jd -> {gid: [(eid, epoch0, epoch1, odt), ...]}
+		where epoch0 and epoch1 are cut to that day, like the result of
+		group.occur.search for that day
+
+		is kept up to date by onEventUpdate (EventUpdateQueue consumer)
+	"""
+
+	def __init__(self, maxDays: int = 400) -> None:
+		self.maxDays = maxDays
+		self.clear()
+
+	def clear(self) -> None:
+		self.byJd = LRUCache(maxsize=self.maxDays)
+
+	def __contains__(self, jd: int) -> bool:
+		return jd in self.byJd
+
+	def getJdRanges(self) -> "List[Tuple[int, int]]":
+		"""
+			returns contiguous ranges of cached jds, as (startJd, endJd)
+		"""
+		ranges = []
+		for jd in sorted(self.byJd):
+			if ranges and ranges[-1][1] == jd:
+				ranges[-1] = (ranges[-1][0], jd + 1)
+			else:
+				ranges.append((jd, jd + 1))
+		return ranges
+
+	def addGroupOccur(
+		self,
+		group: "EventGroup",
+		startJd: int,
+		endJd: int,
+		eid: "Optional[int]" = None,
+		jds: "Optional[Set[int]]" = None,
+	) -> None:
+		"""
+			searches group.occur from startJd to endJd and adds
+			the results to buckets of jds that are already in cache
+			if eid is given, only adds occurrences of that event
+			if jds is given, only adds to buckets of those jds
+		"""
+		if endJd <= startJd:
+			return
+		byJd = self.byJd
+		gid = group.id
+		# dayEpochs[i] is start of day startJd + i
+		dayEpochs = getEpochArrayFromJdRange(startJd, endJd + 1)
+		for epoch0, epoch1, _eid, odt in group.occur.search(
+			dayEpochs[0],
+			dayEpochs[-1],
+		):
+			if eid is not None and _eid != eid:
+				continue
+			jd = max(startJd, getJdFromEpoch(epoch0))
+			while jd < endJd:
+				dayStart = dayEpochs[jd - startJd]
+				if dayStart > epoch1 or (dayStart == epoch1 and epoch0 < epoch1):
+					break
+				dayEnd = dayEpochs[jd + 1 - startJd]
+				if epoch0 < dayEnd and (jds is None or jd in jds):
+					bucket = byJd.get(jd)
+					if bucket is not None:
+						bucket.setdefault(gid, []).append((
+							_eid,
+							max(epoch0, dayStart),
+							min(epoch1, dayEnd),
+							odt,
+						))
+				jd += 1
+
+	def fill(self, startJd: int, endJd: int, groups: "List[EventGroup]") -> None:
+		"""
+			makes sure all jds in range(startJd, endJd) are in cache
+		"""
+		missing = [jd for jd in range(startJd, endJd) if jd not in self.byJd]
+		if not missing:
+			return
+		# touch cached ones, so they are not removed by the new ones
+		for jd in range(startJd, endJd):
+			self.byJd.get(jd)
+		for jd in missing:
+			self.byJd[jd] = {}
+		jds = set(missing)
+		for group in groups:
+			if not group.enable:
+				continue
+			self.addGroupOccur(
+				group,
+				missing[0],
+				missing[-1] + 1,
+				jds=jds,
+			)
+
+	def getDay(self, jd: int, groups: "List[EventGroup]") -> "Dict[int, List]":
+		self.fill(jd, jd + 1, groups)
+		return self.byJd[jd]
+
+	def removeEvent(self, eid: int) -> None:
+		for bucket in self.byJd.values():
+			for gid, items in bucket.items():
+				if any(item[0] == eid for item in items):
+					bucket[gid] = [item for item in items if item[0] != eid]
+
+	def updateEvent(self, group: "EventGroup", eid: int) -> None:
+		self.removeEvent(eid)
+		if not group.enable:
+			return
+		for startJd, endJd in self.getJdRanges():
+			self.addGroupOccur(group, startJd, endJd, eid=eid)
+
+	def removeGroup(self, gid: int) -> None:
+		for bucket in self.byJd.values():
+			bucket.pop(gid, None)
+
+	def updateGroup(self, group: "EventGroup") -> None:
+		self.removeGroup(group.id)
+		if not group.enable:
+			return
+		for startJd, endJd in self.getJdRanges():
+			self.addGroupOccur(group, startJd, endJd)
+
+	def onEventUpdate(self, record: "EventUpdateRecord") -> None:
+		action = record.action
+		obj = record.obj
+		if action in ("+", "e", "v"):
+			if isinstance(obj.parent, EventGroup):
+				self.updateEvent(obj.parent, obj.id)
+			else:
+				self.removeEvent(obj.id)
+		elif action == "-":
+			self.removeEvent(obj.id)
+		elif action in ("r", "eg", "+g"):
+			if isinstance(obj, EventGroup):
+				self.updateGroup(obj)
+		elif action == "-g":
+			self.removeGroup(obj.id)
+
+
+def getOccurTimeStr(
+	epoch0: float,
+	epoch1: float,
+	dayStart: int,
+	dayEnd: int,
+	tfmt: str,
+) -> str:
+	"""
+		epoch0 and epoch1 are cut to the day
+		returns empty string if the whole day is occupied
+	"""
+	if epoch0 <= dayStart and epoch1 >= dayEnd:
+		return ""
+	hms0 = hms_zero if epoch0 <= dayStart else getJhmsFromEpoch(epoch0)[1]
+	if epoch1 - epoch0 < 1:
+		return f"{hms0:{tfmt}}"
+	hms1 = hms_24 if epoch1 >= dayEnd else getJhmsFromEpoch(epoch1)[1]
+	return f"{hms0:{tfmt}} - {hms1:{tfmt}}"
+
+
+def getDayOccurrenceData(curJd, groups, tfmt="HM$", cache=None):
+	if cache is None:
+		cache = DayOccurrenceCache()
+	bucket = cache.getDay(curJd, groups)
+	dayStart = getEpochFromJd(curJd)
+	dayEnd = getEpochFromJd(curJd + 1)
 	data = []
 	for groupIndex, group in enumerate(groups):
 		if not group.enable:
@@ -6269,26 +7299,14 @@ def getDayOccurrenceData(curJd, groups, tfmt="HM$"):
 		# log.debug("\nupdateData: checking event", event.summary)
 		gid = group.id
 		color = group.color
-		for epoch0, epoch1, eid, odt in group.occur.search(
-			getEpochFromJd(curJd),
-			getEpochFromJd(curJd + 1),
-		):
+		for eid, epoch0, epoch1, odt in bucket.get(gid, ()):
 			event = group[eid]
 			###
 			text = event.getTextParts()
 			###
 			timeStr = ""
 			if epoch1 - epoch0 < dayLen:
-				jd0, hms0 = getJhmsFromEpoch(epoch0)
-				if jd0 < curJd:
-					hms0 = hms_zero
-				if epoch1 - epoch0 < 1:
-					timeStr = f"{hms0:{tfmt}}"
-				else:
-					jd1, hms1 = getJhmsFromEpoch(epoch1)
-					if jd1 > curJd:
-						hms1 = hms_24
-					timeStr = f"{hms0:{tfmt}} - {hms1:{tfmt}}"
+				timeStr = getOccurTimeStr(epoch0, epoch1, dayStart, dayEnd, tfmt)
 			###
 			try:
 				eventIndex = group.index(eid)
@@ -6316,177 +7334,75 @@ def getDayOccurrenceData(curJd, groups, tfmt="HM$"):
 	return [item[1] for item in data]
 
 
-def getWeekOccurrenceData(curAbsWeekNumber, groups, tfmt="HM$"):
+def iterOccurrenceDays(startJd, endJd, groups, tfmt, cache=None):
+	"""
+		yields (jd, group, event, timeStr) for each day in range(startJd, endJd)
+		and each occurrence of an event of enabled groups in that day
+	"""
+	if cache is None:
+		cache = DayOccurrenceCache(maxDays=max(endJd - startJd, 1))
+	cache.fill(startJd, endJd, groups)
+	dayEpochs = getEpochArrayFromJdRange(startJd, endJd + 1)
+	for jd in range(startJd, endJd):
+		bucket = cache.getDay(jd, groups)
+		dayStart = dayEpochs[jd - startJd]
+		dayEnd = dayEpochs[jd + 1 - startJd]
+		for group in groups:
+			if not group.enable:
+				continue
+			for eid, epoch0, epoch1, odt in bucket.get(group.id, ()):
+				yield jd, group, group[eid], getOccurTimeStr(
+					epoch0,
+					epoch1,
+					dayStart,
+					dayEnd,
+					tfmt,
+				)
+
+
+@instrument.timed("getWeekOccurrenceData")
+def getWeekOccurrenceData(curAbsWeekNumber, groups, tfmt="HM$", cache=None):
 	startJd = core.getStartJdOfAbsWeekNumber(curAbsWeekNumber)
 	endJd = startJd + 7
 	data = []
-
-	def add(group: "EventGroup", event: "Event", eData: "dict"):
-		eData["show"] = (
-			group.showInDCal,
-			group.showInWCal,
-			group.showInMCal,
-		)
-		eData["ids"] = (group.id, event.id)
-		data.append(eData)
-
-	for group in groups:
-		if not group.enable:
-			continue
-		for event in group:
-			if not event:
-				continue
-			occur = event.calcOccurrence(startJd, endJd)
-			if not occur:
-				continue
-			text = event.getText()
-			icon = event.getIconRel()
-			if isinstance(occur, JdOccurSet):
-				for jd in occur.getDaysJdList():
-					wnum, weekDay = core.getWeekDateFromJd(jd)
-					if wnum == curAbsWeekNumber:
-						add(group, event, WeekOccurData(
-							weekDay=weekDay,
-							time="",
-							text=text,
-							icon=icon,
-						))
-			elif isinstance(occur, IntervalOccurSet):
-				for startEpoch, endEpoch in occur.getTimeRangeList():
-					jd1, hms1 = getJhmsFromEpoch(startEpoch)
-					jd2, hms2 = getJhmsFromEpoch(endEpoch)
-					wnum, weekDay = core.getWeekDateFromJd(jd1)
-					if wnum == curAbsWeekNumber:
-						if jd1 == jd2:
-							add(group, event, WeekOccurData(
-								weekDay=weekDay,
-								time=f"{hms1:{tfmt}} - {hms2:{tfmt}}",
-								text=text,
-								icon=icon,
-							))
-						else:  # FIXME
-							add(group, event, WeekOccurData(
-								weekDay=weekDay,
-								time=f"{hms1:{tfmt}} - {hms_24:{tfmt}}",
-								text=text,
-								icon=icon,
-							))
-							for jd in range(jd1 + 1, jd2):
-								wnum, weekDay = core.getWeekDateFromJd(jd)
-								if wnum == curAbsWeekNumber:
-									add(group, event, WeekOccurData(
-										weekDay=weekDay,
-										time="",
-										text=text,
-										icon=icon,
-									))
-								else:
-									break
-							wnum, weekDay = core.getWeekDateFromJd(jd2)
-							if wnum == curAbsWeekNumber:
-								add(group, event, WeekOccurData(
-									weekDay=weekDay,
-									time=f"{hms_zero:{tfmt}} - {hms2:{tfmt}}",
-									text=text,
-									icon=icon,
-								))
-			elif isinstance(occur, TimeListOccurSet):
-				for epoch in occur.epochList:
-					jd, hms = getJhmsFromEpoch(epoch)
-					wnum, weekDay = core.getWeekDateFromJd(jd)
-					if wnum == curAbsWeekNumber:
-						add(group, event, WeekOccurData(
-							weekDay=weekDay,
-							time=f"{hms:{tfmt}}",
-							text=text,
-							icon=icon,
-						))
-			else:
-				raise TypeError
+	for jd, group, event, timeStr in iterOccurrenceDays(
+		startJd,
+		endJd,
+		groups,
+		tfmt,
+		cache=cache,
+	):
+		data.append(WeekOccurData(
+			weekDay=core.getWeekDateFromJd(jd)[1],
+			time=timeStr,
+			text=event.getText(),
+			icon=event.getIconRel(),
+			ids=(group.id, event.id),
+			show=(
+				group.showInDCal,
+				group.showInWCal,
+				group.showInMCal,
+			),
+		))
 	return data
 
 
-def getMonthOccurrenceData(curYear, curMonth, groups, tfmt="HM$"):
+def getMonthOccurrenceData(curYear, curMonth, groups, tfmt="HM$", cache=None):
 	startJd, endJd = core.getJdRangeForMonth(curYear, curMonth, calTypes.primary)
 	data = []
-	for group in groups:
-		if not group.enable:
-			continue
-		for event in group:
-			if not event:
-				continue
-			occur = event.calcOccurrence(startJd, endJd)
-			if not occur:
-				continue
-			text = event.getText()
-			icon = event.getIconRel()
-			ids = (group.id, event.id)
-			if isinstance(occur, JdOccurSet):
-				for jd in occur.getDaysJdList():
-					y, m, d = jd_to_primary(jd)
-					if y == curYear and m == curMonth:
-						data.append(MonthOccurData(
-							day=d,
-							time="",
-							text=text,
-							icon=icon,
-							ids=ids,
-						))
-			elif isinstance(occur, IntervalOccurSet):
-				for startEpoch, endEpoch in occur.getTimeRangeList():
-					jd1, hms1 = getJhmsFromEpoch(startEpoch)
-					jd2, hms2 = getJhmsFromEpoch(endEpoch)
-					y, m, d = jd_to_primary(jd1)
-					if y == curYear and m == curMonth:
-						if jd1 == jd2:
-							data.append(MonthOccurData(
-								day=d,
-								time=f"{hms1:{tfmt}} - {hms2:{tfmt}}",
-								text=text,
-								icon=icon,
-								ids=ids,
-							))
-						else:  # FIXME
-							data.append(MonthOccurData(
-								day=d,
-								time=f"{hms1:{tfmt}} - {hms_24:{tfmt}}",
-								text=text,
-								icon=icon,
-								ids=ids,
-							))
-							for jd in range(jd1 + 1, jd2):
-								y, m, d = jd_to_primary(jd)
-								if y == curYear and m == curMonth:
-									data.append(MonthOccurData(
-										day=d,
-										time="",
-										text=text,
-										icon=icon,
-										ids=ids,
-									))
-								else:
-									break
-							y, m, d = jd_to_primary(jd2)
-							if y == curYear and m == curMonth:
-								data.append(MonthOccurData(
-									day=d,
-									time=f"{hms_zero:{tfmt}} - {hms2:{tfmt}}",
-									text=text,
-									icon=icon,
-									ids=ids,
-								))
-			elif isinstance(occur, TimeListOccurSet):
-				for epoch in occur.epochList:
-					jd, hms = getJhmsFromEpoch(epoch)
-					y, m, d = jd_to_primary(jd1)
-					if y == curYear and m == curMonth:
-						data.append(MonthOccurData(
-							day=d,
-							time=f"{hms:{tfmt}}",
-							text=text,
-							icon=icon,
-							ids=ids,
-						))
-			else:
-				raise TypeError
+	for jd, group, event, timeStr in iterOccurrenceDays(
+		startJd,
+		endJd,
+		groups,
+		tfmt,
+		cache=cache,
+	):
+		data.append(MonthOccurData(
+			day=jd_to_primary(jd)[2],
+			time=timeStr,
+			text=event.getText(),
+			icon=event.getIconRel(),
+			ids=(group.id, event.id),
+		))
 	return data
+
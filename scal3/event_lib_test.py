@@ -1,23 +1,558 @@
+#!/usr/bin/env python3
 import unittest
 
-import os
-from os.path import join
+import sys
+import shutil
+import threading
+import random
 import tempfile
-import atexit
+from os.path import dirname, abspath
 
-import sys
-sys.path.append(".")
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
 
-from scal3.event_lib import *
+import natz
 
-myTmpDir = tempfile.mkdtemp(prefix=f"starcal-event_lib_test-")
-atexit.register(os.removedirs, myTmpDir)
+from scal3 import event_lib
+from scal3 import core
+from scal3 import cal_types
+from scal3.s_object import bson, DefaultFileSystem, getObjectPath
+from scal3.cal_types import calTypes, hijri
+from scal3.occur_density import OccurDensity
+from scal3.time_utils import dayLen, getEpochFromJd, getJhmsFromEpoch
+
+myTmpDir = tempfile.mkdtemp(prefix="starcal-event_lib_test-")
 fs = event_lib.DefaultFileSystem(myTmpDir)
 
 event_lib.init(fs)
+event_lib.allReadOnly = False
 eventGroups = event_lib.EventGroupsHolder.load(fs)
-eventTrash = event_lib.EventTrash.load(fs)
 
 
-class TestEventLib(unittest.TestCase):
-	pass
+def tearDownModule():
+	shutil.rmtree(myTmpDir)
+
+
+def createGroup(eventCount: int, calType: int = 0) -> "event_lib.EventGroup":
+	group = eventGroups.create("group")
+	group.title = "test"
+	group.save()
+	for index in range(eventCount):
+		event = group.create("yearly")
+		event.calType = calType
+		event.summary = f"event {index}"
+		event.setMonth(index % 12 + 1)
+		event.setDay(index % 28 + 1)
+		event.save()
+		group.append(event)
+	group.save()
+	return group
+
+
+def createMixedGroup(startJd: int, endJd: int, rand) -> "event_lib.EventGroup":
+	"""
+		yearly events, and tasks and all-day tasks that may span
+		several days, in range(startJd, endJd)
+	"""
+	group = createGroup(10)
+	for index in range(30):
+		if index % 2:
+			event = group.create("task")
+			event["start"][0].setEpoch(
+				getEpochFromJd(rand.randint(startJd, endJd - 1)) +
+				rand.choice([0, 60 * rand.randint(0, 1439)]),
+			)
+			event.setEnd("duration", rand.choice([0, 1, 2, 30, 60, 24 * 60]), 60)
+		else:
+			event = group.create("allDayTask")
+			event.setJd(rand.randint(startJd, endJd - 1))
+			event.setEnd("duration", rand.randint(1, 3))
+		event.summary = f"{event.name} {index}"
+		event.save()
+		group.append(event)
+	group.save()
+	group.updateOccurrence()
+	return group
+
+
+def getDayOccurrenceDataBaseline(curJd, groups, tfmt="HM$"):
+	"""
+		getDayOccurrenceData before DayOccurrenceCache,
+		searches group.occur for the day
+	"""
+	data = []
+	for groupIndex, group in enumerate(groups):
+		if not group.enable:
+			continue
+		if not group.showInCal():
+			continue
+		for epoch0, epoch1, eid, _odt in group.occur.search(
+			getEpochFromJd(curJd),
+			getEpochFromJd(curJd + 1),
+		):
+			event = group[eid]
+			timeStr = ""
+			if epoch1 - epoch0 < dayLen:
+				jd0, hms0 = getJhmsFromEpoch(epoch0)
+				if jd0 < curJd:
+					hms0 = event_lib.hms_zero
+				if epoch1 - epoch0 < 1:
+					timeStr = f"{hms0:{tfmt}}"
+				else:
+					jd1, hms1 = getJhmsFromEpoch(epoch1)
+					if jd1 > curJd:
+						hms1 = event_lib.hms_24
+					timeStr = f"{hms0:{tfmt}} - {hms1:{tfmt}}"
+			data.append((
+				(epoch0, epoch1, groupIndex, group.index(eid)),
+				event_lib.DayOccurData(
+					time=timeStr,
+					time_epoch=(epoch0, epoch1),
+					is_allday=epoch0 % dayLen + epoch1 % dayLen == 0,
+					text=event.getTextParts(),
+					icon=event.getIconRel(),
+					color=group.color,
+					ids=(group.id, eid),
+					show=(
+						group.showInDCal,
+						group.showInWCal,
+						group.showInMCal,
+					),
+					showInStatusIcon=group.showInStatusIcon,
+				),
+			))
+	data.sort(key=lambda x: x[0])
+	return [item[1] for item in data]
+
+
+def getWeekOccurrenceDataBaseline(absWeekNumber, groups, tfmt="HM$"):
+	"""
+		same items as getWeekOccurrenceData, from the days of week
+	"""
+	startJd = core.getStartJdOfAbsWeekNumber(absWeekNumber)
+	data = []
+	for jd in range(startJd, startJd + 7):
+		for item in getDayOccurrenceDataBaseline(jd, groups, tfmt=tfmt):
+			gid, eid = item.ids
+			event = groups[gid][eid]
+			data.append(event_lib.WeekOccurData(
+				weekDay=core.getWeekDateFromJd(jd)[1],
+				time=item.time,
+				text=event.getText(),
+				icon=item.icon,
+				ids=item.ids,
+				show=item.show,
+			))
+	return data
+
+
+class ThreadCheckFileSystem(DefaultFileSystem):
+	def __init__(self, rootPath, threadSafe):
+		DefaultFileSystem.__init__(self, rootPath)
+		self.threadSafe = threadSafe
+		self.threadIds = set()
+
+	def open(self, fpath, mode="r", encoding=None):
+		self.threadIds.add(threading.get_ident())
+		return DefaultFileSystem.open(self, fpath, mode=mode, encoding=encoding)
+
+
+class TestLoadEvents(unittest.TestCase):
+	def test_order(self):
+		group = createGroup(40)
+		eids = list(group.idList)
+		random.Random(0).shuffle(eids)
+		for index, eid in enumerate(eids):
+			if index % 3:
+				group.removeFromCache(eid)
+			else:
+				group.getEvent(eid)
+		events = list(group.loadEvents(eids))
+		self.assertEqual([event.id for event in events], eids)
+		for event in events:
+			self.assertEqual(event.summary, group.getEvent(event.id).summary)
+
+	def test_noRule(self):
+		group = createGroup(3)
+		event = group.getEvent(group.idList[1])
+		event.clearRules()
+		self.assertFalse(event)
+		events = list(group.loadEvents(group.idList))
+		self.assertEqual([e.id for e in events], group.idList)
+		self.assertIs(events[1], event)
+
+	def test_missingFile(self):
+		group = createGroup(20)
+		eid = group.idList[5]
+		fs.removeFile(event_lib.Event.getFile(eid))
+		group.removeFromCache(eid)
+		with self.assertRaises(FileNotFoundError):
+			list(group.loadEvents(group.idList))
+		failedIds = []
+		events = list(group.loadEvents(group.idList, failedIds=failedIds))
+		self.assertEqual(failedIds, [eid])
+		self.assertEqual(
+			[event.id for event in events],
+			[_id for _id in group.idList if _id != eid],
+		)
+		with self.assertRaises(FileNotFoundError):
+			group.exportData()
+
+	def test_verify(self):
+		group = createGroup(3)
+		event = group.getEvent(group.idList[1])
+		_, fpath = getObjectPath(event.lastHash)
+		with fs.open(fpath, "rb") as fp:
+			data = bson.loads(fp.read())
+		data["summary"] = "corrupt"
+		with fs.open(fpath, "wb") as fp:
+			fp.write(bytes(bson.dumps(data)))
+		loadEvents = event_lib.EventContainer.loadEvents
+		with self.assertRaises(IOError):
+			list(loadEvents(group, group.idList, verify=True))
+		failedIds = []
+		events = list(loadEvents(
+			group,
+			group.idList,
+			verify=True,
+			failedIds=failedIds,
+		))
+		self.assertEqual(failedIds, [event.id])
+		self.assertEqual(len(events), 2)
+		events = list(loadEvents(group, group.idList, verify=False))
+		self.assertEqual(
+			[e.summary for e in events],
+			["event 0", "corrupt", "event 2"],
+		)
+
+	def test_notThreadSafe(self):
+		group = createGroup(40)
+		mainId = threading.get_ident()
+		loadEvents = event_lib.EventContainer.loadEvents
+		try:
+			group.fs = ThreadCheckFileSystem(myTmpDir, threadSafe=False)
+			self.assertEqual(len(list(loadEvents(group, group.idList))), 40)
+			self.assertEqual(group.fs.threadIds, {mainId})
+
+			# thread-safe fs is read in worker threads
+			group.fs = ThreadCheckFileSystem(myTmpDir, threadSafe=True)
+			self.assertEqual(len(list(loadEvents(group, group.idList))), 40)
+			self.assertNotIn(mainId, group.fs.threadIds)
+		finally:
+			group.fs = fs
+
+
+class TestDayOccurrenceCache(unittest.TestCase):
+	maxDiff = None
+
+	def setUp(self):
+		self.startJd = core.getCurrentJd() - 30
+		self.endJd = self.startJd + 60
+		self.rand = random.Random(2)
+		self.group = createMixedGroup(self.startJd, self.endJd, self.rand)
+		self.holder = event_lib.EventGroupsHolder()
+		self.holder.fs = fs
+		self.holder.append(self.group)
+
+	def assertDaysEqual(self, cache, jds):
+		for jd in jds:
+			self.assertEqual(
+				event_lib.getDayOccurrenceData(jd, self.holder, cache=cache),
+				getDayOccurrenceDataBaseline(jd, self.holder),
+				msg=f"{jd=}",
+			)
+
+	def test_day(self):
+		cache = event_lib.DayOccurrenceCache()
+		jds = range(self.startJd - 3, self.endJd + 3)
+		self.assertTrue(any(
+			getDayOccurrenceDataBaseline(jd, self.holder) for jd in jds
+		))
+		self.assertDaysEqual(cache, jds)
+		# no cache
+		for jd in jds:
+			self.assertEqual(
+				event_lib.getDayOccurrenceData(jd, self.holder),
+				getDayOccurrenceDataBaseline(jd, self.holder),
+			)
+
+	def test_week(self):
+		cache = event_lib.DayOccurrenceCache()
+		startWeek = core.getAbsWeekNumberFromJd(self.startJd)
+		for absWeekNumber in range(startWeek, startWeek + 10):
+			expected = sorted(getWeekOccurrenceDataBaseline(
+				absWeekNumber,
+				self.holder,
+			))
+			self.assertEqual(sorted(event_lib.getWeekOccurrenceData(
+				absWeekNumber,
+				self.holder,
+			)), expected)
+			self.assertEqual(sorted(event_lib.getWeekOccurrenceData(
+				absWeekNumber,
+				self.holder,
+				cache=cache,
+			)), expected)
+
+	def test_month(self):
+		cache = event_lib.DayOccurrenceCache()
+		year, month, _ = core.jd_to_primary(self.startJd)
+		for _ in range(3):
+			startJd, endJd = core.getJdRangeForMonth(
+				year,
+				month,
+				calTypes.primary,
+			)
+			expected = []
+			for jd in range(startJd, endJd):
+				for item in getDayOccurrenceDataBaseline(jd, self.holder):
+					gid, eid = item.ids
+					event = self.holder[gid][eid]
+					expected.append(event_lib.MonthOccurData(
+						day=core.jd_to_primary(jd)[2],
+						time=item.time,
+						text=event.getText(),
+						icon=event.getIconRel(),
+						ids=item.ids,
+					))
+			self.assertTrue(expected)
+			expected.sort()
+			self.assertEqual(sorted(event_lib.getMonthOccurrenceData(
+				year,
+				month,
+				self.holder,
+			)), expected)
+			self.assertEqual(sorted(event_lib.getMonthOccurrenceData(
+				year,
+				month,
+				self.holder,
+				cache=cache,
+			)), expected)
+			year, month, _ = core.jd_to_primary(endJd)
+
+	def test_update(self):
+		cache = event_lib.DayOccurrenceCache(maxDays=1000)
+		group = self.group
+		farJd = self.endJd + 5000
+		cache.fill(self.startJd, self.endJd, self.holder)
+		cache.fill(farJd, farJd + 7, self.holder)
+		jds = list(range(self.startJd, self.endJd)) + list(range(farJd, farJd + 7))
+		self.assertEqual(
+			cache.getJdRanges(),
+			[(self.startJd, self.endJd), (farJd, farJd + 7)],
+		)
+		searched = []
+		addGroupOccur = cache.addGroupOccur
+
+		def addGroupOccurSpy(group, startJd, endJd, **kwargs):
+			searched.append((startJd, endJd))
+			addGroupOccur(group, startJd, endJd, **kwargs)
+
+		cache.addGroupOccur = addGroupOccurSpy
+		for index in range(10, 40, 3):
+			event = group.getEvent(group.idList[index])
+			if event.name == "task":
+				event.modifyPos(event.getStartEpoch() + dayLen * 2 + 3600)
+			else:
+				event.setJd(self.rand.randint(self.startJd, self.endJd - 1))
+			event.save()
+			group.updateOccurrenceEvent(event)
+			cache.updateEvent(group, event.id)
+			self.assertDaysEqual(cache, jds)
+		# only cached days are searched
+		self.assertEqual(
+			set(searched),
+			{(self.startJd, self.endJd), (farJd, farJd + 7)},
+		)
+		event = group.getEvent(group.idList[12])
+		group.remove(event)
+		cache.removeEvent(event.id)
+		self.assertDaysEqual(cache, jds)
+		group.color = (1, 2, 3)
+		cache.updateGroup(group)
+		self.assertDaysEqual(cache, jds)
+		group.enable = False
+		cache.updateGroup(group)
+		self.assertDaysEqual(cache, jds)
+
+
+class TestOccurIndex(unittest.TestCase):
+	def getOccur(self, group):
+		return sorted(group.occur.search(
+			group.getStartEpoch(),
+			group.getEndEpoch(),
+		))
+
+	def test_roundTrip(self):
+		group = createGroup(5, calType=calTypes.names.index("hijri"))
+		group.updateOccurrence()
+		occur = self.getOccur(group)
+		self.assertTrue(occur)
+		self.assertEqual(sorted(group.loadOccurIndex()), sorted(group.idList))
+
+		# nothing is changed, all are read from index
+		group.clear()
+		_, _, changedIds = group.loadOccurrenceFromIndex()
+		self.assertEqual(changedIds, [])
+		self.assertEqual(self.getOccur(group), occur)
+
+		# an edited event is calculated again
+		event = group.getEvent(group.idList[2])
+		event.setDay(20)
+		event.save()
+		group.clear()
+		_, _, changedIds = group.loadOccurrenceFromIndex()
+		self.assertEqual(changedIds, [event.id])
+
+		group.updateOccurrence()
+		group.clear()
+		_, _, changedIds = group.loadOccurrenceFromIndex()
+		self.assertEqual(changedIds, [])
+
+	def test_calTypesOptions(self):
+		group = createGroup(3)
+		group.updateOccurrence()
+		self.assertEqual(len(group.loadOccurIndex()), 3)
+		hijriUseDB = hijri.hijriUseDB
+		hijri.hijriUseDB = not hijriUseDB
+		try:
+			self.assertEqual(group.loadOccurIndex(), {})
+		finally:
+			hijri.hijriUseDB = hijriUseDB
+		self.assertEqual(len(group.loadOccurIndex()), 3)
+
+	def test_hijriMonthDb(self):
+		group = createGroup(3)
+		group.updateOccurrence()
+		self.assertEqual(len(group.loadOccurIndex()), 3)
+		monthDb = hijri.monthDb
+		ym = min(monthDb.monthLenByYm)
+		mLen = monthDb.monthLenByYm[ym]
+		monthDb.monthLenByYm[ym] = 59 - mLen
+		try:
+			self.assertEqual(group.loadOccurIndex(), {})
+		finally:
+			monthDb.monthLenByYm[ym] = mLen
+		self.assertEqual(len(group.loadOccurIndex()), 3)
+
+
+class TestOccurDensity(unittest.TestCase):
+	def getExpected(self, group):
+		return OccurDensity.fromStartEpochs(
+			group.startJd,
+			group.endJd,
+			[
+				t0 for t0, _t1, _eid in
+				group.calcOccurrenceSlice(group.startJd, group.endJd)
+			],
+		)
+
+	def editEvent(self, group, index):
+		event = group.getEvent(group.idList[index])
+		event.setDay(event.getDay() % 28 + 1)
+		event.save()
+		group.updateOccurrenceEvent(event)
+
+	def test_lazy(self):
+		group = createGroup(20)
+		group.lazyOccurrence = True
+		group.initOccurrence()
+		group.updateOccurrence()
+		ready = threading.Event()
+		self.assertIsNone(group.getOccurDensity(onReady=ready.set))
+		# changed while being calculated
+		self.editEvent(group, 3)
+		self.assertTrue(ready.wait(10))
+		density = group.getOccurDensity()
+		self.assertIsNotNone(density)
+		self.assertEqual(density.counts, self.getExpected(group).counts)
+		# updated per event, not calculated again
+		self.editEvent(group, 5)
+		group.remove(group.getEvent(group.idList[0]))
+		self.assertIs(group.getOccurDensity(), density)
+		self.assertEqual(density.counts, self.getExpected(group).counts)
+
+	def test_nonLazy(self):
+		group = createGroup(20)
+		group.updateOccurrence()
+		density = group.getOccurDensity()
+		self.assertEqual(density.counts, self.getExpected(group).counts)
+		self.editEvent(group, 7)
+		self.assertIs(group.getOccurDensity(), density)
+		self.assertEqual(density.counts, self.getExpected(group).counts)
+
+
+class TestOccurrenceProcesses(unittest.TestCase):
+	def setUp(self):
+		self.groups = [
+			createGroup(40, calType=calTypes.names.index(calTypeName))
+			for calTypeName in ("gregorian", "jalali", "hijri")
+		]
+		self.holder = event_lib.EventGroupsHolder()
+		self.holder.fs = fs
+		for group in self.groups:
+			self.holder.append(group)
+		self.options = (
+			event_lib.occurProcesses,
+			event_lib.occurProcessesMinEvents,
+			event_lib.occurProcessesStartMethod,
+		)
+		# with "spawn", workers do not inherit options that are changed here
+		event_lib.occurProcessesMinEvents = 0
+		event_lib.occurProcessesStartMethod = "spawn"
+
+	def tearDown(self):
+		(
+			event_lib.occurProcesses,
+			event_lib.occurProcessesMinEvents,
+			event_lib.occurProcessesStartMethod,
+		) = self.options
+
+	def getOccurList(self, processes):
+		event_lib.occurProcesses = processes
+		for group in self.groups:
+			group.removeOccurIndex()
+		self.holder.updateOccurrence()
+		return [
+			sorted(group.occur.search(
+				group.getStartEpoch(),
+				group.getEndEpoch(),
+			))
+			for group in self.groups
+		]
+
+	def test_compareSerial(self):
+		hijriUseDB = hijri.hijriUseDB
+		try:
+			for useDB in (hijriUseDB, not hijriUseDB):
+				hijri.hijriUseDB = useDB
+				cal_types.clearCache()
+				serial = self.getOccurList(1)
+				self.assertTrue(all(serial))
+				self.assertEqual(self.getOccurList(2), serial)
+		finally:
+			hijri.hijriUseDB = hijriUseDB
+			cal_types.clearCache()
+
+
+class TestOccurrenceConfig(unittest.TestCase):
+	def test_localTz(self):
+		config = event_lib.getOccurrenceConfig()
+		jd = core.getCurrentJd()
+		localEpoch = getEpochFromJd(jd)
+		tzName = "Asia/Tehran" if config["localTz"] != "Asia/Tehran" else "UTC"
+		try:
+			event_lib.setOccurrenceConfig(dict(config, localTz=tzName))
+			self.assertEqual(str(core.localTz), tzName)
+			self.assertEqual(
+				getEpochFromJd(jd),
+				getEpochFromJd(jd, natz.gettz(tzName)),
+			)
+			self.assertNotEqual(getEpochFromJd(jd), localEpoch)
+		finally:
+			event_lib.setOccurrenceConfig(config)
+		self.assertEqual(getEpochFromJd(jd), localEpoch)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from scal3 import logger
+log = logger.get()
+
+import heapq
+from threading import RLock
+from time import time as now
+from typing import Optional, List, Tuple, Dict, Callable, Iterator
+
+from scal3.time_utils import getEpochFromJd, getJdFromEpoch
+
+dayLen = 24 * 3600
+
+
+def isDayStart(epoch: float) -> bool:
+	return getEpochFromJd(getJdFromEpoch(epoch)) == epoch
+
+
+def iterOccurStarts(
+	t0: float,
+	t1: float,
+	odt: float,
+	searchStart: float,
+	searchEnd: float,
+) -> "Iterator[float]":
+	"""
+		yields start epochs of occurrence (t0, t1, odt) that is returned
+		by occur.search(searchStart, searchEnd), odt is its whole duration
+
+		consecutive days of an event are stored as one occurrence
+		(see JdOccurSet.getTimeRangeList), so for an occurrence of more
+		than one whole day, start of each day is yielded
+		t0 or t1 that are cut by search are not checked to be start of day
+	"""
+	if not (
+		odt > dayLen + 3600 and
+		(t0 == searchStart or isDayStart(t0)) and
+		(t1 == searchEnd or isDayStart(t1))
+	):
+		yield t0
+		return
+	jd = getJdFromEpoch(t0)
+	if getEpochFromJd(jd) < t0:
+		jd += 1
+	while True:
+		dayStart = getEpochFromJd(jd)
+		if dayStart >= t1:
+			return
+		yield dayStart
+		jd += 1
+
+
+class NotificationScheduler:
+	"""
+		finds the next due notification of all events (with notifiers)
+		in all enabled groups, using occurrences in group.occur
+
+		heap items are (fireEpoch, gid, eid, version), fireEpoch is start of
+		occurrence minus event.getNotifyBeforeSec()
+		heap is filled for a window of `horizon` seconds at a time, so
+		the caller must wake up at getNextTime() (which is the end of window
+		if there is no notification in it), and call popDue()
+
+		an item is stale (and skipped) if version of its event is changed
+		after it was added, this way an event update does not need to
+		search the heap
+
+		onEventUpdate makes it an EventUpdateQueue consumer, `onChange` is
+		called after an update (or a batch of updates), so the caller can
+		re-schedule its timer
+	"""
+
+	# number of events that are loaded in each step of iterRebuild
+	scanChunkSize = 100
+
+	def __init__(
+		self,
+		groups: "EventGroupsHolder",
+		horizon: int = 7 * dayLen,
+		maxLate: int = 3600,
+		onChange: "Optional[Callable[[], None]]" = None,
+	) -> None:
+		self.groups = groups
+		self.horizon = horizon
+		# notifications that are due more than maxLate seconds ago
+		# (for example after system suspend) are dropped
+		self.maxLate = maxLate
+		self.onChange = onChange
+		self._lock = RLock()
+		self.heap = []
+		# gid -> {eid: notifyBeforeSec}, only for events with notifiers
+		self.notifyBefore = {}  # type: Dict[int, Dict[int, float]]
+		self.versions = {}  # type: Dict[int, int]
+		self.firedUntil = 0.0
+		self.filledUntil = 0.0
+		# enabled groups that are not scanned yet by iterRebuild
+		self._pendingGids = set()
+
+	def rebuild(self, epoch: "Optional[float]" = None) -> None:
+		"""
+			loads all events of enabled groups once, to find the ones
+			that have notifiers
+		"""
+		for _ in self.iterRebuild(epoch):
+			pass
+
+	def iterRebuild(self, epoch: "Optional[float]" = None) -> "Iterator[None]":
+		"""
+			same as rebuild, but yields after loading each `scanChunkSize`
+			events, so it can be run step by step in main loop (after main
+			window is shown) instead of loading all events at startup
+
+			notifications of a group are added as soon as it's scanned, and
+			updates (onEventUpdate) can be applied between steps
+		"""
+		if epoch is None:
+			epoch = now()
+		with self._lock:
+			self.heap = []
+			self.notifyBefore = {}
+			self.firedUntil = epoch
+			self.filledUntil = epoch
+			self._pendingGids = {group.id for group in self.groups if group.enable}
+		for group in list(self.groups):
+			gid = group.id
+			idList = list(group.idList)
+			for index in range(0, len(idList), self.scanChunkSize):
+				if gid not in self._pendingGids:
+					# removed or updated (and scanned) in a previous step
+					break
+				with self._lock:
+					idSet = set(group.idList)
+					nbByEid = self.notifyBefore.setdefault(gid, {})
+					failedIds = []
+					for event in group.loadEvents(
+						[
+							eid for eid in idList[index:index + self.scanChunkSize]
+							if eid in idSet
+						],
+						failedIds=failedIds,
+					):
+						if event.notifiers:
+							nbByEid[event.id] = event.getNotifyBeforeSec()
+					group.logFailedIds(failedIds)
+				yield
+			with self._lock:
+				if gid not in self._pendingGids:
+					continue
+				self._pendingGids.discard(gid)
+				if not self.notifyBefore.get(gid):
+					self.notifyBefore.pop(gid, None)
+					continue
+				self._searchGroup(gid, self.firedUntil, self.filledUntil)
+		self.fill(epoch + self.horizon)
+		log.info(
+			f"NotificationScheduler: {self.getEventCount()} events " +
+			f"with notifiers, {len(self.heap)} notifications in window"
+		)
+
+	def getEventCount(self) -> int:
+		return sum(len(nbByEid) for nbByEid in self.notifyBefore.values())
+
+	def scanGroup(self, group: "EventGroup") -> None:
+		nbByEid = {}
+		failedIds = []
+		for event in group.loadEvents(group.idList, failedIds=failedIds):
+			if event.notifiers:
+				nbByEid[event.id] = event.getNotifyBeforeSec()
+		group.logFailedIds(failedIds)
+		if nbByEid:
+			self.notifyBefore[group.id] = nbByEid
+
+	def _push(self, fireEpoch: float, gid: int, eid: int) -> None:
+		heapq.heappush(
+			self.heap,
+			(fireEpoch, gid, eid, self.versions.get(eid, 0)),
+		)
+
+	def _searchGroup(
+		self,
+		gid: int,
+		startEpoch: float,
+		endEpoch: float,
+		eid: "Optional[int]" = None,
+	) -> None:
+		"""
+			adds notifications of group with fire time in [startEpoch, endEpoch)
+			if eid is given, only adds notifications of that event
+		"""
+		nbByEid = self.notifyBefore.get(gid)
+		if not nbByEid or endEpoch <= startEpoch:
+			return
+		group = self.groups[gid]
+		if not group.enable:
+			return
+		if eid is None:
+			maxNb = max(nbByEid.values())
+		else:
+			maxNb = nbByEid.get(eid)
+			if maxNb is None:
+				return
+		# start of an occurrence that is cut by search is startEpoch - 1
+		# which is always filtered out below
+		searchStart = startEpoch - 1
+		searchEnd = endEpoch + maxNb
+		for t0, t1, _eid, odt in group.occur.search(searchStart, searchEnd):
+			if eid is not None and _eid != eid:
+				continue
+			nb = nbByEid.get(_eid)
+			if nb is None:
+				continue
+			for start in iterOccurStarts(t0, t1, odt, searchStart, searchEnd):
+				fireEpoch = start - nb
+				if startEpoch <= fireEpoch < endEpoch:
+					self._push(fireEpoch, gid, _eid)
+
+	def fill(self, endEpoch: float) -> None:
+		"""
+			extends the window of heap until endEpoch
+		"""
+		with self._lock:
+			if endEpoch <= self.filledUntil:
+				return
+			for gid in self.notifyBefore:
+				self._searchGroup(gid, self.filledUntil, endEpoch)
+			self.filledUntil = endEpoch
+
+	def _isStale(self, item: "Tuple[float, int, int, int]") -> bool:
+		return item[3] != self.versions.get(item[2], 0)
+
+	def getNextTime(self) -> "Optional[float]":
+		"""
+			returns the epoch that caller must call popDue() at
+			None if there is no group with notifiers
+		"""
+		with self._lock:
+			while self.heap and self._isStale(self.heap[0]):
+				heapq.heappop(self.heap)
+			if self.heap:
+				return min(self.heap[0][0], self.filledUntil)
+			if not self.notifyBefore:
+				return None
+			return self.filledUntil
+
+	def popDue(self, epoch: "Optional[float]" = None) -> "List[Tuple[int, int]]":
+		"""
+			returns list of (gid, eid) of notifications that are due
+		"""
+		if epoch is None:
+			epoch = now()
+		with self._lock:
+			if epoch >= self.filledUntil:
+				self.fill(epoch + self.horizon)
+			due = []
+			heap = self.heap
+			while heap and heap[0][0] <= epoch:
+				item = heapq.heappop(heap)
+				if self._isStale(item):
+					continue
+				fireEpoch, gid, eid, _ = item
+				if fireEpoch < epoch - self.maxLate:
+					log.info(f"skipping late notification: {gid=}, {eid=}")
+					continue
+				due.append((gid, eid))
+			self.firedUntil = max(self.firedUntil, epoch)
+			return due
+
+	def removeEvent(self, eid: int) -> None:
+		with self._lock:
+			for nbByEid in self.notifyBefore.values():
+				nbByEid.pop(eid, None)
+			self.versions[eid] = self.versions.get(eid, 0) + 1
+
+	def updateEvent(self, event: "Event") -> None:
+		with self._lock:
+			self.removeEvent(event.id)
+			group = event.parent
+			if getattr(group, "occur", None) is None:  # trash
+				return
+			if not (group.enable and event.notifiers):
+				return
+			self.notifyBefore.setdefault(group.id, {})[event.id] = \
+				event.getNotifyBeforeSec()
+			if group.id in self._pendingGids:
+				# searched by iterRebuild after the group is scanned
+				return
+			self._searchGroup(
+				group.id,
+				self.firedUntil,
+				self.filledUntil,
+				eid=event.id,
+			)
+
+	def removeGroup(self, gid: int) -> None:
+		with self._lock:
+			self._pendingGids.discard(gid)
+			for eid in self.notifyBefore.pop(gid, {}):
+				self.versions[eid] = self.versions.get(eid, 0) + 1
+
+	def updateGroup(self, group: "EventGroup") -> None:
+		with self._lock:
+			self.removeGroup(group.id)
+			if not group.enable:
+				return
+			self.scanGroup(group)
+			self._searchGroup(group.id, self.firedUntil, self.filledUntil)
+
+	def onEventUpdateBatch(self, records: "List[EventUpdateRecord]") -> None:
+		for record in records:
+			self._onEventUpdate(record)
+		if self.onChange is not None:
+			self.onChange()
+
+	def onEventUpdate(self, record: "EventUpdateRecord") -> None:
+		self._onEventUpdate(record)
+		if self.onChange is not None:
+			self.onChange()
+
+	def _onEventUpdate(self, record: "EventUpdateRecord") -> None:
+		action = record.action
+		obj = record.obj
+		if action in ("+", "e", "v"):
+			self.updateEvent(obj)
+		elif action == "-":
+			self.removeEvent(obj.id)
+		elif action in ("r", "eg", "+g"):
+			if getattr(obj, "occur", None) is not None:
+				self.updateGroup(obj)
+		elif action == "-g":
+			self.removeGroup(obj.id)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.time_utils import getEpochFromJd, getJdFromEpoch
+from scal3.event_search_tree import EventSearchTree
+from scal3.event_notify import NotificationScheduler
+
+dayLen = 24 * 3600
+startEpoch = 1600000000
+
+
+class MockEvent:
+	def __init__(self, _id, parent, notifyBefore=0, notifiers=True):
+		self.id = _id
+		self.parent = parent
+		self.notifyBefore = notifyBefore
+		self.notifiers = ["alarm"] if notifiers else []
+
+	def getNotifyBeforeSec(self):
+		return self.notifyBefore
+
+
+class MockGroup:
+	def __init__(self, _id):
+		self.id = _id
+		self.enable = True
+		self.occur = EventSearchTree()
+		self.events = {}
+		self.idList = []
+
+	def add(self, event, startList, duration=3600):
+		self.events[event.id] = event
+		self.idList.append(event.id)
+		for t0 in startList:
+			self.occur.add(t0, t0 + duration, event.id)
+
+	def addDays(self, event, jdRanges):
+		"""
+			consecutive days are one occurrence, like JdOccurSet
+		"""
+		self.events[event.id] = event
+		self.idList.append(event.id)
+		for jd0, jd1 in jdRanges:
+			self.occur.add(getEpochFromJd(jd0), getEpochFromJd(jd1), event.id)
+
+	def loadEvents(self, eids, failedIds=None):
+		for eid in eids:
+			yield self.events[eid]
+
+	def logFailedIds(self, failedIds):
+		pass
+
+
+class MockGroupsHolder(list):
+	def __getitem__(self, gid):
+		for group in self:
+			if group.id == gid:
+				return group
+		raise KeyError(gid)
+
+
+class MockRecord:
+	def __init__(self, action, obj):
+		self.action = action
+		self.obj = obj
+
+
+class TestNotificationScheduler(unittest.TestCase):
+	def setUp(self):
+		group1 = MockGroup(1)
+		group2 = MockGroup(2)
+		# daily at startEpoch + 10h, notify 10 minutes before
+		group1.add(
+			MockEvent(11, group1, notifyBefore=600),
+			[startEpoch + i * dayLen + 36000 for i in range(30)],
+		)
+		# no notifiers
+		group1.add(
+			MockEvent(12, group1, notifiers=False),
+			[startEpoch + i * dayLen for i in range(30)],
+		)
+		# once, at day 3
+		group2.add(
+			MockEvent(21, group2),
+			[startEpoch + 3 * dayLen],
+		)
+		self.group1 = group1
+		self.group2 = group2
+		self.groups = MockGroupsHolder([group1, group2])
+		self.sched = NotificationScheduler(self.groups, horizon=2 * dayLen)
+		self.sched.rebuild(startEpoch)
+
+	def runUntil(self, endEpoch):
+		"""
+			simulates a timer that sleeps until getNextTime()
+			returns list of (epoch, gid, eid), and number of wake-ups
+		"""
+		fired = []
+		wakeups = 0
+		while True:
+			nextTime = self.sched.getNextTime()
+			if nextTime is None or nextTime >= endEpoch:
+				return fired, wakeups
+			wakeups += 1
+			for gid, eid in self.sched.popDue(nextTime):
+				fired.append((nextTime, gid, eid))
+
+	def test_fire(self):
+		fired, wakeups = self.runUntil(startEpoch + 5 * dayLen)
+		self.assertEqual(fired, [
+			(startEpoch + 36000 - 600, 1, 11),
+			(startEpoch + dayLen + 36000 - 600, 1, 11),
+			(startEpoch + 2 * dayLen + 36000 - 600, 1, 11),
+			(startEpoch + 3 * dayLen, 2, 21),
+			(startEpoch + 3 * dayLen + 36000 - 600, 1, 11),
+			(startEpoch + 4 * dayLen + 36000 - 600, 1, 11),
+		])
+		# one extra wake-up for each window
+		self.assertLessEqual(wakeups, len(fired) + 3)
+
+	def test_update(self):
+		sched = self.sched
+		event = self.group1.events[11]
+		event.notifyBefore = 3600
+		sched.onEventUpdate(MockRecord("e", event))
+		sched.onEventUpdate(MockRecord("-", self.group2.events[21]))
+		fired, _ = self.runUntil(startEpoch + 2 * dayLen)
+		self.assertEqual(fired, [
+			(startEpoch + 36000 - 3600, 1, 11),
+			(startEpoch + dayLen + 36000 - 3600, 1, 11),
+		])
+		# disabled group
+		self.group1.enable = False
+		sched.onEventUpdate(MockRecord("eg", self.group1))
+		fired, _ = self.runUntil(startEpoch + 5 * dayLen)
+		self.assertEqual(fired, [])
+
+	def test_late(self):
+		# like after a system suspend of 3 days
+		self.assertEqual(
+			self.sched.popDue(startEpoch + 3 * dayLen + 60),
+			[(2, 21)],
+		)
+
+	def test_iterRebuild(self):
+		fullFired, _ = self.runUntil(startEpoch + 5 * dayLen)
+		sched = NotificationScheduler(self.groups, horizon=2 * dayLen)
+		sched.scanChunkSize = 1
+		steps = sched.iterRebuild(startEpoch)
+		# group1 is partly scanned
+		next(steps)
+		# update of a scanned event, and of a group that is not scanned yet
+		sched.onEventUpdate(MockRecord("e", self.group1.events[11]))
+		sched.onEventUpdate(MockRecord("eg", self.group2))
+		stepCount = 1 + sum(1 for _ in steps)
+		self.assertEqual(stepCount, 2)
+		self.sched = sched
+		fired, _ = self.runUntil(startEpoch + 5 * dayLen)
+		self.assertEqual(fired, fullFired)
+
+	def test_iterRebuild_removeGroup(self):
+		sched = NotificationScheduler(self.groups, horizon=2 * dayLen)
+		sched.scanChunkSize = 1
+		steps = sched.iterRebuild(startEpoch)
+		next(steps)
+		sched.onEventUpdate(MockRecord("-g", self.group1))
+		for _ in steps:
+			pass
+		self.sched = sched
+		fired, _ = self.runUntil(startEpoch + 5 * dayLen)
+		self.assertEqual(fired, [(startEpoch + 3 * dayLen, 2, 21)])
+
+
+class TestNotificationSchedulerDays(unittest.TestCase):
+	def test_days(self):
+		startJd = getJdFromEpoch(startEpoch) + 1
+		group = MockGroup(1)
+		# every day, for 15 years, started before startEpoch
+		group.addDays(
+			MockEvent(11, group, notifyBefore=600),
+			[(startJd - 10, startJd + 15 * 365)],
+		)
+		# monday to friday, for 5 weeks
+		mondayJd = startJd + (-startJd) % 7
+		group.addDays(
+			MockEvent(12, group),
+			[
+				(mondayJd + 7 * week, mondayJd + 7 * week + 5)
+				for week in range(5)
+			],
+		)
+		# an interval of 2 days, that is not from start of day
+		group.add(
+			MockEvent(13, group),
+			[getEpochFromJd(startJd) + 3600],
+			duration=2 * dayLen,
+		)
+		sched = NotificationScheduler(
+			MockGroupsHolder([group]),
+			horizon=2 * dayLen,
+		)
+		sched.rebuild(startEpoch)
+		fired = []
+		endEpoch = getEpochFromJd(startJd + 20)
+		while True:
+			nextTime = sched.getNextTime()
+			if nextTime >= endEpoch:
+				break
+			for gid, eid in sched.popDue(nextTime):
+				fired.append((nextTime, eid))
+		weekDayJds = {
+			mondayJd + 7 * week + day
+			for week in range(5)
+			for day in range(5)
+		}
+		expected = sorted(
+			[
+				(getEpochFromJd(jd) - 600, 11)
+				for jd in range(startJd, startJd + 21)
+				if getEpochFromJd(jd) - 600 < endEpoch
+			] + [
+				(getEpochFromJd(jd), 12)
+				for jd in range(startJd, startJd + 20)
+				if jd in weekDayJds
+			] + [
+				(getEpochFromJd(startJd) + 3600, 13),
+			]
+		)
+		self.assertEqual(sorted(fired), expected)
+		self.assertIn((getEpochFromJd(mondayJd + 4), 12), fired)
+		self.assertNotIn((getEpochFromJd(mondayJd + 5), 12), fired)
+		self.assertNotIn((getEpochFromJd(mondayJd + 6), 12), fired)
+
+
+if __name__ == "__main__":
+	unittest.main()
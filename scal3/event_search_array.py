@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/lgpl.txt>.
+# Also avalable in /usr/share/common-licenses/LGPL on Debian systems
+# or /usr/share/licenses/common/LGPL/license.txt on ArchLinux
+
+from scal3 import logger
+log = logger.get()
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from scal3.event_search_tree import epsTm
+
+# unsorted items are sorted and merged into sorted items (instead of
+# sorting all) if they are not more than 1/mergeMaxRatio of all items
+mergeMaxRatio = 4
+
+
+class EventSearchArray:
+	"""
+		Alternative to EventSearchTree with the same API, that keeps
+		occurrences in 3 flat arrays (mt, dt, eid) sorted by (mt, dt)
+		instead of a tree of Node and MaxHeap objects
+		mt is middle time and dt is half of duration, like EventSearchTree
+
+		add() only appends to the arrays, and they are sorted on the first
+		search after that, so filling it in updateOccurrence is a bulk build
+		a few items added after that (editing an event) are sorted and
+		merged into sorted items instead
+
+		search() looks at mt values in (t0 - maxDt, t1 + maxDt), so it is
+		slower when the group has very long occurrences
+
+		delete() does not remove items from arrays, it only increases
+		generation of event, items of older generations are skipped and
+		removed together when they are more than the rest (by compact)
+	"""
+
+	def __init__(self):
+		self.clear()
+
+	def clear(self):
+		self.mtArr = array("d")
+		self.dtArr = array("d")
+		self.eidArr = array("q")
+		self.genArr = array("I")
+		self.maxDt = 0.0
+		self.sorted = True
+		self.sortedCount = 0  # number of sorted items at start of arrays
+		# byId: eid -> [count, firstMt, firstDt, lastMt, lastDt]
+		self.byId = {}
+		# genById: eid -> generation, increased by delete
+		self.genById = {}
+		self.deletedCount = 0
+
+	def __len__(self):
+		return len(self.eidArr) - self.deletedCount
+
+	def isDeleted(self, index):
+		return self.genArr[index] != self.genById[self.eidArr[index]]
+
+	def add(self, t0, t1, eid, debug=False):
+		if debug:
+			from time import strftime, localtime
+			f = "%F, %T"
+			log.info(
+				f"EventSearchArray.add: {eid}\t{strftime(f, localtime(t0))}" +
+				f"\t{strftime(f, localtime(t1))}"
+			)
+		###
+		if t0 > t1:
+			return
+		if t0 == t1:
+			t1 += epsTm
+		mt = (t0 + t1) / 2.0
+		dt = (t1 - t0) / 2.0
+		###
+		mtArr = self.mtArr
+		if self.sorted:
+			if mtArr and (mt, dt) < (mtArr[-1], self.dtArr[-1]):
+				self.sorted = False
+			else:
+				self.sortedCount += 1
+		mtArr.append(mt)
+		self.dtArr.append(dt)
+		self.eidArr.append(eid)
+		self.genArr.append(self.genById.setdefault(eid, 0))
+		if dt > self.maxDt:
+			self.maxDt = dt
+		###
+		item = self.byId.get(eid)
+		if item is None:
+			self.byId[eid] = [1, mt, dt, mt, dt]
+			return
+		item[0] += 1
+		if (mt, dt) < (item[1], item[2]):
+			item[1] = mt
+			item[2] = dt
+		if (mt, dt) > (item[3], item[4]):
+			item[3] = mt
+			item[4] = dt
+
+	def sort(self):
+		if self.sorted:
+			return
+		mtArr = self.mtArr
+		dtArr = self.dtArr
+		if (len(mtArr) - self.sortedCount) * mergeMaxRatio <= len(mtArr):
+			self.mergeUnsorted()
+		else:
+			order = sorted(
+				range(len(mtArr)),
+				key=lambda i: (mtArr[i], dtArr[i]),
+			)
+			self.takeItems(order)
+		self.sorted = True
+		self.sortedCount = len(self.mtArr)
+
+	def mergeUnsorted(self):
+		"""
+			sorts items after sortedCount and merges them into sorted items
+			arrays are copied by slices, not item by item
+		"""
+		start = self.sortedCount
+		arrays = (self.mtArr, self.dtArr, self.eidArr, self.genArr)
+		items = sorted(zip(*[arr[start:] for arr in arrays]))
+		mtArr = self.mtArr
+		dtArr = self.dtArr
+		positions = []
+		index = 0
+		for item in items:
+			mt, dt = item[:2]
+			index = bisect_right(mtArr, mt, index, start)
+			while index > 0 and mtArr[index - 1] == mt and dtArr[index - 1] > dt:
+				index -= 1
+			positions.append(index)
+		newArrays = []
+		for arrIndex, arr in enumerate(arrays):
+			newArr = array(arr.typecode)
+			prev = 0
+			for pos, item in zip(positions, items):
+				newArr += arr[prev:pos]
+				newArr.append(item[arrIndex])
+				prev = pos
+			newArr += arr[prev:start]
+			newArrays.append(newArr)
+		self.mtArr, self.dtArr, self.eidArr, self.genArr = newArrays
+
+	def takeItems(self, indexes):
+		"""
+			keeps only items of given indexes, in that order
+		"""
+		mtArr = self.mtArr
+		dtArr = self.dtArr
+		eidArr = self.eidArr
+		genArr = self.genArr
+		self.mtArr = array("d", [mtArr[i] for i in indexes])
+		self.dtArr = array("d", [dtArr[i] for i in indexes])
+		self.eidArr = array("q", [eidArr[i] for i in indexes])
+		self.genArr = array("I", [genArr[i] for i in indexes])
+
+	def compact(self):
+		"""
+			removes deleted items from arrays
+		"""
+		if not self.deletedCount:
+			return
+		keep = [
+			index for index in range(len(self.eidArr))
+			if not self.isDeleted(index)
+		]
+		self.takeItems(keep)
+		self.sortedCount = bisect_left(keep, self.sortedCount)
+		self.maxDt = max(self.dtArr, default=0.0)
+		self.genById = {eid: self.genById[eid] for eid in self.byId}
+		self.deletedCount = 0
+
+	def search(self, t0, t1):
+		self.sort()
+		mtArr = self.mtArr
+		dtArr = self.dtArr
+		eidArr = self.eidArr
+		checkDeleted = self.deletedCount > 0
+		start = bisect_right(mtArr, t0 - self.maxDt)
+		end = bisect_left(mtArr, t1 + self.maxDt)
+		for index in range(start, end):
+			mt = mtArr[index]
+			dt = dtArr[index]
+			if mt - dt < t1 and mt + dt > t0:
+				if checkDeleted and self.isDeleted(index):
+					continue
+				yield (
+					max(t0, mt - dt),
+					min(t1, mt + dt),
+					eidArr[index],
+					2 * dt,
+				)
+
+	def getLastBefore(self, t1):
+		self.sort()
+		index = bisect_left(self.mtArr, t1) - 1
+		if self.deletedCount:
+			while index >= 0 and self.isDeleted(index):
+				index -= 1
+		if index < 0:
+			return
+		mt = self.mtArr[index]
+		dt = self.dtArr[index]
+		return (
+			mt - dt,
+			mt + dt,
+			self.eidArr[index],
+		)
+
+	def delete(self, eid):
+		item = self.byId.pop(eid, None)
+		if item is None:
+			return 0
+		self.genById[eid] += 1
+		self.deletedCount += item[0]
+		if self.deletedCount * 2 > len(self.eidArr):
+			self.compact()
+		return item[0]
+
+	def getLastOfEvent(self, eid):
+		item = self.byId.get(eid)
+		if item is None:
+			return
+		mt, dt = item[3], item[4]
+		return (
+			mt - dt,
+			mt + dt,
+		)
+
+	def getFirstOfEvent(self, eid):
+		item = self.byId.get(eid)
+		if item is None:
+			return
+		mt, dt = item[1], item[2]
+		return (
+			mt - dt,
+			mt + dt,
+		)
+
+	def getDepth(self):
+		return 1 if len(self) else 0
+
+	def calcAvgDepth(self):
+		"""
+			like EventSearchTree, returns None if it's empty
+		"""
+		if len(self):
+			return 0.0
+		return None
+
+	def getMemorySize(self):
+		"""
+			returns approximate number of bytes used by arrays
+		"""
+		return sum(
+			arr.itemsize * len(arr)
+			for arr in (self.mtArr, self.dtArr, self.eidArr, self.genArr)
+		) + 5 * 8 * len(self.byId)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import join, dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3 import logger
+log = logger.get()
+
+import random
+
+from scal3 import event_search_tree
+from scal3.event_search_tree import EventSearchTree
+from scal3.event_search_array import EventSearchArray
+
+
+def getRandomOccurList(eventCount, weekCount, startEpoch=1500000000):
+	"""
+		weekly events with random durations, like a time table
+	"""
+	ls = []
+	for eid in range(1, eventCount + 1):
+		offset = random.randint(0, 7 * 24 * 3600)
+		duration = random.choice((0, 1800, 3600, 5400, 24 * 3600))
+		for week in range(weekCount):
+			t0 = startEpoch + week * 7 * 24 * 3600 + offset
+			ls.append((t0, t0 + duration, eid))
+	return ls
+
+
+def fill(obj, occurList):
+	for t0, t1, eid in occurList:
+		obj.add(t0, t1, eid)
+	return obj
+
+
+class TestEventSearchArray(unittest.TestCase):
+	def setUp(self):
+		random.seed(1)
+		self.occurList = getRandomOccurList(30, 20)
+		random.shuffle(self.occurList)
+		self.tree = fill(EventSearchTree(), self.occurList)
+		self.arr = fill(EventSearchArray(), self.occurList)
+
+	def assertSameSearch(self, t0, t1):
+		self.assertEqual(
+			sorted(self.arr.search(t0, t1)),
+			sorted(self.tree.search(t0, t1)),
+		)
+
+	def test_search(self):
+		start = min(t0 for t0, _, _ in self.occurList)
+		end = max(t1 for _, t1, _ in self.occurList)
+		for _ in range(200):
+			t0 = random.uniform(start - 3600, end)
+			t1 = t0 + random.choice((60, 3600, 24 * 3600, 7 * 24 * 3600))
+			self.assertSameSearch(t0, t1)
+		self.assertSameSearch(start - 10, end + 10)
+
+	def test_firstLast(self):
+		for eid in range(1, 31):
+			self.assertEqual(
+				self.arr.getFirstOfEvent(eid),
+				self.tree.getFirstOfEvent(eid),
+			)
+			self.assertEqual(
+				self.arr.getLastOfEvent(eid),
+				self.tree.getLastOfEvent(eid),
+			)
+		self.assertIsNone(self.arr.getFirstOfEvent(1000))
+
+	def test_getLastBefore(self):
+		start = min(t0 for t0, _, _ in self.occurList)
+		self.assertIsNone(self.arr.getLastBefore(start))
+		end = max(t1 for _, t1, _ in self.occurList)
+		self.assertIsNone(self.tree.getLastBefore(start))
+		t1 = start + 30 * 24 * 3600
+		res = self.arr.getLastBefore(t1)
+		self.assertLess((res[0] + res[1]) / 2, t1)
+		self.assertEqual(res, self.tree.getLastBefore(t1))
+		for _ in range(100):
+			t1 = random.uniform(start, end + 3600)
+			self.assertEqual(
+				self.arr.getLastBefore(t1),
+				self.tree.getLastBefore(t1),
+			)
+		# after deleting the last one
+		t1 = end + 3600
+		eid = self.arr.getLastBefore(t1)[2]
+		self.arr.delete(eid)
+		self.tree.delete(eid)
+		self.assertEqual(self.arr.getLastBefore(t1), self.tree.getLastBefore(t1))
+		self.assertNotEqual(self.arr.getLastBefore(t1)[2], eid)
+
+	def test_delete(self):
+		for eid in (3, 7, 8):
+			self.assertEqual(self.arr.delete(eid), self.tree.delete(eid))
+		self.assertEqual(self.arr.delete(3), 0)
+		self.assertEqual(len(self.arr), len(self.occurList) - 60)
+		self.assertEqual(
+			sorted(eid for _, _, eid, _ in self.arr.search(0, 2 ** 32)),
+			sorted(
+				eid for _, _, eid in self.occurList
+				if eid not in (3, 7, 8)
+			),
+		)
+
+	def test_deleteAdd(self):
+		self.arr.delete(5)
+		self.assertEqual(self.arr.deletedCount, 20)
+		# added again, like GroupEvent.updateOccurrenceEvent
+		occurList = [item for item in self.occurList if item[2] == 5]
+		for t0, t1, eid in occurList[:10]:
+			self.arr.add(t0 + 60, t1 + 60, eid)
+		self.assertEqual(len(self.arr), len(self.occurList) - 10)
+		self.assertEqual(
+			sorted(
+				(t0, t1)
+				for t0, t1, eid, _ in self.arr.search(0, 2 ** 32)
+				if eid == 5
+			),
+			sorted((t0 + 60, t1 + 60) for t0, t1, _ in occurList[:10]),
+		)
+		self.assertEqual(
+			self.arr.getFirstOfEvent(5),
+			min((t0 + 60, t1 + 60) for t0, t1, _ in occurList[:10]),
+		)
+		self.assertEqual(self.arr.delete(5), 10)
+
+	def assertSorted(self):
+		arr = self.arr
+		keys = list(zip(arr.mtArr, arr.dtArr))
+		self.assertEqual(keys, sorted(keys))
+		self.assertEqual(arr.sortedCount, len(arr.eidArr))
+
+	def test_mergeUnsorted(self):
+		self.assertSameSearch(0, 2 ** 32)
+		self.assertSorted()
+		t0, t1, _ = self.occurList[0]
+		newItems = [
+			(t0, t1 + 10, 100),  # same start, longer
+			(t0 + 5, t1 - 5, 101),  # same middle, shorter
+			(t0 - 3600, t0 + 3600, 102),
+			(10, 20, 103),  # before all
+			(2 ** 31, 2 ** 31 + 1, 104),  # after all
+		]
+		for item in newItems:
+			self.arr.add(*item)
+			self.tree.add(*item)
+		self.assertLess(self.arr.sortedCount, len(self.arr.eidArr))
+		self.assertSameSearch(0, 2 ** 32)
+		self.assertSameSearch(t0 - 60, t0 + 60)
+		self.assertSorted()
+		self.assertEqual(len(self.arr), len(self.occurList) + 5)
+		# edit an event, like GroupEvent.updateOccurrenceEvent
+		self.arr.delete(5)
+		self.tree.delete(5)
+		for t0, t1, eid in self.occurList:
+			if eid == 5:
+				self.arr.add(t0 - 7200, t1 - 7200, eid)
+				self.tree.add(t0 - 7200, t1 - 7200, eid)
+		self.assertSameSearch(0, 2 ** 32)
+		self.assertSorted()
+
+	def test_compact(self):
+		for eid in range(1, 16):
+			self.arr.delete(eid)
+		self.assertEqual(self.arr.deletedCount, 300)
+		self.assertEqual(len(self.arr.eidArr), 600)
+		self.arr.delete(16)
+		# compacted when more than half are deleted
+		self.assertEqual(self.arr.deletedCount, 0)
+		self.assertEqual(len(self.arr.eidArr), 280)
+		self.assertEqual(len(self.arr), 280)
+		self.assertEqual(set(self.arr.genById), set(range(17, 31)))
+		self.assertEqual(
+			self.arr.maxDt,
+			max(
+				(t1 - t0) / 2 or event_search_tree.epsTm / 2
+				for t0, t1, eid in self.occurList
+				if eid > 16
+			),
+		)
+		for eid in range(1, 17):
+			self.tree.delete(eid)
+		self.assertSameSearch(0, 2 ** 32)
+
+	def test_empty(self):
+		for obj in (EventSearchTree(), EventSearchArray()):
+			self.assertIsNone(obj.calcAvgDepth())
+			self.assertEqual(obj.getDepth(), 0)
+			self.assertIsNone(obj.getLastBefore(2 ** 32))
+		for eid in range(1, 31):
+			self.arr.delete(eid)
+			self.tree.delete(eid)
+		self.assertEqual(len(self.arr), 0)
+		self.assertIsNone(self.arr.calcAvgDepth())
+		self.assertIsNone(self.tree.calcAvgDepth())
+		self.assertEqual(self.arr.getDepth(), self.tree.getDepth())
+		self.assertIsNone(self.arr.getLastBefore(2 ** 32))
+		self.assertEqual(list(self.arr.search(0, 2 ** 32)), [])
+
+	def test_deleteSearch(self):
+		start = min(t0 for t0, _, _ in self.occurList)
+		end = max(t1 for _, t1, _ in self.occurList)
+		for eid in range(1, 31, 2):
+			self.assertEqual(self.arr.delete(eid), self.tree.delete(eid))
+			for _ in range(20):
+				t0 = random.uniform(start - 3600, end)
+				self.assertSameSearch(t0, t0 + random.choice((3600, 24 * 3600)))
+		self.assertSameSearch(start - 10, end + 10)
+
+
+def benchmark(eventCount=200, weekCount=52 * 15, searchCount=2000):
+	"""
+		compare memory and search() time of EventSearchTree and EventSearchArray
+	"""
+	import tracemalloc
+	from time import perf_counter
+	occurList = getRandomOccurList(eventCount, weekCount)
+	start = min(t0 for t0, _, _ in occurList)
+	end = max(t1 for _, t1, _ in occurList)
+	windows = []
+	for _ in range(searchCount):
+		t0 = random.uniform(start, end)
+		windows.append((t0, t0 + 7 * 24 * 3600))
+	for cls in (EventSearchTree, EventSearchArray):
+		tracemalloc.start()
+		t0 = perf_counter()
+		obj = fill(cls(), occurList)
+		list(obj.search(start, start + 1))  # sorts EventSearchArray
+		buildTime = perf_counter() - t0
+		mem = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		t0 = perf_counter()
+		for w0, w1 in windows:
+			for _ in obj.search(w0, w1):
+				pass
+		searchTime = perf_counter() - t0
+		log.info(
+			f"{cls.__name__}: count={len(occurList)}, " +
+			f"memory={mem / 1024 ** 2:.1f} MiB, " +
+			f"build={buildTime * 1000:.0f} ms, " +
+			f"search={searchTime / searchCount * 1000000:.0f} us"
+		)
+
+
+if __name__ == "__main__":
+	benchmark()
+	unittest.main()
@@ -62,6 +62,16 @@ class Node:
 		self.updateMinMaxChild(self.left)
 		self.updateMinMaxChild(self.right)
 
+	def resetMinMax(self):
+		"""
+			calculates min_t and max_t again, after deleting events
+			or changing children
+		"""
+		dt = self.events.getMax()[0] if self.events else 0
+		self.min_t = self.mt - dt
+		self.max_t = self.mt + dt
+		self.updateMinMax()
+
 	def updateMinMaxChild(self, child):
 		if child:
 			if child.min_t < self.min_t:
@@ -293,6 +303,8 @@ class EventSearchTree:
 				node.right = self.deleteMinNode(node2.right)
 				node.left = node2.left
 		# node.updateCount()
+		# min_t and max_t of replacing node does not cover its new children
+		node.resetMinMax()
 		return node
 
 	def delete(self, eid):
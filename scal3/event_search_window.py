@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/lgpl.txt>.
+# Also avalable in /usr/share/common-licenses/LGPL on Debian systems
+# or /usr/share/licenses/common/LGPL/license.txt on ArchLinux
+
+from scal3 import logger
+log = logger.get()
+
+from collections import OrderedDict
+
+from scal3.time_utils import getEpochFromJd, getJdFromEpoch
+from scal3.event_search_tree import EventSearchTree
+
+
+class Slice:
+	def __init__(self, engine, startEpoch, endEpoch):
+		self.engine = engine
+		self.startEpoch = startEpoch
+		self.endEpoch = endEpoch
+		self.count = 0
+		# parts of occurrences that are cut by the start or end of slice
+		# eid -> (t0, t1)
+		self.startParts = {}
+		self.endParts = {}
+
+	def add(self, t0, t1, eid):
+		self.engine.add(t0, t1, eid)
+		self.count += 1
+		if t0 == self.startEpoch and t1 > t0:
+			self.startParts[eid] = (t0, t1)
+		if t1 == self.endEpoch and t1 > t0:
+			self.endParts[eid] = (t0, t1)
+
+	def delete(self, eid):
+		n = self.engine.delete(eid)
+		self.count -= n
+		self.startParts.pop(eid, None)
+		self.endParts.pop(eid, None)
+		return n
+
+	def isStartPart(self, eid, t0, t1):
+		part = self.startParts.get(eid)
+		return part is not None and part[0] <= t0 and t1 <= part[1]
+
+	def isEndPart(self, eid, t0, t1):
+		part = self.endParts.get(eid)
+		return part is not None and part[0] <= t0 and t1 <= part[1]
+
+
+class WindowedEventSearch:
+	"""
+		Same API as EventSearchTree, but occurrences are calculated lazily,
+		one slice of `sliceDays` days at a time, when a search needs them
+
+		calcSlice(startJd, endJd, eids) must return an iterable of
+		(t0, t1, eid) for the given events (or all events if eids is None)
+		in that jd range, cut to the start and end of that range
+
+		each slice has its own search engine, and least recently used slices
+		are dropped when total count of occurrences is more than `maxCount`
+
+		an occurrence that is cut by slice boundaries is merged back
+		in search results
+	"""
+
+	def __init__(
+		self,
+		calcSlice,
+		startJd,
+		endJd,
+		engineClass=EventSearchTree,
+		sliceDays=64,
+		maxCount=50000,
+	):
+		self.calcSlice = calcSlice
+		self.startJd = startJd
+		self.endJd = endJd
+		self.engineClass = engineClass
+		self.sliceDays = sliceDays
+		self.maxCount = maxCount
+		self.clear()
+
+	def clear(self):
+		# key is slice index, value is Slice object
+		self.slices = OrderedDict()
+		self.count = 0
+
+	def getSliceCount(self):
+		if self.endJd <= self.startJd:
+			return 0
+		return (self.endJd - 1 - self.startJd) // self.sliceDays + 1
+
+	def getSliceRange(self, index):
+		startJd = self.startJd + index * self.sliceDays
+		return startJd, min(startJd + self.sliceDays, self.endJd)
+
+	def getSliceIndexList(self, startJd, endJd):
+		startJd = max(startJd, self.startJd)
+		endJd = min(endJd, self.endJd)
+		if startJd >= endJd:
+			return []
+		return list(range(
+			(startJd - self.startJd) // self.sliceDays,
+			(endJd - 1 - self.startJd) // self.sliceDays + 1,
+		))
+
+	def loadSlice(self, index):
+		_slice = self.slices.get(index)
+		if _slice is not None:
+			self.slices.move_to_end(index)
+			return _slice
+		startJd, endJd = self.getSliceRange(index)
+		_slice = Slice(
+			self.engineClass(),
+			getEpochFromJd(startJd),
+			getEpochFromJd(endJd),
+		)
+		for t0, t1, eid in self.calcSlice(startJd, endJd, None):
+			_slice.add(t0, t1, eid)
+		self.slices[index] = _slice
+		self.count += _slice.count
+		return _slice
+
+	def evict(self, keep=()):
+		for index in list(self.slices):
+			if self.count <= self.maxCount:
+				break
+			if index in keep:
+				continue
+			self.count -= self.slices.pop(index).count
+			log.debug(f"WindowedEventSearch: dropped slice {index}")
+
+	def getLoadedCount(self):
+		return self.count
+
+	def add(self, t0, t1, eid, debug=False):
+		"""
+			adds to loaded slices that overlap with (t0, t1)
+			reloadEvent is preferred for updating an event
+		"""
+		startJd = getJdFromEpoch(t0)
+		endJd = getJdFromEpoch(t1) + 1
+		for index in self.getSliceIndexList(startJd, endJd):
+			_slice = self.slices.get(index)
+			if _slice is None:
+				continue
+			_slice.add(
+				max(t0, _slice.startEpoch),
+				min(t1, _slice.endEpoch),
+				eid,
+			)
+			self.count += 1
+
+	def delete(self, eid):
+		n = 0
+		for _slice in self.slices.values():
+			n += _slice.delete(eid)
+		self.count -= n
+		return n
+
+	def reloadEvent(self, eid):
+		"""
+			re-calculates occurrences of one event in loaded slices
+			returns (deletedCount, addedCount)
+		"""
+		deleted = self.delete(eid)
+		added = 0
+		for index, _slice in self.slices.items():
+			count = _slice.count
+			startJd, endJd = self.getSliceRange(index)
+			for t0, t1, _eid in self.calcSlice(startJd, endJd, [eid]):
+				_slice.add(t0, t1, _eid)
+			added += _slice.count - count
+		self.count += added
+		return deleted, added
+
+	def getDurationBefore(self, eid, index):
+		"""
+			total duration of parts of occurrence of `eid` that are
+			in slices before `index`, and continue to slice `index`
+		"""
+		total = 0
+		for index in range(index - 1, -1, -1):
+			_slice = self.loadSlice(index)
+			part = _slice.endParts.get(eid)
+			if part is None:
+				break
+			total += part[1] - part[0]
+			if _slice.startParts.get(eid) != part:
+				break
+		return total
+
+	def getDurationAfter(self, eid, index):
+		total = 0
+		for index in range(index + 1, self.getSliceCount()):
+			_slice = self.loadSlice(index)
+			part = _slice.startParts.get(eid)
+			if part is None:
+				break
+			total += part[1] - part[0]
+			if _slice.endParts.get(eid) != part:
+				break
+		return total
+
+	def search(self, t0, t1):
+		indexList = self.getSliceIndexList(
+			getJdFromEpoch(t0) - 1,
+			getJdFromEpoch(t1) + 2,
+		)
+		items = []
+		for index in indexList:
+			_slice = self.loadSlice(index)
+			for it0, it1, eid, odt in _slice.engine.search(t0, t1):
+				items.append((it0, it1, eid, odt, index))
+		items.sort(key=lambda item: (item[2], item[0]))
+		# merge parts of an occurrence that is cut by slice boundaries
+		# each merged item is [t0, t1, eid, odt, firstPart, lastPart]
+		# where firstPart and lastPart are (t0, t1, sliceIndex)
+		merged = []
+		for it0, it1, eid, odt, index in items:
+			part = (it0, it1, index)
+			if merged and merged[-1][2] == eid and it0 <= merged[-1][1]:
+				last = merged[-1]
+				last[1] = max(last[1], it1)
+				last[3] += odt
+				last[5] = part
+				continue
+			merged.append([it0, it1, eid, odt, part, part])
+		for it0, it1, eid, odt, firstPart, lastPart in merged:
+			# add duration of parts that are outside (t0, t1)
+			if it0 == t0:
+				pt0, pt1, index = firstPart
+				if self.slices[index].isStartPart(eid, pt0, pt1):
+					odt += self.getDurationBefore(eid, index)
+			if it1 == t1:
+				pt0, pt1, index = lastPart
+				if self.slices[index].isEndPart(eid, pt0, pt1):
+					odt += self.getDurationAfter(eid, index)
+			yield it0, it1, eid, odt
+		self.evict(keep=indexList)
+
+	def getLastBefore(self, t1):
+		endJd = getJdFromEpoch(t1) + 1
+		indexList = self.getSliceIndexList(self.startJd, endJd)
+		for index in reversed(indexList):
+			res = self.loadSlice(index).engine.getLastBefore(t1)
+			if res:
+				self.evict(keep=(index,))
+				return res
+		self.evict()
+
+	def getFirstOfEvent(self, eid):
+		items = sorted(self.calcSlice(self.startJd, self.endJd, [eid]))
+		if items:
+			return items[0][:2]
+
+	def getLastOfEvent(self, eid):
+		items = sorted(
+			self.calcSlice(self.startJd, self.endJd, [eid]),
+			key=lambda item: item[0] + item[1],
+		)
+		if items:
+			return items[-1][:2]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import join, dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+import random
+
+from scal3.time_utils import getEpochFromJd
+from scal3.event_search_tree import EventSearchTree
+from scal3.event_search_window import WindowedEventSearch
+
+dayLen = 24 * 3600
+
+
+class TestWindowedEventSearch(unittest.TestCase):
+	startJd = 2457000
+	endJd = 2457000 + 400
+
+	def setUp(self):
+		random.seed(5)
+		startEpoch = getEpochFromJd(self.startJd)
+		self.occurList = []
+		for eid in range(1, 21):
+			offset = random.randint(0, 7 * dayLen)
+			duration = random.choice((0, 3600, dayLen, 3 * dayLen, 40 * dayLen))
+			step = 7 * dayLen if duration < 7 * dayLen else 50 * dayLen
+			for index in range(400 * dayLen // step):
+				t0 = startEpoch + index * step + offset
+				self.occurList.append((t0, t0 + duration, eid))
+		self.tree = EventSearchTree()
+		for t0, t1, eid in self.occurList:
+			self.tree.add(t0, t1, eid)
+		self.calcCount = 0
+		self.window = WindowedEventSearch(
+			self.calcSlice,
+			self.startJd,
+			self.endJd,
+			sliceDays=30,
+			maxCount=300,
+		)
+
+	def calcSlice(self, startJd, endJd, eids):
+		self.calcCount += 1
+		epoch0 = getEpochFromJd(startJd)
+		epoch1 = getEpochFromJd(endJd)
+		for t0, t1, eid in self.occurList:
+			if eids is not None and eid not in eids:
+				continue
+			if t0 == t1 and epoch0 <= t0 < epoch1:
+				yield t0, t1, eid
+			elif t0 < epoch1 and t1 > epoch0:
+				yield max(t0, epoch0), min(t1, epoch1), eid
+
+	def test_search(self):
+		startEpoch = getEpochFromJd(self.startJd)
+		for _ in range(100):
+			t0 = startEpoch + random.randint(0, 380) * dayLen
+			t1 = t0 + random.choice((1, 7, 31)) * dayLen
+			self.assertEqual(
+				sorted(self.window.search(t0, t1)),
+				sorted(self.tree.search(t0, t1)),
+			)
+			self.assertLessEqual(
+				self.window.getLoadedCount(),
+				self.window.maxCount + 100,  # current slices are kept
+			)
+
+	def test_lazy(self):
+		self.assertEqual(self.calcCount, 0)
+		t0 = getEpochFromJd(self.startJd + 100)
+		list(self.window.search(t0, t0 + dayLen))
+		self.assertLess(len(self.window.slices), 4)
+
+	def test_firstLast(self):
+		for eid in (1, 5, 20):
+			self.assertEqual(
+				self.window.getFirstOfEvent(eid),
+				self.tree.getFirstOfEvent(eid),
+			)
+
+
+if __name__ == "__main__":
+	unittest.main()
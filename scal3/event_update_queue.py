@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
-from queue import Queue
+from queue import Queue, Empty
 from threading import Thread
 from time import sleep
+from time import perf_counter as now
 
-from typing import Union
+from typing import Union, Optional, List, Dict, Tuple, Callable
 
 from scal3 import logger
 log = logger.get()
@@ -16,6 +17,13 @@ Usage:
 	ui.eventUpdateQueue.put(action, event, self)
 """
 
+# records that are put within this many seconds after the first one
+# are coalesced and delivered to consumers as one batch
+coalesceWindow = 0.05
+maxBatchSize = 1000
+
+groupActions = ("r", "eg", "+g", "-g")
+
 
 class EventUpdateRecord:
 	def __init__(
@@ -28,17 +36,107 @@ class EventUpdateRecord:
 		self.obj = obj
 		self.sender = sender
 
+	def __repr__(self) -> str:
+		return f"EventUpdateRecord({self.action!r}, {self.obj!r}, {self.sender!r})"
+
+
+def _coalesceEventActions(actions: "List[str]") -> "Optional[str]":
+	"""
+		returns one action that has the same effect as the given sequence
+		of actions on one event, or None if they cancel out
+	"""
+	existedBefore = actions[0] != "+"
+	existsAfter = actions[-1] != "-"
+	if not existedBefore:
+		return "+" if existsAfter else None
+	if not existsAfter:
+		return "-"
+	if "v" in actions or "-" in actions:
+		# moved, or removed and added back (maybe in another group)
+		return "v"
+	return "e"
+
+
+def _coalesceGroupActions(actions: "List[str]") -> "Optional[str]":
+	"""
+		same as _coalesceEventActions, for actions on one group
+	"""
+	if actions[-1] == "-g":
+		return None if actions[0] == "+g" else "-g"
+	if "+g" in actions:
+		return "+g"
+	if "r" in actions:
+		# reload includes edit
+		return "r"
+	return "eg"
+
+
+def coalesceRecords(
+	records: "List[EventUpdateRecord]",
+) -> "List[EventUpdateRecord]":
+	"""
+		merges records of the same event (or the same group) into one record
+		for example "+" then "e" becomes "+", and "+" ... "-" is dropped
+
+		records are kept in the order of the first record of each object,
+		the last record's object is used, and sender is kept only if it is
+		the same for all merged records (otherwise no consumer is skipped)
+	"""
+	recordsByKey = {}  # type: Dict[Tuple[str, int], List[EventUpdateRecord]]
+	for record in records:
+		kind = "g" if record.action in groupActions else "e"
+		key = (kind, record.obj.id)
+		if key in recordsByKey:
+			recordsByKey[key].append(record)
+		else:
+			recordsByKey[key] = [record]
+	result = []
+	for (kind, _id), keyRecords in recordsByKey.items():
+		if len(keyRecords) == 1:
+			result.append(keyRecords[0])
+			continue
+		actions = [record.action for record in keyRecords]
+		if kind == "g":
+			action = _coalesceGroupActions(actions)
+		else:
+			action = _coalesceEventActions(actions)
+		if action is None:
+			continue
+		last = keyRecords[-1]
+		sender = last.sender
+		for record in keyRecords:
+			if record.sender is not sender:
+				sender = None
+				break
+		result.append(EventUpdateRecord(action, last.obj, sender))
+	return result
+
 
 class EventUpdateQueue(Queue):
+	"""
+		records are coalesced (see coalesceRecords) and delivered in batches
+
+		a consumer can have onEventUpdateBatch(records) method, otherwise its
+		onEventUpdate(record) is called for each record of batch
+		records that are sent by a consumer are not delivered to itself
+
+		each batch is delivered to all consumers in one call of `uiDispatch`,
+		which can be set to a function that runs the given function in
+		main (GUI) thread
+	"""
 	def __init__(self):
 		Queue.__init__(self)
 		self._consumers = []
 		self._thread = None
 		self._paused = False
+		self.uiDispatch = None  # type: Optional[Callable[[Callable], None]]
 
 	def registerConsumer(self, consumer) -> None:
 		log.info(f"registerConsumer: {consumer.__class__.__name__}")
-		if not hasattr(consumer, "onEventUpdate"):
+		if not (
+			hasattr(consumer, "onEventUpdate") or
+			hasattr(consumer, "onEventUpdateBatch")
+		):
 			raise TypeError(
 				f"type {consumer.__class__.__name__} has no method onEventUpdate"
 			)
@@ -104,10 +202,66 @@ class EventUpdateQueue(Queue):
 			record = self.get()
 			if record is None:
 				return
-			for consumer in self._consumers:
-				if consumer is record.sender:
-					continue
+			records = [record]
+			stop = self.collectRecords(records)
+			self.deliverBatch(coalesceRecords(records))
+			if stop:
+				return
+
+	def collectRecords(self, records: "List[EventUpdateRecord]") -> bool:
+		"""
+			appends records that are put within coalesceWindow
+			returns True if loop is stopped (by stopLoop)
+		"""
+		deadline = now() + coalesceWindow
+		while len(records) < maxBatchSize:
+			timeout = deadline - now()
+			if timeout <= 0:
+				break
+			try:
+				record = self.get(timeout=timeout)
+			except Empty:
+				break
+			if record is None:
+				return True
+			records.append(record)
+		return False
+
+	@staticmethod
+	def deliverToConsumer(
+		consumer,
+		records: "List[EventUpdateRecord]",
+	) -> None:
+		records = [record for record in records if record.sender is not consumer]
+		if not records:
+			return
+		try:
+			batchFunc = getattr(consumer, "onEventUpdateBatch", None)
+			if batchFunc is not None:
+				batchFunc(records)
+				return
+			for record in records:
 				consumer.onEventUpdate(record)
+		except Exception:
+			log.exception(f"error in consumer {consumer.__class__.__name__}")
+
+	def deliverBatch(self, records: "List[EventUpdateRecord]") -> None:
+		if not records:
+			return
+		log.debug(f"EventUpdateQueue: delivering batch of {len(records)} records")
+		if not self._consumers:
+			return
+		consumers = list(self._consumers)
+
+		def deliverToUI():
+			for consumer in consumers:
+				self.deliverToConsumer(consumer, records)
+			return False  # for GLib.timeout_add
+
+		if self.uiDispatch is None:
+			deliverToUI()
+		else:
+			self.uiDispatch(deliverToUI)
 
 
 def testEventUpdateQueue():
@@ -130,6 +284,7 @@ def testEventUpdateQueue():
 
 	queue = EventUpdateQueue()
 	queue.registerConsumer(MockConsumer())
+	queue.startLoop()
 	items = [
 		("+", 1),
 		("+", 2),
@@ -145,7 +300,6 @@ def testEventUpdateQueue():
 	group = MockGroup()
 	for action, eid in items:
 		queue.put(action, MockEvent(eid, group), sender)
-	group.startLoop()
 	time.sleep(2)
 	queue.stopLoop()
 
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import dirname, abspath
+from threading import Event as ThreadEvent
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.event_update_queue import (
+	EventUpdateRecord,
+	EventUpdateQueue,
+	coalesceRecords,
+)
+
+
+class MockGroup:
+	def __init__(self, _id):
+		self.id = _id
+
+
+class MockEvent:
+	def __init__(self, _id, parent):
+		self.id = _id
+		self.parent = parent
+
+
+class MockConsumer:
+	def __init__(self):
+		self.records = []
+
+	def onEventUpdate(self, record):
+		self.records.append((record.action, record.obj.id))
+
+
+class MockBatchConsumer:
+	def __init__(self):
+		self.batches = []
+		self.done = ThreadEvent()
+
+	def onEventUpdateBatch(self, records):
+		self.batches.append([(record.action, record.obj.id) for record in records])
+		self.done.set()
+
+
+class TestCoalesceRecords(unittest.TestCase):
+	def setUp(self):
+		self.group = MockGroup(1)
+		self.events = {}
+
+	def getEvent(self, eid):
+		if eid not in self.events:
+			self.events[eid] = MockEvent(eid, self.group)
+		return self.events[eid]
+
+	def coalesce(self, items, sender=None):
+		records = []
+		for action, _id in items:
+			obj = MockGroup(_id) if action.endswith("g") else self.getEvent(_id)
+			records.append(EventUpdateRecord(action, obj, sender))
+		return [
+			(record.action, record.obj.id)
+			for record in coalesceRecords(records)
+		]
+
+	def test_events(self):
+		self.assertEqual(
+			self.coalesce([
+				("+", 1),
+				("e", 1),
+				("+", 2),
+				("e", 2),
+				("-", 2),
+				("e", 3),
+				("e", 3),
+				("e", 4),
+				("-", 4),
+				("e", 5),
+				("v", 5),
+				("-", 6),
+				("+", 6),
+				("v", 7),
+				("e", 7),
+			]),
+			[
+				("+", 1),
+				("e", 3),
+				("-", 4),
+				("v", 5),
+				("v", 6),
+				("v", 7),
+			],
+		)
+
+	def test_groups(self):
+		self.assertEqual(
+			self.coalesce([
+				("eg", 10),
+				("eg", 10),
+				("+g", 11),
+				("eg", 11),
+				("+g", 12),
+				("-g", 12),
+				("eg", 13),
+				("r", 13),
+				("eg", 14),
+				("-g", 14),
+				("+", 1),
+			]),
+			[
+				("eg", 10),
+				("+g", 11),
+				("r", 13),
+				("-g", 14),
+				("+", 1),
+			],
+		)
+
+	def test_sender(self):
+		sender = MockConsumer()
+		event = self.getEvent(1)
+		(record,) = coalesceRecords([
+			EventUpdateRecord("e", event, sender),
+			EventUpdateRecord("e", event, sender),
+		])
+		self.assertIs(record.sender, sender)
+		(record,) = coalesceRecords([
+			EventUpdateRecord("e", event, sender),
+			EventUpdateRecord("e", event, None),
+		])
+		self.assertIsNone(record.sender)
+
+
+class TestEventUpdateQueue(unittest.TestCase):
+	def test_batch(self):
+		group = MockGroup(1)
+		queue = EventUpdateQueue()
+		single = MockConsumer()
+		consumer = MockBatchConsumer()
+		queue.registerConsumer(single)
+		queue.registerConsumer(consumer)
+		for action, eid in [
+			("+", 1),
+			("e", 1),
+			("e", 2),
+			("e", 2),
+			("-", 3),
+		]:
+			queue.put(action, MockEvent(eid, group), None)
+		queue.put("e", MockEvent(4, group), consumer)
+		queue.startLoop()
+		try:
+			self.assertTrue(consumer.done.wait(5))
+		finally:
+			queue.stopLoop()
+		self.assertEqual(
+			single.records,
+			[("+", 1), ("e", 2), ("-", 3), ("e", 4)],
+		)
+		# record from consumer itself is not delivered to it
+		self.assertEqual(
+			consumer.batches,
+			[[("+", 1), ("e", 2), ("-", 3)]],
+		)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -1,42 +1,82 @@
 #!/usr/bin/env python3
-from igraph import Graph
+from bisect import bisect_left, bisect_right
 
+# Interval graph utilities, used for laying out timeline event boxes
+# vertices are intervals (t0, t1), two intervals are adjacent if they
+# overlap, intervals that only touch (t1 == other t0) are not adjacent
+# colors of overlapping intervals are different, color is the level
+# of event box in timeline
 
-def colorGraph(g: Graph, vertexSortKey: "Callable[[int], [Any]]"):
+
+class IntervalColoring:
+	"""
+		keeps intervals of each color sorted by start time
+		intervals of one color do not overlap, so their end times are
+		sorted too, and finding an overlapping one is a binary search
+	"""
+
+	def __init__(self):
+		self.starts = []  # type: List[List[float]], index: color
+		self.ends = []  # type: List[List[float]], index: color
+
+	def colorCount(self) -> int:
+		return len(self.starts)
+
+	def hasOverlap(self, color: int, t0: float, t1: float) -> bool:
+		# the last interval that starts before t1
+		i = bisect_left(self.starts[color], t1) - 1
+		return i >= 0 and self.ends[color][i] > t0
+
+	def add(self, color: int, t0: float, t1: float) -> None:
+		while len(self.starts) <= color:
+			self.starts.append([])
+			self.ends.append([])
+		starts = self.starts[color]
+		i = bisect_right(starts, t0)
+		starts.insert(i, t0)
+		self.ends[color].insert(i, t1)
+
+	def addFirstFit(self, t0: float, t1: float) -> int:
+		"""
+			adds interval with the smallest color that is not used by
+			overlapping intervals, and returns the color
+			adding intervals sorted by t0 gives optimal coloring
+			(number of colors = max number of overlapping intervals)
+		"""
+		color = 0
+		colorCount = len(self.starts)
+		while color < colorCount and self.hasOverlap(color, t0, t1):
+			color += 1
+		self.add(color, t0, t1)
+		return color
+
+	def getHeight(self, color: int, t0: float, t1: float) -> int:
+		"""
+			returns the number of colors from `color` to the next color that
+			has an interval overlapping (t0, t1), or 1 if there is none
+		"""
+		for c in range(color + 1, len(self.starts)):
+			if self.hasOverlap(c, t0, t1):
+				return c - color
+		return 1
+
+
+def splitIntervalComponents(
+	intervals: "List[Tuple[float, float, Any]]",
+) -> "List[List[Any]]":
 	"""
-		vertexSortKey is the key function for sorting vertices
+		intervals: list of (t0, t1, item), sorted by t0
+		returns items of connected components of the interval graph
 	"""
-	# Using "SL" (Smalest Last) algorithm
-	n = g.vcount()
-	adjlist = g.get_adjlist()
-	colors = [None] * n
-	for i in sorted(
-		range(n),
-		key=vertexSortKey,
-	):
-		adjColors = set()
-		for j in adjlist[i]:
-			c = colors[j]
-			if c is not None:
-				adjColors.add(c)
-		c = 0
-		while c in adjColors:
-			c += 1
-		colors[i] = c
-	g.vs["color"] = colors
-
-def addBoxHeightToColoredGraph(g):
-	n = g.vcount()
-	adjlist = g.get_adjlist()
-	colors = g.vs["color"]
-	colorCount = max(colors) + 1
-	heightList = [1 for i in range(n)]
-	for i, c in enumerate(colors):
-		adjColors = set()
-		for j in adjlist[i]:
-			adjColors.add(colors[j])
-		for c_end in range(c + 1, colorCount + 1):
-			if c_end in adjColors:
-				heightList[i] = c_end - c
-				break
-	g.vs["box_height"] = heightList
+	components = []
+	component = []
+	maxEnd = None
+	for t0, t1, item in intervals:
+		if maxEnd is None or t0 >= maxEnd:
+			component = []
+			components.append(component)
+			maxEnd = t1
+		else:
+			maxEnd = max(maxEnd, t1)
+		component.append(item)
+	return components
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+import random
+from os.path import dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.graph_utils import (
+	IntervalColoring,
+	splitIntervalComponents,
+)
+
+
+def overlaps(a, b):
+	return a[0] < b[1] and b[0] < a[1]
+
+
+class TestIntervalColoring(unittest.TestCase):
+	def test_addFirstFit(self):
+		rand = random.Random(0)
+		for _ in range(50):
+			intervals = []
+			for _ in range(rand.randint(1, 60)):
+				t0 = rand.randint(0, 100)
+				intervals.append((t0, t0 + rand.randint(1, 30)))
+			intervals.sort()
+			coloring = IntervalColoring()
+			colors = [coloring.addFirstFit(t0, t1) for t0, t1 in intervals]
+			for i, a in enumerate(intervals):
+				for j in range(i):
+					if overlaps(a, intervals[j]):
+						self.assertNotEqual(colors[i], colors[j])
+			# optimal: number of colors is max number of overlapping intervals
+			maxOverlap = max(
+				sum(1 for t0, t1 in intervals if t0 <= t < t1)
+				for t in range(131)
+			)
+			self.assertEqual(coloring.colorCount(), maxOverlap)
+
+	def test_getHeight(self):
+		coloring = IntervalColoring()
+		self.assertEqual(coloring.addFirstFit(0, 10), 0)
+		self.assertEqual(coloring.addFirstFit(5, 15), 1)
+		self.assertEqual(coloring.addFirstFit(6, 8), 2)
+		# touching is not overlapping
+		self.assertEqual(coloring.addFirstFit(10, 20), 0)
+		self.assertEqual(coloring.addFirstFit(16, 18), 1)
+		coloring.add(3, 0, 2)
+		self.assertEqual(coloring.getHeight(0, 0, 10), 1)
+		self.assertEqual(coloring.getHeight(0, 10, 20), 1)
+		self.assertEqual(coloring.getHeight(1, 16, 18), 1)
+		self.assertEqual(coloring.getHeight(0, 20, 30), 1)
+		self.assertEqual(coloring.getHeight(2, 0, 5), 1)
+		self.assertEqual(coloring.getHeight(1, 0, 3), 2)
+		self.assertFalse(coloring.hasOverlap(1, 15, 16))
+		self.assertTrue(coloring.hasOverlap(1, 14, 16))
+
+	def test_splitIntervalComponents(self):
+		self.assertEqual(splitIntervalComponents([]), [])
+		self.assertEqual(
+			splitIntervalComponents([
+				(0, 10, "a"),
+				(2, 3, "b"),
+				(9, 12, "c"),
+				(12, 13, "d"),
+				(20, 30, "e"),
+				(25, 26, "f"),
+			]),
+			[["a", "b", "c"], ["d"], ["e", "f"]],
+		)
+
+
+if __name__ == "__main__":
+	unittest.main()
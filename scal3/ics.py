@@ -22,8 +22,9 @@ log = logger.get()
 from time import strftime, gmtime, strptime, mktime
 
 import sys
+import re
 
-from typing import List
+from typing import List, Tuple, Dict, Iterable, Iterator
 
 from os.path import join, split, splitext
 
@@ -117,6 +118,89 @@ def splitIcsValue(value: str) -> List[str]:
 	return data
 
 
+def iterIcsLines(fp: "Iterable[str]") -> "Iterator[str]":
+	"""
+		yields unfolded content lines of ics file (RFC 5545, section 3.1)
+		a line that starts with space or tab is the continuation of previous
+		fp can be a file object (in text mode) or any iterable of lines
+	"""
+	line = ""
+	for rawLine in fp:
+		rawLine = rawLine.rstrip("\r\n")
+		if rawLine[:1] in (" ", "\t"):
+			line += rawLine[1:]
+			continue
+		if line:
+			yield line
+		line = rawLine
+	if line:
+		yield line
+
+
+def splitIcsLine(line: str) -> "Tuple[str, str, str]":
+	"""
+		"DTSTART;VALUE=DATE:20200101" -> ("DTSTART", "VALUE=DATE", "20200101")
+		colons inside quoted parameter values are skipped
+	"""
+	colon = line.find(":")
+	if colon < 0:
+		raise ValueError(f"bad ics line {line!r}")
+	if '"' in line[:colon]:
+		quoted = False
+		for colon, c in enumerate(line):
+			if c == '"':
+				quoted = not quoted
+			elif c == ":" and not quoted:
+				break
+		else:
+			raise ValueError(f"bad ics line {line!r}")
+	name, _, params = line[:colon].partition(";")
+	return name.upper(), params, line[colon + 1:]
+
+
+_icsEscapeRE = re.compile(r"\\(.)")
+
+
+def unescapeIcsText(value: str) -> str:
+	return _icsEscapeRE.sub(
+		lambda m: "\n" if m.group(1) in "nN" else m.group(1),
+		value,
+	)
+
+
+def iterIcsEvents(fp: "Iterable[str]") -> "Iterator[Dict[str, str]]":
+	"""
+		streams ics file and yields a dict of (unfolded) properties
+		of each VEVENT: name -> value, without parameters
+		properties of nested components (like VALARM) are skipped,
+		and only the first one of repeated properties is kept
+	"""
+	event = None
+	depth = 0
+	for line in iterIcsLines(fp):
+		try:
+			name, params, value = splitIcsLine(line)
+		except ValueError as e:
+			log.error(str(e))
+			continue
+		if name == "BEGIN":
+			if event is not None:
+				depth += 1
+			elif value.upper() == "VEVENT":
+				event = {}
+				depth = 0
+		elif name == "END":
+			if event is None:
+				continue
+			if depth > 0:
+				depth -= 1
+			elif value.upper() == "VEVENT":
+				yield event
+				event = None
+		elif event is not None and depth == 0 and name not in event:
+			event[name] = value
+
+
 def convertHolidayPlugToIcs(
 	plug: "BasePlugin",
 	startJd: int,
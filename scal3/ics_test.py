@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.ics import (
+	iterIcsLines,
+	splitIcsLine,
+	unescapeIcsText,
+	iterIcsEvents,
+)
+
+
+class TestIcsTokenizer(unittest.TestCase):
+	def test_iterIcsLines(self):
+		self.assertEqual(
+			list(iterIcsLines([
+				"BEGIN:VEVENT\r\n",
+				"DESCRIPTION:first\r\n",
+				" second\r\n",
+				"\tthird\r\n",
+				"\r\n",
+				"END:VEVENT",
+			])),
+			[
+				"BEGIN:VEVENT",
+				"DESCRIPTION:firstsecondthird",
+				"END:VEVENT",
+			],
+		)
+
+	def test_splitIcsLine(self):
+		self.assertEqual(
+			splitIcsLine("DTSTART;VALUE=DATE:20200101"),
+			("DTSTART", "VALUE=DATE", "20200101"),
+		)
+		self.assertEqual(
+			splitIcsLine('dtstart;TZID="Asia/A:B":20200101T100000'),
+			("DTSTART", 'TZID="Asia/A:B"', "20200101T100000"),
+		)
+		self.assertEqual(
+			splitIcsLine("SUMMARY:a: b"),
+			("SUMMARY", "", "a: b"),
+		)
+		with self.assertRaises(ValueError):
+			splitIcsLine("SUMMARY")
+
+	def test_unescapeIcsText(self):
+		self.assertEqual(
+			unescapeIcsText(r"a\, b\nc\Nd\;e\\f"),
+			"a, b\nc\nd;e\\f",
+		)
+
+	def test_iterIcsEvents(self):
+		lines = [
+			"BEGIN:VCALENDAR",
+			"SUMMARY:calendar",
+			"BEGIN:VEVENT",
+			"SUMMARY:first",
+			"SUMMARY:repeated",
+			"DTSTART;VALUE=DATE:20200101",
+			"BEGIN:VALARM",
+			"DESCRIPTION:alarm",
+			"END:VALARM",
+			"DESCRIPTION:long",
+			"  text",
+			"END:VEVENT",
+			"BEGIN:VEVENT",
+			"SUMMARY:second",
+			"END:VEVENT",
+			"END:VCALENDAR",
+		]
+		self.assertEqual(
+			list(iterIcsEvents(line + "\r\n" for line in lines)),
+			[
+				{
+					"SUMMARY": "first",
+					"DTSTART": "20200101",
+					"DESCRIPTION": "long text",
+				},
+				{
+					"SUMMARY": "second",
+				},
+			],
+		)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from scal3 import logger
+log = logger.get()
+
+import os
+import sys
+import json
+import atexit
+import threading
+from array import array
+from functools import wraps
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+# Named timers and counters for hot paths
+#
+# enabled by "--profile" command line option or STARCAL_PROFILE=1 (or true)
+# environment variable, then a summary (count, total, and percentiles of
+# each timer, and value of each counter) is logged on exit
+# "--profile-trace=PATH" or STARCAL_PROFILE_TRACE=PATH also writes
+# timers as a Chrome trace (JSON) file, that can be opened in
+# chrome://tracing or https://ui.perfetto.dev
+#
+# `timed` decides at decoration time, so it must be enabled before
+# instrumented modules are imported, which is done by this module
+# when it's imported
+#
+# usage:
+# 	@instrument.timed("name")
+# 	def func(): ...
+#
+# 	with instrument.timer("name"):
+# 		...
+#
+# 	instrument.count("name")
+
+enabled = False
+tracePath = None  # type: Optional[str]
+maxTraceEvents = 1000000
+summaryPercentiles = (50, 90, 99)
+
+startTime = perf_counter()
+# key: timer name, value: durations in seconds
+times = {}  # type: Dict[str, array]
+counters = {}  # type: Dict[str, int]
+# (name, start, duration, threadId)
+traceEvents = []  # type: List[Tuple[str, float, float, int]]
+
+
+def addTime(name: str, start: float, end: float) -> None:
+	durations = times.get(name)
+	if durations is None:
+		durations = times.setdefault(name, array("d"))
+	durations.append(end - start)
+	if tracePath and len(traceEvents) < maxTraceEvents:
+		traceEvents.append((name, start, end - start, threading.get_ident()))
+
+
+class Timer:
+	__slots__ = ("name", "start")
+
+	def __init__(self, name: str) -> None:
+		self.name = name
+		self.start = 0.0
+
+	def __enter__(self) -> "Timer":
+		self.start = perf_counter()
+		return self
+
+	def __exit__(self, *exc) -> None:
+		addTime(self.name, self.start, perf_counter())
+
+
+class NullTimer:
+	__slots__ = ()
+
+	def __enter__(self) -> "NullTimer":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		pass
+
+
+nullTimer = NullTimer()
+
+
+def timer(name: str) -> "Timer | NullTimer":
+	if not enabled:
+		return nullTimer
+	return Timer(name)
+
+
+def timed(name: str):
+	"""
+		decorator, returns the function itself if not enabled
+	"""
+	def decorator(func):
+		if not enabled:
+			return func
+
+		@wraps(func)
+		def wrapper(*args, **kwargs):
+			start = perf_counter()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				addTime(name, start, perf_counter())
+
+		return wrapper
+
+	return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+	if not enabled:
+		return
+	counters[name] = counters.get(name, 0) + n
+
+
+def reset() -> None:
+	times.clear()
+	counters.clear()
+	traceEvents.clear()
+
+
+def percentile(sortedValues: "List[float]", p: float) -> float:
+	"""
+		nearest-rank percentile of a sorted non-empty list
+	"""
+	index = -int(-p * len(sortedValues) // 100) - 1
+	return sortedValues[min(max(index, 0), len(sortedValues) - 1)]
+
+
+def getSummary() -> str:
+	lines = []
+	if times:
+		header = ["timer", "count", "total"] + [
+			f"p{p}" for p in summaryPercentiles
+		] + ["max"]
+		rows = []
+		for name, durations in sorted(
+			times.items(),
+			key=lambda item: -sum(item[1]),
+		):
+			values = sorted(durations)
+			rows.append(
+				[name, str(len(values)), f"{sum(values) * 1000:.1f}"] + [
+					f"{percentile(values, p) * 1000:.3f}"
+					for p in summaryPercentiles
+				] + [f"{values[-1] * 1000:.3f}"]
+			)
+		widths = [
+			max(len(row[i]) for row in [header] + rows)
+			for i in range(len(header))
+		]
+		lines.append("times in milliseconds:")
+		for row in [header] + rows:
+			lines.append("  ".join(
+				row[0].ljust(widths[0]) if i == 0 else value.rjust(widths[i])
+				for i, value in enumerate(row)
+			))
+	if counters:
+		lines.append("counters:")
+		for name, value in sorted(counters.items()):
+			lines.append(f"{name}: {value}")
+	return "\n".join(lines)
+
+
+def writeChromeTrace(fpath: str) -> None:
+	pid = os.getpid()
+	events = [
+		{
+			"name": name,
+			"cat": "starcal",
+			"ph": "X",
+			"ts": (start - startTime) * 1e6,
+			"dur": duration * 1e6,
+			"pid": pid,
+			"tid": tid,
+		}
+		for name, start, duration, tid in traceEvents
+	]
+	endTs = (perf_counter() - startTime) * 1e6
+	for name, value in sorted(counters.items()):
+		events.append({
+			"name": name,
+			"cat": "starcal",
+			"ph": "C",
+			"ts": endTs,
+			"pid": pid,
+			"args": {"value": value},
+		})
+	with open(fpath, "w", encoding="utf-8") as fp:
+		json.dump({
+			"traceEvents": events,
+			"displayTimeUnit": "ms",
+		}, fp)
+
+
+def dump() -> None:
+	summary = getSummary()
+	if summary:
+		log.info("profile summary:\n" + summary)
+	if tracePath:
+		try:
+			writeChromeTrace(tracePath)
+		except Exception:
+			log.exception(f"error writing trace file {tracePath}")
+		else:
+			log.info(f"profile trace: {tracePath}")
+
+
+def enable(trace: "Optional[str]" = None) -> None:
+	global enabled, tracePath
+	if trace:
+		tracePath = trace
+	if enabled:
+		return
+	enabled = True
+	atexit.register(dump)
+
+
+def init() -> None:
+	"""
+		reads command line options and environment variables
+		command line options are removed from sys.argv
+	"""
+	trace = os.getenv("STARCAL_PROFILE_TRACE")
+	profile = os.getenv("STARCAL_PROFILE", "").strip().lower() in ("1", "true")
+	for arg in sys.argv[1:]:
+		if arg == "--profile":
+			profile = True
+		elif arg.startswith("--profile-trace="):
+			trace = arg[len("--profile-trace="):]
+		else:
+			continue
+		sys.argv.remove(arg)
+	if profile or trace:
+		enable(trace)
+
+
+init()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import unittest
+
+import os
+import sys
+import json
+import tempfile
+from os.path import dirname, abspath, join
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3 import instrument
+
+
+class TestInstrument(unittest.TestCase):
+	def setUp(self):
+		self.enabled = instrument.enabled
+		self.tracePath = instrument.tracePath
+		self.environ = dict(os.environ)
+		self.argv = list(sys.argv)
+		instrument.enabled = True
+		instrument.reset()
+
+	def tearDown(self):
+		instrument.enabled = self.enabled
+		instrument.tracePath = self.tracePath
+		os.environ.clear()
+		os.environ.update(self.environ)
+		sys.argv[:] = self.argv
+		instrument.reset()
+
+	def test_percentile(self):
+		values = list(range(1, 101))
+		self.assertEqual(instrument.percentile(values, 50), 50)
+		self.assertEqual(instrument.percentile(values, 99), 99)
+		self.assertEqual(instrument.percentile(values, 100), 100)
+		self.assertEqual(instrument.percentile(values, 0), 1)
+		self.assertEqual(instrument.percentile([5], 90), 5)
+
+	def test_disabled(self):
+		instrument.enabled = False
+
+		def func():
+			return 1
+
+		self.assertIs(instrument.timed("func")(func), func)
+		self.assertIs(instrument.timer("x"), instrument.nullTimer)
+		with instrument.timer("x"):
+			pass
+		instrument.count("y")
+		self.assertEqual(instrument.times, {})
+		self.assertEqual(instrument.counters, {})
+
+	def test_summary(self):
+		@instrument.timed("func")
+		def func(x):
+			return x * 2
+
+		self.assertEqual(func(3), 6)
+		self.assertEqual(func.__name__, "func")
+		for _ in range(3):
+			with instrument.timer("block"):
+				pass
+		instrument.count("cache.hit")
+		instrument.count("cache.hit", 2)
+		self.assertEqual(len(instrument.times["func"]), 1)
+		self.assertEqual(len(instrument.times["block"]), 3)
+		self.assertEqual(instrument.counters, {"cache.hit": 3})
+		summary = instrument.getSummary()
+		self.assertIn("p99", summary)
+		self.assertIn("cache.hit: 3", summary)
+		lines = summary.split("\n")
+		self.assertTrue(any(line.startswith("block ") for line in lines))
+
+	def test_writeChromeTrace(self):
+		with tempfile.TemporaryDirectory() as tmpDir:
+			instrument.tracePath = join(tmpDir, "trace.json")
+			with instrument.timer("a"):
+				with instrument.timer("b"):
+					pass
+			instrument.count("c", 5)
+			instrument.writeChromeTrace(instrument.tracePath)
+			with open(instrument.tracePath, encoding="utf-8") as fp:
+				data = json.load(fp)
+		events = data["traceEvents"]
+		self.assertEqual([e["name"] for e in events], ["b", "a", "c"])
+		b, a, c = events
+		self.assertEqual(a["ph"], "X")
+		self.assertLessEqual(a["ts"], b["ts"])
+		self.assertGreaterEqual(a["ts"] + a["dur"], b["ts"] + b["dur"])
+		self.assertEqual(a["pid"], os.getpid())
+		self.assertEqual(c["ph"], "C")
+		self.assertEqual(c["args"], {"value": 5})
+
+	def isEnabledByInit(self, argv, profile=None, trace=None):
+		enabledList = []
+		enable = instrument.enable
+		instrument.enable = lambda trace=None: enabledList.append(trace)
+		try:
+			os.environ.pop("STARCAL_PROFILE", None)
+			os.environ.pop("STARCAL_PROFILE_TRACE", None)
+			if profile is not None:
+				os.environ["STARCAL_PROFILE"] = profile
+			if trace is not None:
+				os.environ["STARCAL_PROFILE_TRACE"] = trace
+			sys.argv[:] = ["starcal"] + argv
+			instrument.init()
+		finally:
+			instrument.enable = enable
+		return enabledList
+
+	def test_init(self):
+		self.assertEqual(self.isEnabledByInit([]), [])
+		for value in ("0", "", "false", "no"):
+			self.assertEqual(self.isEnabledByInit([], profile=value), [], value)
+		for value in ("1", "true", "True"):
+			self.assertEqual(self.isEnabledByInit([], profile=value), [None], value)
+		self.assertEqual(
+			self.isEnabledByInit([], profile="0", trace="/tmp/trace.json"),
+			["/tmp/trace.json"],
+		)
+		self.assertEqual(self.isEnabledByInit(["--profile", "-w"]), [None])
+		self.assertEqual(sys.argv, ["starcal", "-w"])
+		self.assertEqual(
+			self.isEnabledByInit(["--profile-trace=/tmp/a.json"], profile="0"),
+			["/tmp/a.json"],
+		)
+		self.assertEqual(sys.argv, ["starcal"])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -109,6 +109,25 @@ def testJdRanges():
 	]).calcJdRanges())
 
 
+def testJdOccurSetIntersection():
+	weekly = JdOccurSet.fromRanges([
+		range(3, 100, 7),
+		range(5, 100, 7),
+	])
+	for other in (
+		JdOccurSet(range(20, 60)),
+		JdOccurSet(range(0, 100, 3)),
+		JdOccurSet(range(10, 100, 7)),
+		JdOccurSet(random.sample(range(100), 40)),
+	):
+		result = weekly.intersection(other)
+		assert result.jdSet == weekly.jdSet & other.jdSet
+		assert result.getDaysJdList() == sorted(result.jdSet)
+	assert JdOccurSet(range(5, 9)).intersection(
+		JdOccurSet([7, 8, 9, 10])
+	).calcJdRanges() == [(7, 9)]
+
+
 def testSimplifyNumList():
 	from pprint import pprint
 	pprint(simplifyNumList([
@@ -145,5 +164,6 @@ if __name__ == "__main__":
 	testnormalizeIntervalList()
 	testIntersection()
 	testJdRanges()
+	testJdOccurSetIntersection()
 	testSimplifyNumList()
 	core.stopRunningThreads()
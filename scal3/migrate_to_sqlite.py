@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+# no logging in this file
+
+import sys
+import os
+from os.path import isfile
+
+from scal3 import event_lib
+from scal3.sqlite_fs import SqliteFileSystem, migrateToSqlite
+from scal3.path import confDir, eventDbPath
+
+
+if __name__ == "__main__":
+	if isfile(eventDbPath):
+		print(f"{eventDbPath} already exists")
+		sys.exit(1)
+	tmpPath = eventDbPath + ".tmp"
+	if isfile(tmpPath):
+		os.remove(tmpPath)
+	srcFs = event_lib.DefaultFileSystem(confDir)
+	dstFs = SqliteFileSystem(tmpPath, confDir)
+	count = migrateToSqlite(srcFs, dstFs)
+	dstFs.close()
+	os.replace(tmpPath, eventDbPath)
+	print(f"Copied {count} files into {eventDbPath}")
@@ -8,8 +8,8 @@ def getMoonPhase(jd, southernHemisphere=False):
 		0.0 = no moon
 		1.0 = full moon
 	"""
-	from scal3.cal_types import hijri
-	_, _, d = hijri.jd_to(jd)
+	from scal3.cal_types import calTypes, jd_to
+	_, _, d = jd_to(jd, calTypes.names.index("hijri"))
 	if d >= 28:
 		phase = 0.0
 	else:
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from scal3 import logger
+log = logger.get()
+
+import mmap
+import struct
+from os.path import join
+from hashlib import sha1
+from weakref import WeakKeyDictionary
+from typing import Optional, List, Iterator, Tuple, Set
+
+# Pack files for content-addressed objects, like git packs (but simpler)
+#
+# objects/pack/pack-<name>.dat:
+# 	header, then bson bytes of objects, one after another
+# objects/pack/pack-<name>.idx:
+# 	header, then sorted binary sha1 hashes (20 bytes each),
+# 	then (offset, size) of each object in .dat file, in the same order
+#
+# .idx file is written after .dat file, so a pack is not visible
+# until both files are complete
+
+packDir = join("objects", "pack")
+
+packVersion = 1
+idxMagic = b"SCOI"
+datMagic = b"SCOD"
+headerStruct = struct.Struct("<4sII")  # magic, version, count
+entryStruct = struct.Struct("<QI")  # offset, size
+hashSize = 20
+
+
+def mapFile(fs: "FileSystem", fpath: str) -> "bytes | mmap.mmap":
+	"""
+		memory-maps the file if file system gives a real file,
+		otherwise reads the whole file
+	"""
+	with fs.open(fpath, "rb") as fp:
+		try:
+			return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+		except (AttributeError, OSError, ValueError):
+			# no fileno (not a real file), or empty file
+			fp.seek(0)
+			return fp.read()
+
+
+class ObjectPack:
+	def __init__(self, fs: "FileSystem", name: str) -> None:
+		self.fs = fs
+		self.name = name
+		self.idx = mapFile(fs, self.getIndexPath())
+		magic, version, count = headerStruct.unpack_from(self.idx, 0)
+		if magic != idxMagic:
+			raise ValueError(f"invalid pack index file: {self.getIndexPath()}")
+		if version != packVersion:
+			raise ValueError(
+				f"unsupported pack version {version}: {self.getIndexPath()}"
+			)
+		self.count = count
+		self.entriesStart = headerStruct.size + count * hashSize
+		self.dat = None
+
+	def getIndexPath(self) -> str:
+		return join(packDir, f"pack-{self.name}.idx")
+
+	def getDataPath(self) -> str:
+		return join(packDir, f"pack-{self.name}.dat")
+
+	def __len__(self) -> int:
+		return self.count
+
+	def getHashBytes(self, index: int) -> bytes:
+		pos = headerStruct.size + index * hashSize
+		return self.idx[pos:pos + hashSize]
+
+	def findIndex(self, hashBytes: bytes) -> int:
+		"""
+			binary search in sorted hashes of .idx file
+			returns -1 if not found
+		"""
+		low, high = 0, self.count
+		while low < high:
+			mid = (low + high) // 2
+			if self.getHashBytes(mid) < hashBytes:
+				low = mid + 1
+			else:
+				high = mid
+		if low < self.count and self.getHashBytes(low) == hashBytes:
+			return low
+		return -1
+
+	def __contains__(self, _hash: str) -> bool:
+		return self.findIndex(bytes.fromhex(_hash)) >= 0
+
+	def read(self, _hash: str) -> "Optional[bytes]":
+		index = self.findIndex(bytes.fromhex(_hash))
+		if index < 0:
+			return None
+		offset, size = entryStruct.unpack_from(
+			self.idx,
+			self.entriesStart + index * entryStruct.size,
+		)
+		if self.dat is None:
+			self.dat = mapFile(self.fs, self.getDataPath())
+		return bytes(self.dat[offset:offset + size])
+
+	def iterHashes(self) -> "Iterator[str]":
+		for index in range(self.count):
+			yield self.getHashBytes(index).hex()
+
+	def close(self) -> None:
+		for data in (self.idx, self.dat):
+			if isinstance(data, mmap.mmap):
+				data.close()
+		self.dat = None
+
+
+# key: FileSystem object, value: list of ObjectPack
+_packsByFs = WeakKeyDictionary()
+
+
+def listPackNames(fs: "FileSystem") -> "List[str]":
+	if not fs.isdir(packDir):
+		return []
+	names = []
+	for fname in fs.listdir(packDir):
+		if fname.startswith("pack-") and fname.endswith(".idx"):
+			names.append(fname[len("pack-"):-len(".idx")])
+	return sorted(names)
+
+
+def getPacks(fs: "FileSystem") -> "List[ObjectPack]":
+	packs = _packsByFs.get(fs)
+	if packs is not None:
+		return packs
+	packs = []
+	for name in listPackNames(fs):
+		try:
+			packs.append(ObjectPack(fs, name))
+		except Exception:
+			log.exception(f"error while opening object pack {name!r}")
+	_packsByFs[fs] = packs
+	return packs
+
+
+def reloadPacks(fs: "FileSystem") -> "List[ObjectPack]":
+	"""
+		to be called when packs are changed, maybe by another process
+	"""
+	for pack in _packsByFs.pop(fs, []):
+		pack.close()
+	return getPacks(fs)
+
+
+def readPackedObject(_hash: str, fs: "FileSystem") -> "Optional[bytes]":
+	for pack in getPacks(fs):
+		bsonBytes = pack.read(_hash)
+		if bsonBytes is not None:
+			return bsonBytes
+	return None
+
+
+def isObjectPacked(_hash: str, fs: "FileSystem") -> bool:
+	return any(_hash in pack for pack in getPacks(fs))
+
+
+def writePack(
+	fs: "FileSystem",
+	objects: "List[Tuple[str, bytes]]",
+) -> str:
+	"""
+		objects: list of (hash, bsonBytes)
+		returns name of the new pack
+	"""
+	objects = sorted(objects)
+	name = sha1(b"".join(
+		bytes.fromhex(_hash) for _hash, _ in objects
+	)).hexdigest()
+	fs.makeDir(packDir)
+	datPath = join(packDir, f"pack-{name}.dat")
+	idxPath = join(packDir, f"pack-{name}.idx")
+	entries = []
+	# if the pack exists (same objects), it may be in use, so it's
+	# not rewritten in place
+	datTmpPath = datPath + ".tmp"
+	with fs.open(datTmpPath, "wb") as fp:
+		fp.write(headerStruct.pack(datMagic, packVersion, len(objects)))
+		offset = headerStruct.size
+		for _hash, bsonBytes in objects:
+			fp.write(bsonBytes)
+			entries.append(entryStruct.pack(offset, len(bsonBytes)))
+			offset += len(bsonBytes)
+	idxTmpPath = idxPath + ".tmp"
+	with fs.open(idxTmpPath, "wb") as fp:
+		fp.write(headerStruct.pack(idxMagic, packVersion, len(objects)))
+		for _hash, _ in objects:
+			fp.write(bytes.fromhex(_hash))
+		fp.write(b"".join(entries))
+	fs.rename(datTmpPath, datPath)
+	fs.rename(idxTmpPath, idxPath)
+	return name
+
+
+def repackObjects(
+	fs: "FileSystem",
+	keepHashes: "Optional[Set[str]]" = None,
+) -> "Tuple[int, int]":
+	"""
+		folds all loose objects and existing packs into one pack,
+		then removes loose object files and old packs
+		if keepHashes is given, objects not in it are dropped
+
+		returns (packedCount, droppedCount)
+	"""
+	from scal3.s_object import iterObjectFiles
+
+	objects = {}
+	looseFiles = []
+	dropped = 0
+	for _hash, fpath in iterObjectFiles(fs):
+		looseFiles.append(fpath)
+		if keepHashes is not None and _hash not in keepHashes:
+			dropped += 1
+			continue
+		with fs.open(fpath, "rb") as fp:
+			bsonBytes = fp.read()
+		if sha1(bsonBytes).hexdigest() != _hash:
+			log.error(f"sha1 diggest does not match for object file {fpath!r}")
+			looseFiles.pop()  # keep it for inspection
+			continue
+		objects[_hash] = bsonBytes
+	oldPacks = reloadPacks(fs)
+	for pack in oldPacks:
+		for _hash in pack.iterHashes():
+			if _hash in objects:
+				continue
+			if keepHashes is not None and _hash not in keepHashes:
+				dropped += 1
+				continue
+			objects[_hash] = pack.read(_hash)
+	if not looseFiles and len(oldPacks) < 2 and not dropped:
+		log.info("repackObjects: nothing to do")
+		return len(objects), 0
+	# old packs must not be memory-mapped while writing or removing them
+	for pack in oldPacks:
+		pack.close()
+	_packsByFs.pop(fs, None)
+	newName = None
+	if objects:
+		newName = writePack(fs, list(objects.items()))
+	for pack in oldPacks:
+		if pack.name == newName:
+			continue
+		fs.removeFile(pack.getIndexPath())
+		fs.removeFile(pack.getDataPath())
+	for fpath in looseFiles:
+		fs.removeFile(fpath)
+	reloadPacks(fs)
+	log.info(
+		f"repackObjects: packed {len(objects)} objects, " +
+		f"removed {len(looseFiles)} loose files, dropped {dropped} objects"
+	)
+	return len(objects), dropped
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+import os
+from os.path import join, dirname, abspath
+import tempfile
+import shutil
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.s_object import (
+	DefaultFileSystem,
+	saveBsonObject,
+	loadBsonObject,
+	iterObjectFiles,
+)
+from scal3.object_pack import (
+	packDir,
+	writePack,
+	repackObjects,
+	getPacks,
+	isObjectPacked,
+)
+
+
+class TestObjectPack(unittest.TestCase):
+	def setUp(self):
+		self.tmpDir = tempfile.mkdtemp(prefix="starcal-object_pack_test-")
+		self.fs = DefaultFileSystem(self.tmpDir)
+		self.fs.makeDir("objects")
+		self.dataByHash = {}
+		for index in range(50):
+			data = {"summary": f"event {index}", "index": index}
+			self.dataByHash[saveBsonObject(data, self.fs)] = data
+
+	def tearDown(self):
+		for pack in getPacks(self.fs):
+			pack.close()
+		shutil.rmtree(self.tmpDir)
+
+	def assertAllLoad(self, hashes):
+		for _hash in hashes:
+			self.assertEqual(
+				loadBsonObject(_hash, self.fs),
+				self.dataByHash[_hash],
+			)
+
+	def test_repack(self):
+		self.assertEqual(repackObjects(self.fs), (50, 0))
+		self.assertEqual(list(iterObjectFiles(self.fs)), [])
+		self.assertEqual(len(getPacks(self.fs)), 1)
+		self.assertAllLoad(self.dataByHash)
+
+	def test_mixed(self):
+		repackObjects(self.fs)
+		newHash = saveBsonObject({"summary": "new"}, self.fs)
+		self.dataByHash[newHash] = {"summary": "new"}
+		self.assertFalse(isObjectPacked(newHash, self.fs))
+		self.assertAllLoad(self.dataByHash)
+		# saving a packed object again does not create a loose file
+		_hash = next(iter(self.dataByHash))
+		saveBsonObject(self.dataByHash[_hash], self.fs)
+		self.assertEqual(len(list(iterObjectFiles(self.fs))), 1)
+		# loose and old pack are folded into one pack
+		self.assertEqual(repackObjects(self.fs), (51, 0))
+		self.assertEqual(len(getPacks(self.fs)), 1)
+		self.assertTrue(isObjectPacked(newHash, self.fs))
+		self.assertAllLoad(self.dataByHash)
+
+	def test_dropUnused(self):
+		keep = set(list(self.dataByHash)[:20])
+		repackObjects(self.fs)
+		self.assertEqual(repackObjects(self.fs, keepHashes=keep), (20, 30))
+		self.assertAllLoad(keep)
+		for _hash in set(self.dataByHash) - keep:
+			with self.assertRaises(FileNotFoundError):
+				loadBsonObject(_hash, self.fs)
+
+	def test_samePack(self):
+		repackObjects(self.fs)
+		(pack,) = getPacks(self.fs)
+		datPath = join(self.tmpDir, pack.getDataPath())
+		ino = os.stat(datPath).st_ino
+		# a second pack with some of objects, repacked to the existing pack
+		hashes = list(self.dataByHash)[:10]
+		writePack(self.fs, [(_hash, pack.read(_hash)) for _hash in hashes])
+		self.assertEqual(repackObjects(self.fs), (50, 0))
+		self.assertEqual(
+			[p.name for p in getPacks(self.fs)],
+			[pack.name],
+		)
+		# not written in place
+		self.assertNotEqual(os.stat(datPath).st_ino, ino)
+		self.assertEqual(
+			[
+				fname for fname in os.listdir(join(self.tmpDir, packDir))
+				if fname.endswith(".tmp")
+			],
+			[],
+		)
+		self.assertAllLoad(self.dataByHash)
+
+
+if __name__ == "__main__":
+	unittest.main()
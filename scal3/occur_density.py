@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from array import array
+from itertools import accumulate
+from typing import Optional, Tuple, List, Dict, Iterable
+
+from scal3.time_utils import getJdArrayFromEpochs
+
+
+class OccurDensity:
+	"""
+		number of occurrences of an event group, by the day (jd) they
+		start in, for days in range(startJd, endJd)
+		kept as prefix sums, so number of occurrences in any range of days
+		(a day, month, year, or a few pixels of timeline) is found in O(1)
+		without touching the occurrences
+
+		if it's built by fromEventStarts, days of each event are kept too
+		so it can be updated per event (setEvent, removeEvent) instead of
+		being calculated again after an event is changed
+	"""
+
+	def __init__(self, startJd: int, endJd: int, counts: "Iterable[int]") -> None:
+		"""
+			counts[i] is the number of occurrences that start in
+			day startJd + i
+		"""
+		self.startJd = startJd
+		self.endJd = endJd
+		self.counts = array("q", counts)
+		if len(self.counts) != endJd - startJd:
+			raise ValueError(
+				f"bad counts length {len(self.counts)}, " +
+				f"expected {endJd - startJd}",
+			)
+		# prefix[i] is the number of occurrences before day startJd + i
+		# built on first query after a change
+		self._prefix = None  # type: Optional[array]
+		# key: event id, value: days (jd) that its occurrences start in
+		self.jdsByEid = {}  # type: Dict[int, array]
+		# key: days, value: max count
+		self.maxCountCache = {}  # type: Dict[int, int]
+
+	@classmethod
+	def fromStartEpochs(
+		cls,
+		startJd: int,
+		endJd: int,
+		epochs: "Iterable[float]",
+	) -> "OccurDensity":
+		"""
+			epochs: start epoch of occurrences, ones outside the
+			range of days are ignored
+		"""
+		counts = [0] * max(0, endJd - startJd)
+		for jd in getJdArrayFromEpochs(epochs):
+			i = jd - startJd
+			if 0 <= i < len(counts):
+				counts[i] += 1
+		return cls(startJd, endJd, counts)
+
+	@classmethod
+	def fromEventStarts(
+		cls,
+		startJd: int,
+		endJd: int,
+		items: "Iterable[Tuple[int, float]]",
+	) -> "OccurDensity":
+		"""
+			items: (eid, epoch) for start epoch of each occurrence
+		"""
+		epochsByEid = {}  # type: Dict[int, List[float]]
+		for eid, epoch in items:
+			epochs = epochsByEid.get(eid)
+			if epochs is None:
+				epochs = epochsByEid[eid] = []
+			epochs.append(epoch)
+		density = cls(startJd, endJd, [0] * max(0, endJd - startJd))
+		for eid, epochs in epochsByEid.items():
+			density.setEvent(eid, epochs)
+		return density
+
+	def _changed(self) -> None:
+		self._prefix = None
+		self.maxCountCache.clear()
+
+	def removeEvent(self, eid: int) -> None:
+		jds = self.jdsByEid.pop(eid, None)
+		if not jds:
+			return
+		counts = self.counts
+		startJd = self.startJd
+		for jd in jds:
+			counts[jd - startJd] -= 1
+		self._changed()
+
+	def setEvent(self, eid: int, epochs: "Iterable[float]") -> None:
+		"""
+			replaces occurrences of event by the ones that start in epochs
+		"""
+		self.removeEvent(eid)
+		startJd = self.startJd
+		endJd = self.endJd
+		jds = array("l", [
+			jd for jd in getJdArrayFromEpochs(epochs)
+			if startJd <= jd < endJd
+		])
+		if not jds:
+			return
+		counts = self.counts
+		for jd in jds:
+			counts[jd - startJd] += 1
+		self.jdsByEid[eid] = jds
+		self._changed()
+
+	def getPrefix(self) -> "array":
+		prefix = self._prefix
+		if prefix is None:
+			prefix = array("q", [0])
+			prefix.extend(accumulate(self.counts))
+			self._prefix = prefix
+		return prefix
+
+	def getTotal(self) -> int:
+		return self.getPrefix()[-1]
+
+	def getCount(self, startJd: int, endJd: int) -> int:
+		"""
+			number of occurrences that start in range(startJd, endJd)
+		"""
+		startJd = min(max(startJd, self.startJd), self.endJd)
+		endJd = min(max(endJd, self.startJd), self.endJd)
+		if endJd <= startJd:
+			return 0
+		prefix = self.getPrefix()
+		return prefix[endJd - self.startJd] - prefix[startJd - self.startJd]
+
+	def getMaxCount(self, days: int) -> int:
+		"""
+			max number of occurrences in `days` consecutive days
+		"""
+		days = max(1, days)
+		maxCount = self.maxCountCache.get(days)
+		if maxCount is not None:
+			return maxCount
+		prefix = self.getPrefix()
+		n = len(prefix) - 1
+		if n <= days:
+			maxCount = prefix[-1]
+		else:
+			maxCount = max(
+				prefix[i + days] - prefix[i]
+				for i in range(n - days + 1)
+			)
+		self.maxCountCache[days] = maxCount
+		return maxCount
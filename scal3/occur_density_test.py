@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+import random
+from os.path import dirname, abspath
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.time_utils import getEpochFromJd
+from scal3.occur_density import OccurDensity
+
+
+class TestOccurDensity(unittest.TestCase):
+	def test_getCount(self):
+		rand = random.Random(0)
+		startJd = 2450000
+		endJd = startJd + 400
+		jds = [rand.randint(startJd - 10, endJd + 10) for _ in range(1000)]
+		density = OccurDensity.fromStartEpochs(
+			startJd,
+			endJd,
+			[getEpochFromJd(jd) + rand.randint(0, 86399) for jd in jds],
+		)
+		self.assertEqual(
+			density.getTotal(),
+			sum(1 for jd in jds if startJd <= jd < endJd),
+		)
+		for _ in range(200):
+			jd0 = rand.randint(startJd - 20, endJd + 20)
+			jd1 = jd0 + rand.randint(0, 100)
+			self.assertEqual(
+				density.getCount(jd0, jd1),
+				sum(1 for jd in jds if max(jd0, startJd) <= jd < min(jd1, endJd)),
+			)
+		self.assertEqual(density.getCount(endJd, startJd), 0)
+
+	def test_getMaxCount(self):
+		density = OccurDensity(10, 16, [1, 0, 3, 0, 0, 2])
+		self.assertEqual(density.getMaxCount(1), 3)
+		self.assertEqual(density.getMaxCount(2), 3)
+		self.assertEqual(density.getMaxCount(3), 4)
+		self.assertEqual(density.getMaxCount(4), 5)
+		self.assertEqual(density.getMaxCount(100), 6)
+		self.assertEqual(density.getMaxCount(0), 3)
+		self.assertEqual(OccurDensity(10, 10, []).getMaxCount(5), 0)
+		with self.assertRaises(ValueError):
+			OccurDensity(10, 12, [1])
+
+	def test_setEvent(self):
+		rand = random.Random(1)
+		startJd = 2450000
+		endJd = startJd + 400
+
+		def randomStarts():
+			return [
+				getEpochFromJd(rand.randint(startJd - 10, endJd + 10)) +
+				rand.randint(0, 86399)
+				for _ in range(rand.randint(0, 30))
+			]
+
+		startsByEid = {eid: randomStarts() for eid in range(20)}
+		density = OccurDensity.fromEventStarts(startJd, endJd, [
+			(eid, epoch)
+			for eid, epochs in startsByEid.items()
+			for epoch in epochs
+		])
+		density.getMaxCount(7)
+		for _ in range(30):
+			eid = rand.randint(0, 25)
+			if rand.random() < 0.3:
+				startsByEid.pop(eid, None)
+				density.removeEvent(eid)
+			else:
+				startsByEid[eid] = randomStarts()
+				density.setEvent(eid, startsByEid[eid])
+			expected = OccurDensity.fromStartEpochs(startJd, endJd, [
+				epoch
+				for epochs in startsByEid.values()
+				for epoch in epochs
+			])
+			self.assertEqual(density.counts, expected.counts)
+			self.assertEqual(density.getTotal(), expected.getTotal())
+			self.assertEqual(density.getMaxCount(7), expected.getMaxCount(7))
+
+
+if __name__ == "__main__":
+	unittest.main()
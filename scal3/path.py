@@ -80,5 +80,6 @@ userPlugConf = join(confDir, "plugin.conf")
 modDir = f"{scalDir}/cal_types"
 plugDirUser = join(confDir, plugDirName)
 objectDir = join(confDir, "objects")
+eventDbPath = join(confDir, "event.db")  # see scal3.sqlite_fs
 
 purpleDir = join(homeDir, ".purple")  # FIXME
@@ -20,15 +20,27 @@ from scal3 import logger
 log = logger.get()
 
 import sys
+import os
+import pickle
+from hashlib import sha1
 from time import strftime
 from time import localtime
-from os.path import isfile, dirname, join, split, splitext, isabs
+from time import perf_counter
+from threading import Thread, Lock
+from os.path import isfile, dirname, join, split, splitext, isabs, abspath
 
 
 from scal3.path import *
 from scal3.json_utils import *
 from scal3.time_utils import getJdListFromEpochRange
-from scal3.ics import getEpochByIcsTime, getIcsDateByJd
+from scal3.ics import (
+	getEpochByIcsTime,
+	getIcsDateByJd,
+	iterIcsEvents,
+	unescapeIcsText,
+)
+from scal3 import cal_types
+from scal3 import yearly_text_index
 from scal3.cal_types import (
 	calTypes,
 	jd_to,
@@ -39,7 +51,7 @@ from scal3.cal_types import (
 )
 from scal3.date_utils import ymdRange
 from scal3.locale_man import tr as _
-from scal3.locale_man import getMonthName
+from scal3.locale_man import getMonthName, localTzStr
 from scal3.ics import icsTmFormat, icsHeader
 from scal3.s_object import *
 
@@ -57,6 +69,15 @@ pluginsTitleByName = {
 
 pluginClassByName = {}
 
+# parsed data of ics plugins (see IcsTextPlugin.load), and compiled
+# index of yearly text plugins (see yearly_text_index.py)
+pluginCacheDir = join(cacheDir, "plugins")
+icsCacheVersion = 1
+
+# at startup, plugins are loaded one by one until this many seconds
+# are spent, the rest are loaded in a background thread (or on first use)
+startupLoadBudget = 0.3
+
 
 def registerPlugin(cls):
 	assert cls.name
@@ -72,6 +93,15 @@ class BasePlugin(SObj):
 	name = None
 	external = False
 	loaded = True
+	# True if isHolidayJd is implemented, if it's False and updateCell
+	# is overridden, cells are built to find holidays (see ui.getHolidaysJdList)
+	hasHolidays = False
+	# capabilities that are loaded at startup (see loadNeed), others
+	# are loaded on first use:
+	# "text": data for cell text (load method)
+	# "config": configuration UI
+	# "locations": location database
+	startupNeeds = ("text",)
 	params = (
 		# "calType",
 		"title",  # previously "desc"
@@ -119,6 +149,9 @@ class BasePlugin(SObj):
 		self.hasConfig = False
 		self.hasImage = False
 		self.lastDayMerge = True
+		###
+		self.dataLoaded = False
+		self._loadLock = Lock()
 
 	def getData(self):
 		data = JsonSObj.getData(self)
@@ -165,10 +198,45 @@ class BasePlugin(SObj):
 	def load(self):
 		pass
 
+	def ensureLoaded(self):
+		"""
+			calls load() once, thread-safe
+			so plugins loaded in background can be used anytime
+		"""
+		if self.dataLoaded:
+			return
+		with self._loadLock:
+			if self.dataLoaded:
+				return
+			t0 = perf_counter()
+			try:
+				self.load()
+			except Exception:
+				# not retried on every use, error is logged once
+				log.exception(f"error while loading plugin {self.title!r}")
+			self.dataLoaded = True
+			log.info(
+				f"plugin {self.title!r}: loaded in " +
+				f"{(perf_counter() - t0) * 1000:.1f} ms"
+			)
+
+	def unload(self):
+		with self._loadLock:
+			self.clear()
+			self.dataLoaded = False
+
+	def loadNeed(self, need):
+		"""
+			loads a capability of plugin, see startupNeeds
+		"""
+		if need == "text":
+			self.ensureLoaded()
+
 	def getText(self, year, month, day):
 		return ""
 
 	def updateCell(self, c):
+		self.ensureLoaded()
 		module, ok = calTypes[self.calType]
 		if not ok:
 			raise RuntimeError(f"cal type '{self.calType}' not found")
@@ -188,6 +256,9 @@ class BasePlugin(SObj):
 		if text:
 			c.addPluginText(self, text)
 
+	def isHolidayJd(self, jd):
+		return False
+
 	def onCurrentDateChange(self, gdate):
 		pass
 
@@ -235,10 +306,15 @@ class DummyExternalPlugin(BasePlugin):
 	def __repr__(self):
 		return f"loadPlugin({self.file!r}, enable=False, show_date=False)"
 
+	dataLoaded = True  # nothing to load
+
 	def __init__(self, _file, title):
 		self.file = _file
 		self.title = title
 
+	def unload(self):
+		pass
+
 
 def loadExternalPlugin(_file, **data):
 	_file = getPlugPath(_file)
@@ -323,6 +399,9 @@ def loadExternalPlugin(_file, **data):
 @registerPlugin
 class HolidayPlugin(BaseJsonPlugin):
 	name = "holiday"
+	hasHolidays = True
+	# holiday jds are calculated and cached in blocks of this many days
+	jdBlockSize = 366
 
 	def __init__(self, _file):
 		BaseJsonPlugin.__init__(
@@ -331,6 +410,7 @@ class HolidayPlugin(BaseJsonPlugin):
 		)
 		self.lastDayMerge = True  # FIXME
 		self.holidays = {}
+		self.compile()
 
 	def setData(self, data):
 		if "holidays" in data:
@@ -356,66 +436,83 @@ class HolidayPlugin(BaseJsonPlugin):
 			log.error(f"no \"holidays\" key in holiday plugin \"{self.file}\"")
 		###
 		BaseJsonPlugin.setData(self, data)
-
-	def dateIsHoliday(self, calType, y, m, d, jd):
-		module, ok = calTypes[calType]
-		if not ok:
-			raise RuntimeError(f"cal type '{calType}' not found")
-
-		for item in self.holidays[calType]:
-			if len(item) == 2:
+		self.compile()
+
+	def compile(self):
+		"""
+			builds lookup sets from self.holidays, for each calType:
+			holidayMonthDays: set of (m, d) for every year
+			holidayDates: set of (y, m, d)
+			mergeMonthDays: set of (m, d) that are holiday if d is the last
+				day of month (for lastDayMerge)
+		"""
+		self.holidayMonthDays = {}
+		self.holidayDates = {}
+		self.mergeMonthDays = {}
+		for calType, items in self.holidays.items():
+			module = calTypes[calType][0]
+			monthDays = self.holidayMonthDays[calType] = set()
+			dates = self.holidayDates[calType] = set()
+			merge = self.mergeMonthDays[calType] = set()
+			for item in items:
+				if len(item) == 3:
+					dates.add(item)
+					continue
 				hm, hd = item
-				hy = None
-			elif len(item) == 3:
-				hy, hm, hd = item
-			else:
-				log.error(f"bad holiday item '{item}'")
-				continue
+				monthDays.add((hm, hd))
+				if hd >= module.minMonthLen:
+					merge.add((hm, hd - 1))
+		self.clearCache()
 
-			if hy is not None and hy != y:
-				continue
-
-			if hm != m:
-				continue
+	def clearCache(self):
+		self._jdSetByBlock = {}
+		self._cacheVersion = cal_types.cacheVersion
 
-			if d == hd:
+	def dateIsHoliday(self, calType, y, m, d, jd):
+		if (m, d) in self.holidayMonthDays[calType]:
+			return True
+		if (y, m, d) in self.holidayDates[calType]:
+			return True
+		if self.lastDayMerge and (m, d) in self.mergeMonthDays[calType]:
+			ny, nm, nd = jd_to(jd + 1, calType)
+			if (ny, nm) > (y, m):
 				return True
-
-			if (
-				hy is None and
-				self.lastDayMerge and
-				d == hd - 1 and
-				hd >= module.minMonthLen
-			):
-				ny, nm, nd = jd_to(jd + 1, calType)
-				if (ny, nm) > (y, m):
-					return True
-
 		return False
 
+	def calcHolidayJdSet(self, startJd, endJd):
+		jdSet = set()
+		for calType in self.holidays:
+			for jd in range(startJd, endJd):
+				if jd in jdSet:
+					continue
+				y, m, d = jd_to(jd, calType)
+				if self.dateIsHoliday(calType, y, m, d, jd):
+					jdSet.add(jd)
+		return jdSet
+
+	def isHolidayJd(self, jd):
+		if self._cacheVersion != cal_types.cacheVersion:
+			self.clearCache()
+		block = jd // self.jdBlockSize
+		jdSet = self._jdSetByBlock.get(block)
+		if jdSet is None:
+			startJd = block * self.jdBlockSize
+			jdSet = self._jdSetByBlock[block] = self.calcHolidayJdSet(
+				startJd,
+				startJd + self.jdBlockSize,
+			)
+		return jd in jdSet
+
 	def updateCell(self, c):
-		if not c.holiday:
-			for calType in self.holidays:
-				y, m, d = c.dates[calType]
-				if self.dateIsHoliday(calType, y, m, d, c.jd):
-					c.holiday = True
-					return
+		if not c.holiday and self.isHolidayJd(c.jd):
+			c.holiday = True
 
 	def exportToIcs(self, fileName, startJd, endJd):
 		currentTimeStamp = strftime(icsTmFormat)
 		icsText = icsHeader
 
 		for jd in range(startJd, endJd):
-			isHoliday = False
-			for calType in self.holidays.keys():
-				myear, mmonth, mday = jd_to(jd, calType)
-				if (mmonth, mday) in self.holidays[calType]:
-					isHoliday = True
-					break
-				if (myear, mmonth, mday) in self.holidays[calType]:
-					isHoliday = True
-					break
-			if isHoliday:
+			if self.isHolidayJd(jd):
 				gyear, gmonth, gday = jd_to(jd, GREGORIAN)
 				gyear2, gmonth2, gday2 = jd_to(jd + 1, GREGORIAN)
 				#######
@@ -465,69 +562,27 @@ class YearlyTextPlugin(BaseJsonPlugin):
 		BaseJsonPlugin.setData(self, data)
 
 	def clear(self):
-		# yearlyData is a list of size 13 or 0, each item being a list
-		# except for last item (index 12) which is a dict
-		self.yearlyData = []
+		# compiled index of dataFile, memory-mapped, see yearly_text_index.py
+		self.index = None
 
 	def load(self):
 		# log.debug(f"YearlyTextPlugin({self._file}).load()")
-		yearlyData = []
 		module, ok = calTypes[self.calType]
 		if not ok:
 			raise RuntimeError(f"cal type '{self.calType}' not found")
-		for j in range(12):
-			monthDb = []
-			for k in range(module.maxMonthLen):
-				monthDb.append("")
-			yearlyData.append(monthDb)
-		# last item is a dict of dates (y, m, d) and the description of day:
-		yearlyData.append({})
 		ext = splitext(self.dataFile)[1].lower()
-		if ext == ".txt":
-			sep = "\t"
-			with open(self.dataFile, encoding="utf-8") as fp:
-				lines = fp.read().split("\n")
-			for line in lines[1:]:
-				line = line.strip()
-				if not line:
-					continue
-				if line[0] == "#":
-					continue
-				parts = line.split("\t")
-				if len(parts) < 2:
-					log.error(f"bad plugin data line: {line}")
-					continue
-				date = parts[0].split("/")
-				text = "\t".join(parts[1:])
-				if len(date) == 3:
-					y = int(date[0])
-					m = int(date[1])
-					d = int(date[2])
-					yearlyData[12][(y, m, d)] = text
-				elif len(date) == 2:
-					m = int(date[0])
-					d = int(date[1])
-					yearlyData[m - 1][d - 1] = text
-				else:
-					raise IOError(f"Bad line in data file {self.dataFile}:\n{line}")
-		else:
+		if ext != ".txt":
 			raise ValueError(f"invalid plugin dataFile extention \"{ext}\"")
-		self.yearlyData = yearlyData
-
-	def getBasicYearlyText(month, day):
-		item = yearlyData[month - 1]
+		self.index = yearly_text_index.loadIndex(pluginCacheDir, self.dataFile)
 
 	def getText(self, year, month, day):
-		yearlyData = self.yearlyData
-		if not yearlyData:
+		index = self.index
+		if index is None:
 			return ""
 		calType = self.calType
 		# if calType != calTypes.primary:
 		# 	year, month, day = convert(year, month, day, calTypes.primary, calType)
-		text = ""
-		item = yearlyData[month - 1]
-		if len(item) > day - 1:
-			text = item[day - 1]
+		text = index.getMonthDayText(month, day)
 		if self.show_date and text:
 			text = (
 				_(day) +
@@ -536,22 +591,21 @@ class YearlyTextPlugin(BaseJsonPlugin):
 				": " +
 				text
 			)
-		if len(yearlyData) > 12:
-			text2 = yearlyData[12].get((year, month, day), "")
-			if text2:
-				if text:
-					text += "\n"
-				if self.show_date:
-					text2 = (
-						_(day) +
-						" " +
-						getMonthName(calType, month, year) +
-						" " +
-						_(year) +
-						": " +
-						text2
-					)
-				text += text2
+		text2 = index.getDateText(year, month, day)
+		if text2:
+			if text:
+				text += "\n"
+			if self.show_date:
+				text2 = (
+					_(day) +
+					" " +
+					getMonthName(calType, month, year) +
+					" " +
+					_(year) +
+					": " +
+					text2
+				)
+			text += text2
 		return text
 
 
@@ -578,139 +632,115 @@ class IcsTextPlugin(BasePlugin):
 		self.ymd = None
 		self.md = None
 
-	def _findVeventBegin(self, lines) -> int:
-		for i, line in enumerate(lines):
-			if line == "BEGIN:VEVENT":
-				return i
-		return -1
+	def getCachePath(self) -> str:
+		"""
+			parsed data of ics file is cached in this file
+		"""
+		fileHash = sha1(abspath(self.file).encode("utf-8")).hexdigest()[:16]
+		fname = splitext(split(self.file)[1])[0]
+		return join(pluginCacheDir, f"{fname}-{fileHash}.pickle")
+
+	def getCacheKey(self):
+		"""
+			cache is only used if this key is the same
+		"""
+		st = os.stat(self.file)
+		return (
+			icsCacheVersion,
+			abspath(self.file),
+			st.st_mtime_ns,
+			st.st_size,
+			self.all_years,
+			localTzStr,
+		)
 
-	def load(self):
+	def loadCache(self, key):
+		try:
+			with open(self.getCachePath(), "rb") as fp:
+				data = pickle.load(fp)
+		except FileNotFoundError:
+			return None
+		except Exception:
+			log.exception(f"error loading ics cache of {self.file}")
+			return None
+		if not isinstance(data, dict) or data.get("key") != key:
+			return None
+		return data["texts"]
+
+	def saveCache(self, key, texts):
+		cachePath = self.getCachePath()
+		tmpPath = cachePath + ".tmp"
+		try:
+			os.makedirs(pluginCacheDir, exist_ok=True)
+			with open(tmpPath, "wb") as fp:
+				pickle.dump(
+					{"key": key, "texts": texts},
+					fp,
+					protocol=pickle.HIGHEST_PROTOCOL,
+				)
+			os.replace(tmpPath, cachePath)
+		except Exception:
+			log.exception(f"error saving ics cache of {self.file}")
+
+	def parseFile(self):
+		"""
+			returns a dict: (m, d) -> text if all_years, else (y, m, d) -> text
+		"""
+		texts = {}
+		eventCount = 0
 		with open(self.file, encoding="utf-8") as fp:
-			lines = fp.read().replace("\r", "").split("\n")
-		n = len(lines)
-		i = self._findVeventBegin(lines)
-		if i < 0:
-			log.error(f"bad ics file \"{self.fpath}\"")
-			return
-
-		# FIXME: refactor this shit
-
-		SUMMARY = ""
-		DESCRIPTION = ""
-		DTSTART = None
-		DTEND = None
-		if self.all_years:
-			md = {}
-			while True:
-				i += 1
+			for event in iterIcsEvents(fp):
+				eventCount += 1
+				summary = unescapeIcsText(event.get("SUMMARY", ""))
+				dtstart = event.get("DTSTART")
+				dtend = event.get("DTEND")
+				if not (summary and dtstart and dtend):
+					log.error(
+						f"unsupported ics event, {summary=}, "
+						f"{dtstart=}, {dtend=}"
+					)
+					continue
 				try:
-					line = lines[i]
-				except IndexError:
-					break
-				if line == "END:VEVENT":
-					if SUMMARY and DTSTART and DTEND:
-						text = SUMMARY
-						if DESCRIPTION:
-							text += "\n" + DESCRIPTION
-						for jd in getJdListFromEpochRange(DTSTART, DTEND):
-							y, m, d = gregorian.jd_to(jd)
-							md[(m, d)] = text
+					startEpoch = getEpochByIcsTime(dtstart)
+					endEpoch = getEpochByIcsTime(dtend)
+				except Exception:
+					log.exception(f"unsupported ics time: {dtstart=}, {dtend=}")
+					continue
+				text = summary
+				description = unescapeIcsText(event.get("DESCRIPTION", ""))
+				if description:
+					text += "\n" + description
+				for jd in getJdListFromEpochRange(startEpoch, endEpoch):
+					y, m, d = gregorian.jd_to(jd)
+					if self.all_years:
+						texts[(m, d)] = text
 					else:
-						log.error(
-							f"unsupported ics event, {SUMMARY=}, "
-							f"{DTSTART=}, {DTEND}="
-						)
-					SUMMARY = ""
-					DESCRIPTION = ""
-					DTSTART = None
-					DTEND = None
-				elif line.startswith("SUMMARY:"):
-					SUMMARY = line[8:].replace("\\,", ",").replace("\\n", "\n")
-				elif line.startswith("DESCRIPTION:"):
-					DESCRIPTION = line[12:].replace("\\,", ",").replace("\\n", "\n")
-				elif line.startswith("DTSTART;"):
-					# if not line.startswith("DTSTART;VALUE=DATE;"):
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					icsTime = line.split(":")[-1]
-					# if len(icsTime)!=8:
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					try:
-						DTSTART = getEpochByIcsTime(icsTime)
-					except Exception:
-						log.error(f"unsupported ics line: {line}")
-						log.exception("")
-						continue
-				elif line.startswith("DTEND;"):
-					# if not line.startswith("DTEND;VALUE=DATE;"):
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					icsTime = line.split(":")[-1]
-					# if len(icsTime)!=8:
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					try:
-						DTEND = getEpochByIcsTime(icsTime)
-					except Exception:
-						log.error(f"unsupported ics line: {line}")
-						log.exception("")
-						continue
+						texts[(y, m, d)] = text
+		if eventCount == 0:
+			log.error(f"bad ics file \"{self.file}\": no VEVENT")
+		return texts
+
+	def load(self):
+		t0 = perf_counter()
+		key = self.getCacheKey()
+		texts = self.loadCache(key)
+		if texts is None:
+			texts = self.parseFile()
+			self.saveCache(key, texts)
+			log.info(
+				f"parsed ics plugin {self.file} in " +
+				f"{(perf_counter() - t0) * 1000:.1f} ms"
+			)
+		else:
+			log.debug(
+				f"loaded ics plugin {self.file} from cache in " +
+				f"{(perf_counter() - t0) * 1000:.1f} ms"
+			)
+		if self.all_years:
 			self.ymd = None
-			self.md = md
-		else:  # not self.all_years
-			ymd = {}
-			while True:
-				i += 1
-				try:
-					line = lines[i]
-				except IndexError:
-					break
-				if line == "END:VEVENT":
-					if SUMMARY and DTSTART and DTEND:
-						text = SUMMARY
-						if DESCRIPTION:
-							text += "\n" + DESCRIPTION
-						for jd in getJdListFromEpochRange(DTSTART, DTEND):
-							y, m, d = gregorian.jd_to(jd)
-							ymd[(y, m, d)] = text
-					SUMMARY = ""
-					DESCRIPTION = ""
-					DTSTART = None
-					DTEND = None
-				elif line.startswith("SUMMARY:"):
-					SUMMARY = line[8:].replace("\\,", ",").replace("\\n", "\n")
-				elif line.startswith("DESCRIPTION:"):
-					DESCRIPTION = line[12:].replace("\\,", ",").replace("\\n", "\n")
-				elif line.startswith("DTSTART"):
-					# if not line.startswith("DTSTART;VALUE=DATE"):
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					icsTime = line.split(":")[-1]
-					# if len(icsTime)!=8:
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					try:
-						DTSTART = getEpochByIcsTime(icsTime)
-					except Exception:
-						log.error(f"unsupported ics line: {line}")
-						log.exception("")
-						continue
-				elif line.startswith("DTEND"):
-					# if not line.startswith("DTEND;VALUE=DATE;"):
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					icsTime = line.split(":")[-1]
-					# if len(icsTime)!=8:
-					# 	log.error(f"unsupported ics line: {line}")
-					# 	continue
-					try:
-						DTEND = getEpochByIcsTime(icsTime)
-					except Exception:
-						log.error(f"unsupported ics line: {line}")
-						log.exception("")
-						continue
-			self.ymd = ymd
+			self.md = texts
+		else:
+			self.ymd = texts
 			self.md = None
 
 	def getText(self, y, m, d):
@@ -738,7 +768,7 @@ class IcsTextPlugin(BasePlugin):
 						" " +
 						_(y) +
 						": " +
-						self.ymd[(y, m, d)]
+						self.md[(m, d)]
 					)
 				else:
 					return self.md[(m, d)]
@@ -754,6 +784,54 @@ class IcsTextPlugin(BasePlugin):
 # class RandomTextPlugin(BaseJsonPlugin):
 
 
+def loadPluginsAtStartup(plugins, budget=None):
+	"""
+		loads startupNeeds of enabled plugins, in order, until budget
+		(in seconds) is spent
+		returns list of plugins that are not loaded yet
+	"""
+	if budget is None:
+		budget = startupLoadBudget
+	t0 = perf_counter()
+	deferred = []
+	for plug in plugins:
+		if perf_counter() - t0 > budget:
+			deferred.append(plug)
+			continue
+		for need in plug.startupNeeds:
+			try:
+				plug.loadNeed(need)
+			except Exception:
+				log.exception(f"error while loading {need} of plugin {plug.title!r}")
+		if "text" not in plug.startupNeeds:
+			deferred.append(plug)
+	if deferred:
+		log.info(
+			f"plugins loaded at startup in {(perf_counter() - t0) * 1000:.1f} ms" +
+			f", {len(deferred)} plugins deferred"
+		)
+	return deferred
+
+
+def loadPluginsInBackground(plugins):
+	"""
+		loads text data of plugins in a daemon thread
+		plugins that are used before that are loaded by updateCell
+	"""
+	def run():
+		for plug in plugins:
+			if not plug.enable:
+				continue
+			try:
+				plug.ensureLoaded()
+			except Exception:
+				log.exception(f"error while loading plugin {plug.title!r}")
+
+	thread = Thread(target=run, name="loadPlugins", daemon=True)
+	thread.start()
+	return thread
+
+
 def loadPlugin(_file=None, **kwargs):
 	if not _file:
 		log.error("plugin file is empty!")
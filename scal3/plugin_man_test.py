@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+import json
+import threading
+from time import sleep
+from os.path import dirname, abspath, join
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3 import plugin_man
+from scal3.cal_types import calTypes, jd_to, to_jd, GREGORIAN
+
+
+def dateIsHolidayBaseline(plug, calType, y, m, d, jd):
+	"""
+		HolidayPlugin.dateIsHoliday before holidays were compiled,
+		scans the holiday list
+	"""
+	module, ok = calTypes[calType]
+	for item in plug.holidays[calType]:
+		if len(item) == 2:
+			hm, hd = item
+			hy = None
+		else:
+			hy, hm, hd = item
+		if hy is not None and hy != y:
+			continue
+		if hm != m:
+			continue
+		if d == hd:
+			return True
+		if (
+			hy is None and
+			plug.lastDayMerge and
+			d == hd - 1 and
+			hd >= module.minMonthLen
+		):
+			ny, nm, nd = jd_to(jd + 1, calType)
+			if (ny, nm) > (y, m):
+				return True
+	return False
+
+
+def isHolidayJdBaseline(plug, jd):
+	"""
+		HolidayPlugin.updateCell before isHolidayJd, per cell
+	"""
+	for calType in plug.holidays:
+		y, m, d = jd_to(jd, calType)
+		if dateIsHolidayBaseline(plug, calType, y, m, d, jd):
+			return True
+	return False
+
+
+class TestHolidayPlugin(unittest.TestCase):
+	def createPlugin(self, holidays):
+		plug = plugin_man.HolidayPlugin("test.json")
+		plug.setData({"title": "test", "holidays": holidays})
+		return plug
+
+	def assertSameHolidays(self, plug, startYear=2018, endYear=2027):
+		startJd = to_jd(startYear, 1, 1, GREGORIAN)
+		endJd = to_jd(endYear, 1, 1, GREGORIAN)
+		holidayCount = 0
+		for jd in range(startJd, endJd):
+			isHoliday = isHolidayJdBaseline(plug, jd)
+			self.assertEqual(plug.isHolidayJd(jd), isHoliday, msg=f"{jd=}")
+			holidayCount += isHoliday
+		self.assertGreater(holidayCount, 0)
+
+	def test_iran(self):
+		with open(
+			join(rootDir, "plugins", "holidays-iran.json"),
+			encoding="utf-8",
+		) as fp:
+			data = json.load(fp)
+		self.assertSameHolidays(self.createPlugin(data["holidays"]))
+
+	def test_lastDayMerge(self):
+		holidays = {
+			"gregorian": [
+				[2, 29],
+				[4, 31],
+				[5, 5],
+				[2024, 2, 29],
+				[2025, 6, 30],
+				[2026, 11, 3],
+			],
+			"jalali": [
+				[12, 30],
+				[7, 30],
+				[1, 15],
+				[1403, 12, 30],
+				[1404, 2, 9],
+				"comment",
+			],
+			"hijri": [
+				[9, 30],
+				[12, 29],
+				[1446, 1, 30],
+			],
+		}
+		plug = self.createPlugin(holidays)
+		self.assertSameHolidays(plug)
+		# end of month, with and without lastDayMerge
+		self.assertTrue(plug.isHolidayJd(to_jd(2025, 2, 28, GREGORIAN)))
+		self.assertTrue(plug.isHolidayJd(to_jd(2025, 4, 30, GREGORIAN)))
+		self.assertFalse(plug.isHolidayJd(to_jd(2024, 2, 28, GREGORIAN)))
+		# (y, m, d) items are not merged
+		self.assertFalse(plug.isHolidayJd(to_jd(2025, 6, 29, GREGORIAN)))
+		self.assertTrue(plug.isHolidayJd(to_jd(2026, 11, 3, GREGORIAN)))
+		self.assertFalse(plug.isHolidayJd(to_jd(2025, 11, 3, GREGORIAN)))
+
+		plug.lastDayMerge = False
+		plug.clearCache()
+		self.assertSameHolidays(plug)
+		self.assertFalse(plug.isHolidayJd(to_jd(2025, 2, 28, GREGORIAN)))
+
+
+class CountPlugin(plugin_man.BasePlugin):
+	def __init__(self, title, loadTime=0, startupNeeds=("text",)):
+		plugin_man.BasePlugin.__init__(self, f"{title}.json")
+		self.title = title
+		self.enable = True
+		self.loadTime = loadTime
+		self.startupNeeds = startupNeeds
+		self.calls = []
+		self.loading = threading.Event()
+
+	def load(self):
+		self.calls.append("load")
+		self.loading.set()
+		sleep(self.loadTime)
+		if self.title == "error":
+			raise ValueError("bad data")
+		self.calls.append("loaded")
+
+	def clear(self):
+		self.calls.append("clear")
+
+
+class TestPluginLoading(unittest.TestCase):
+	def test_ensureLoaded(self):
+		plug = CountPlugin("test", loadTime=0.05)
+		barrier = threading.Barrier(8)
+
+		def run():
+			barrier.wait()
+			plug.ensureLoaded()
+			self.assertTrue(plug.dataLoaded)
+
+		threads = [threading.Thread(target=run) for _ in range(8)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(plug.calls, ["load", "loaded"])
+		plug.ensureLoaded()
+		self.assertEqual(plug.calls, ["load", "loaded"])
+
+		plug.unload()
+		self.assertFalse(plug.dataLoaded)
+		plug.ensureLoaded()
+		self.assertEqual(plug.calls, ["load", "loaded", "clear", "load", "loaded"])
+
+	def test_unloadWhileLoading(self):
+		plug = CountPlugin("test", loadTime=0.1)
+		thread = threading.Thread(target=plug.ensureLoaded)
+		thread.start()
+		self.assertTrue(plug.loading.wait(5))
+		plug.unload()
+		thread.join()
+		self.assertEqual(plug.calls, ["load", "loaded", "clear"])
+		self.assertFalse(plug.dataLoaded)
+
+	def test_loadError(self):
+		plug = CountPlugin("error")
+		plug.ensureLoaded()
+		plug.ensureLoaded()
+		self.assertTrue(plug.dataLoaded)
+		self.assertEqual(plug.calls, ["load"])
+
+	def test_loadPluginsAtStartup(self):
+		plugs = [
+			CountPlugin("slow", loadTime=0.05),
+			CountPlugin("second"),
+			CountPlugin("third"),
+		]
+		deferred = plugin_man.loadPluginsAtStartup(plugs, budget=0.01)
+		self.assertEqual(deferred, plugs[1:])
+		self.assertTrue(plugs[0].dataLoaded)
+		self.assertEqual([plug.calls for plug in plugs[1:]], [[], []])
+
+		plugin_man.loadPluginsInBackground(deferred).join(5)
+		self.assertTrue(all(plug.dataLoaded for plug in plugs))
+		self.assertEqual(
+			[plug.calls for plug in plugs],
+			[["load", "loaded"]] * 3,
+		)
+
+	def test_loadPluginsAtStartupNeeds(self):
+		plugs = [
+			CountPlugin("text"),
+			CountPlugin("noText", startupNeeds=()),
+			CountPlugin("error"),
+		]
+		deferred = plugin_man.loadPluginsAtStartup(plugs, budget=10)
+		# text of "noText" is loaded later
+		self.assertEqual(deferred, plugs[1:2])
+		self.assertEqual(
+			[plug.dataLoaded for plug in plugs],
+			[True, False, True],
+		)
+
+	def test_loadPluginsInBackgroundDisabled(self):
+		plugs = [CountPlugin("enabled"), CountPlugin("disabled")]
+		plugs[1].enable = False
+		plugin_man.loadPluginsInBackground(plugs).join(5)
+		self.assertEqual(
+			[plug.dataLoaded for plug in plugs],
+			[True, False],
+		)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -18,4 +18,4 @@ from scal3.path import confDir
 if __name__ == "__main__":
 	fs = event_lib.DefaultFileSystem(confDir)
 	event_lib.init(fs)
-	event_lib.removeUnusedObjects(fs)
+	event_lib.removeUnusedObjects(fs, repack=True)
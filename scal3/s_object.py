@@ -9,6 +9,7 @@ import os.path
 from os.path import join, isabs
 from time import time as now
 from collections import OrderedDict
+from contextlib import contextmanager
 from hashlib import sha1
 from typing import Tuple
 
@@ -18,12 +19,16 @@ sys.path.insert(0, join(sourceDir, "libs", "bson"))
 import bson
 
 from scal3.json_utils import *
+from scal3.object_pack import readPackedObject, isObjectPacked, reloadPacks
 
 dataToJson = dataToPrettyJson
 # from scal3.core import dataToJson  # FIXME
 
 
 class FileSystem:
+	# False if methods can not be called from multiple threads
+	threadSafe = True
+
 	def open(self, fpath, mode="r", encoding=None):
 		raise NotImplementedError
 
@@ -42,6 +47,16 @@ class FileSystem:
 	def removeFile(self, fpath: str) -> None:
 		raise NotImplementedError
 
+	def rename(self, src: str, dst: str) -> None:
+		raise NotImplementedError
+
+	@contextmanager
+	def transaction(self):
+		"""
+			writes inside this context are saved together, if supported
+		"""
+		yield
+
 
 class DefaultFileSystem(FileSystem):
 	def __init__(self, rootPath):
@@ -78,6 +93,9 @@ class DefaultFileSystem(FileSystem):
 	def removeFile(self, fpath: str) -> None:
 		os.remove(self.abspath(fpath))
 
+	def rename(self, src: str, dst: str) -> None:
+		os.replace(self.abspath(src), self.abspath(dst))
+
 
 class SObj:
 	@classmethod
@@ -264,12 +282,14 @@ def getObjectPath(_hash: str) -> Tuple[str, str]:
 
 
 def iterObjectFiles(fs: FileSystem):
-	for dname in fs.listdir(objectDir):
-		dpath = join(objectDir, dname)
+	if not fs.isdir("objects"):
+		return
+	for dname in fs.listdir("objects"):
+		dpath = join("objects", dname)
 		if not fs.isdir(dpath):
 			continue
 		if len(dname) != 2:
-			if dname.startswith("."):
+			if dname.startswith(".") or dname == "pack":
 				continue
 			log.error(f"Unexpected directory: {dname}")  # do not skip it!
 		for fname in fs.listdir(dpath):
@@ -294,20 +314,42 @@ def saveBsonObject(data: "Union[Dict, List]", fs: FileSystem):
 	bsonBytes = bytes(bson.dumps(data))
 	_hash = sha1(bsonBytes).hexdigest()
 	dpath, fpath = getObjectPath(_hash)
-	if not fs.isfile(fpath):
+	if not fs.isfile(fpath) and not isObjectPacked(_hash, fs):
 		fs.makeDir(dpath)
 		with fs.open(fpath, "wb") as fp:
 			fp.write(bsonBytes)
 	return _hash
 
 
-def loadBsonObject(_hash, fs: FileSystem):
+def loadObjectBytes(_hash, fs: FileSystem) -> bytes:
+	"""
+		looks in packs first, then in loose object files
+	"""
+	bsonBytes = readPackedObject(_hash, fs)
+	if bsonBytes is not None:
+		return bsonBytes
 	dpath, fpath = getObjectPath(_hash)
-	with fs.open(fpath, "rb") as fp:
-		bsonBytes = fp.read()
-	if _hash != sha1(bsonBytes).hexdigest():
+	try:
+		with fs.open(fpath, "rb") as fp:
+			return fp.read()
+	except FileNotFoundError:
+		# loose object may have been packed by gc in another process
+		reloadPacks(fs)
+		bsonBytes = readPackedObject(_hash, fs)
+		if bsonBytes is None:
+			raise
+		return bsonBytes
+
+
+def loadBsonObject(_hash, fs: FileSystem, verify: bool = True):
+	"""
+		verify=False skips checking sha1 of object,
+		only for a trusted (local) object store
+	"""
+	bsonBytes = loadObjectBytes(_hash, fs)
+	if verify and _hash != sha1(bsonBytes).hexdigest():
 		raise IOError(
-			f"sha1 diggest does not match for object file '{fpath}'"
+			f"sha1 diggest does not match for object '{_hash}'"
 		)
 	return bson.loads(bsonBytes)
 
@@ -317,10 +359,12 @@ def updateBasicDataFromBson(
 	filePath: str,
 	fileType: str,
 	fs: FileSystem,
+	verify: bool = True,
 ):
 	"""
 		fileType: "event" | "group" | "account"...,
 			display only, does not matter much
+		verify: passed to loadBsonObject
 		return lastHistRecord = (lastEpoch, lastHash)
 	"""
 	try:
@@ -331,7 +375,7 @@ def updateBasicDataFromBson(
 		raise ValueError(
 			f"invalid {fileType} file \"{filePath}\", no \"history\""
 		)
-	data.update(loadBsonObject(lastHash, fs))
+	data.update(loadBsonObject(lastHash, fs, verify=verify))
 	data["modified"] = lastEpoch  # FIXME
 	return (lastEpoch, lastHash)
 
@@ -439,6 +483,7 @@ class BsonHistObj(SObj):
 			tm = now()
 			history.insert(0, [tm, _hash] + list(histArgs))
 			self.modified = tm
+		self.lastHash = _hash
 		basicData["history"] = history
 		self.saveBasicData(basicData)
 		return history[0]
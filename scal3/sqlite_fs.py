@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from scal3 import logger
+log = logger.get()
+
+import io
+import os
+import sqlite3
+from os.path import join, isabs, relpath, dirname, basename
+from contextlib import contextmanager
+from time import time as now
+from threading import RLock
+from typing import Optional, Tuple, List, Iterator
+
+from scal3.s_object import DefaultFileSystem
+
+# top-level directories (relative to root) that are kept in database
+# other paths (like imported/exported files) are read/written directly
+dbDirs = ("event", "objects")
+
+schema = """
+CREATE TABLE IF NOT EXISTS file (
+	path TEXT PRIMARY KEY,
+	dir TEXT NOT NULL,
+	data BLOB NOT NULL,
+	modified REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS file_dir ON file (dir);
+CREATE TABLE IF NOT EXISTS dir (
+	path TEXT PRIMARY KEY,
+	parent TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dir_parent ON dir (parent);
+CREATE TABLE IF NOT EXISTS object (
+	hash TEXT PRIMARY KEY,
+	data BLOB NOT NULL
+);
+"""
+
+
+def splitObjectPath(path: str) -> "Optional[Tuple[str, str]]":
+	"""
+		"objects/ab/cdef..." -> ("abcdef...", "objects/ab")
+		returns None if path is not a (loose) object path
+	"""
+	parts = path.split("/")
+	if len(parts) != 3 or parts[0] != "objects":
+		return None
+	if len(parts[1]) != 2 or len(parts[2]) != 38:
+		return None
+	return parts[1] + parts[2], "objects/" + parts[1]
+
+
+class SqliteWriteFile(io.BytesIO):
+	def __init__(self, fs: "SqliteFileSystem", path: str) -> None:
+		io.BytesIO.__init__(self)
+		self._fs = fs
+		self._path = path
+
+	def close(self) -> None:
+		if not self.closed:
+			self._fs.writeFile(self._path, self.getvalue())
+		io.BytesIO.close(self)
+
+
+class SqliteFileSystem(DefaultFileSystem):
+	"""
+		FileSystem that keeps event, group and account files, and bson objects
+		in a single SQLite database file, instead of one file per object
+
+		files under `dbDirs` are stored in database, other paths are passed to
+		DefaultFileSystem
+
+		writes are committed immediately, unless they are inside
+		`with fs.transaction():`
+	"""
+
+	# one connection is shared by all threads, and used under a lock
+	# so reading files in multiple threads is safe, but not faster
+	threadSafe = False
+
+	def __init__(self, dbPath: str, rootPath: str) -> None:
+		DefaultFileSystem.__init__(self, rootPath)
+		self.dbPath = dbPath
+		self._con = sqlite3.connect(
+			dbPath,
+			isolation_level=None,
+			check_same_thread=False,
+		)
+		self._con.executescript(schema)
+		# held by a thread during a query (until its rows are fetched)
+		# or during a transaction, so statements of other threads are not
+		# mixed into it
+		self._lock = RLock()
+		self._transactionLevel = 0
+
+	def close(self) -> None:
+		with self._lock:
+			self._con.close()
+
+	def _execute(self, sql: str, params: "Tuple" = ()) -> int:
+		"""
+			returns number of changed rows
+		"""
+		with self._lock:
+			return self._con.execute(sql, params).rowcount
+
+	def _fetchone(self, sql: str, params: "Tuple" = ()) -> "Optional[Tuple]":
+		with self._lock:
+			return self._con.execute(sql, params).fetchone()
+
+	def _fetchall(self, sql: str, params: "Tuple" = ()) -> "List[Tuple]":
+		with self._lock:
+			return self._con.execute(sql, params).fetchall()
+
+	@contextmanager
+	def transaction(self) -> "Iterator[None]":
+		with self._lock:
+			if self._transactionLevel > 0:
+				self._transactionLevel += 1
+				try:
+					yield
+				finally:
+					self._transactionLevel -= 1
+				return
+			self._con.execute("BEGIN")
+			self._transactionLevel = 1
+			try:
+				yield
+			except BaseException:
+				self._con.execute("ROLLBACK")
+				raise
+			else:
+				self._con.execute("COMMIT")
+			finally:
+				self._transactionLevel = 0
+
+	def toDbPath(self, path: str) -> "Optional[str]":
+		"""
+			returns normalized relative path if it is kept in database,
+			or None otherwise
+		"""
+		if isabs(path):
+			path = relpath(path, self._rootPath)
+		path = path.replace(os.sep, "/").strip("/")
+		if path.startswith("../"):
+			return None
+		if path.split("/")[0] not in dbDirs:
+			return None
+		return path
+
+	def readFile(self, path: str) -> bytes:
+		obj = splitObjectPath(path)
+		if obj:
+			row = self._fetchone(
+				"SELECT data FROM object WHERE hash = ?",
+				(obj[0],),
+			)
+		else:
+			row = self._fetchone(
+				"SELECT data FROM file WHERE path = ?",
+				(path,),
+			)
+		if row is None:
+			raise FileNotFoundError(f"No such file: {path!r} in {self.dbPath}")
+		return row[0]
+
+	def writeFile(self, path: str, data: bytes) -> None:
+		obj = splitObjectPath(path)
+		if obj:
+			self._execute(
+				"INSERT OR REPLACE INTO object (hash, data) VALUES (?, ?)",
+				(obj[0], data),
+			)
+			return
+		with self.transaction():
+			self._addDir(dirname(path))
+			self._execute(
+				"INSERT OR REPLACE INTO file (path, dir, data, modified)" +
+				" VALUES (?, ?, ?, ?)",
+				(path, dirname(path), data, now()),
+			)
+
+	def _addDir(self, path: str) -> None:
+		while path:
+			self._execute(
+				"INSERT OR IGNORE INTO dir (path, parent) VALUES (?, ?)",
+				(path, dirname(path)),
+			)
+			path = dirname(path)
+
+	def open(self, fpath, mode="r", encoding=None):
+		path = self.toDbPath(fpath)
+		if path is None:
+			return DefaultFileSystem.open(self, fpath, mode=mode, encoding=encoding)
+		if encoding is None:
+			encoding = "utf-8"
+		if mode in ("r", "rb"):
+			data = self.readFile(path)
+			if mode == "rb":
+				return io.BytesIO(data)
+			return io.StringIO(data.decode(encoding))
+		if mode == "wb":
+			return SqliteWriteFile(self, path)
+		if mode == "w":
+			return io.TextIOWrapper(
+				SqliteWriteFile(self, path),
+				encoding=encoding,
+			)
+		raise ValueError(f"unsupported file mode {mode!r} for {fpath!r}")
+
+	def isfile(self, fpath):
+		path = self.toDbPath(fpath)
+		if path is None:
+			return DefaultFileSystem.isfile(self, fpath)
+		obj = splitObjectPath(path)
+		if obj:
+			return self._fetchone(
+				"SELECT 1 FROM object WHERE hash = ?",
+				(obj[0],),
+			) is not None
+		return self._fetchone(
+			"SELECT 1 FROM file WHERE path = ?",
+			(path,),
+		) is not None
+
+	def isdir(self, dpath):
+		path = self.toDbPath(dpath)
+		if path is None:
+			return DefaultFileSystem.isdir(self, dpath)
+		if path in dbDirs:
+			return True
+		parts = path.split("/")
+		if len(parts) == 2 and parts[0] == "objects" and len(parts[1]) == 2:
+			if self.objectPrefixExists(parts[1]):
+				return True
+		return self._fetchone(
+			"SELECT 1 FROM dir WHERE path = ?",
+			(path,),
+		) is not None
+
+	def objectPrefixExists(self, prefix: str) -> bool:
+		return self._fetchone(
+			"SELECT 1 FROM object WHERE hash >= ? AND hash < ? LIMIT 1",
+			(prefix, prefix + "g"),
+		) is not None
+
+	def listdir(self, dpath):
+		path = self.toDbPath(dpath)
+		if path is None:
+			return DefaultFileSystem.listdir(self, dpath)
+		names = set()
+		for (subPath,) in self._fetchall(
+			"SELECT path FROM dir WHERE parent = ?",
+			(path,),
+		):
+			names.add(basename(subPath))
+		for (fpath,) in self._fetchall(
+			"SELECT path FROM file WHERE dir = ?",
+			(path,),
+		):
+			names.add(basename(fpath))
+		if path == "objects":
+			for (prefix,) in self._fetchall(
+				"SELECT DISTINCT substr(hash, 1, 2) FROM object",
+			):
+				names.add(prefix)
+		else:
+			parts = path.split("/")
+			if len(parts) == 2 and parts[0] == "objects" and len(parts[1]) == 2:
+				prefix = parts[1]
+				for (_hash,) in self._fetchall(
+					"SELECT hash FROM object WHERE hash >= ? AND hash < ?",
+					(prefix, prefix + "g"),
+				):
+					names.add(_hash[2:])
+		return sorted(names)
+
+	def makeDir(self, dpath: str) -> None:
+		path = self.toDbPath(dpath)
+		if path is None:
+			DefaultFileSystem.makeDir(self, dpath)
+			return
+		if splitObjectPath(path + "/" + "0" * 38):
+			# object directories are implicit, see listdir
+			return
+		self._addDir(path)
+
+	def removeFile(self, fpath: str) -> None:
+		path = self.toDbPath(fpath)
+		if path is None:
+			DefaultFileSystem.removeFile(self, fpath)
+			return
+		obj = splitObjectPath(path)
+		if obj:
+			rowcount = self._execute(
+				"DELETE FROM object WHERE hash = ?",
+				(obj[0],),
+			)
+		else:
+			rowcount = self._execute(
+				"DELETE FROM file WHERE path = ?",
+				(path,),
+			)
+		if rowcount == 0:
+			raise FileNotFoundError(f"No such file: {fpath!r} in {self.dbPath}")
+
+	def rename(self, src: str, dst: str) -> None:
+		srcPath = self.toDbPath(src)
+		dstPath = self.toDbPath(dst)
+		if srcPath is None and dstPath is None:
+			DefaultFileSystem.rename(self, src, dst)
+			return
+		with self.open(src, "rb") as fp:
+			data = fp.read()
+		with self.transaction():
+			with self.open(dst, "wb") as fp:
+				fp.write(data)
+			self.removeFile(src)
+
+
+def iterTreeFiles(fs: "FileSystem", dpath: str) -> "Iterator[str]":
+	for fname in fs.listdir(dpath):
+		fpath = join(dpath, fname)
+		if fs.isdir(fpath):
+			yield from iterTreeFiles(fs, fpath)
+		else:
+			yield fpath
+
+
+def migrateToSqlite(srcFs: "FileSystem", dstFs: SqliteFileSystem) -> int:
+	"""
+		copies all files of `dbDirs` from srcFs (usually DefaultFileSystem)
+		into database, in one transaction
+		returns number of copied files
+	"""
+	count = 0
+	t0 = now()
+	with dstFs.transaction():
+		for dname in dbDirs:
+			if not srcFs.isdir(dname):
+				continue
+			dstFs.makeDir(dname)
+			for fpath in iterTreeFiles(srcFs, dname):
+				with srcFs.open(fpath, "rb") as fp:
+					data = fp.read()
+				dstFs.writeFile(fpath.replace(os.sep, "/"), data)
+				count += 1
+	log.info(f"migrateToSqlite: copied {count} files in {now() - t0:.2f} seconds")
+	return count
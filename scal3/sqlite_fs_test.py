@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import join, dirname, abspath, isfile
+import tempfile
+import shutil
+import threading
+import time
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.s_object import (
+	DefaultFileSystem,
+	saveBsonObject,
+	loadBsonObject,
+	iterObjectFiles,
+)
+from scal3.sqlite_fs import SqliteFileSystem, migrateToSqlite
+
+
+class TestSqliteFileSystem(unittest.TestCase):
+	def setUp(self):
+		self.tmpDir = tempfile.mkdtemp(prefix="starcal-sqlite_fs_test-")
+		self.fs = SqliteFileSystem(join(self.tmpDir, "event.db"), self.tmpDir)
+
+	def tearDown(self):
+		self.fs.close()
+		shutil.rmtree(self.tmpDir)
+
+	def test_files(self):
+		fs = self.fs
+		fs.makeDir("event/groups")
+		with fs.open("event/events/1.json", "w") as fp:
+			fp.write('{"history": []}')
+		with fs.open(join(self.tmpDir, "event", "events", "2.json"), "w") as fp:
+			fp.write("{}")
+		self.assertTrue(fs.isfile("event/events/1.json"))
+		self.assertTrue(fs.isdir("event/groups"))
+		self.assertEqual(fs.listdir("event"), ["events", "groups"])
+		self.assertEqual(fs.listdir("event/events"), ["1.json", "2.json"])
+		with fs.open("event/events/1.json") as fp:
+			self.assertEqual(fp.read(), '{"history": []}')
+		fs.removeFile("event/events/1.json")
+		self.assertFalse(fs.isfile("event/events/1.json"))
+		with self.assertRaises(FileNotFoundError):
+			fs.open("event/events/1.json")
+		# paths outside dbDirs are real files
+		with fs.open("other.txt", "w") as fp:
+			fp.write("abc")
+		self.assertTrue(isfile(join(self.tmpDir, "other.txt")))
+
+	def test_objects(self):
+		fs = self.fs
+		hashes = [saveBsonObject({"index": index}, fs) for index in range(20)]
+		self.assertEqual(
+			sorted(_hash for _hash, _ in iterObjectFiles(fs)),
+			sorted(hashes),
+		)
+		for index, _hash in enumerate(hashes):
+			self.assertEqual(loadBsonObject(_hash, fs), {"index": index})
+
+	def test_transaction(self):
+		fs = self.fs
+		with self.assertRaises(RuntimeError):
+			with fs.transaction():
+				with fs.open("event/a.json", "w") as fp:
+					fp.write("{}")
+				raise RuntimeError
+		self.assertFalse(fs.isfile("event/a.json"))
+		with fs.transaction():
+			with fs.open("event/a.json", "w") as fp:
+				fp.write("{}")
+		self.assertTrue(fs.isfile("event/a.json"))
+
+	def test_threads(self):
+		fs = self.fs
+		started = threading.Event()
+
+		def rolledBack():
+			with suppress(RuntimeError):
+				with fs.transaction():
+					with fs.open("event/a.json", "w") as fp:
+						fp.write("{}")
+					started.set()
+					time.sleep(0.1)
+					raise RuntimeError
+
+		def write(index):
+			started.wait(5)
+			with fs.open(f"event/events/{index}.json", "w") as fp:
+				fp.write(str(index))
+
+		threads = [threading.Thread(target=rolledBack)] + [
+			threading.Thread(target=write, args=(index,))
+			for index in range(5)
+		]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		# writes of other threads are not rolled back with the transaction
+		self.assertFalse(fs.isfile("event/a.json"))
+		self.assertEqual(
+			fs.listdir("event/events"),
+			[f"{index}.json" for index in range(5)],
+		)
+		with ThreadPoolExecutor(max_workers=4) as executor:
+			self.assertEqual(
+				list(executor.map(
+					lambda index: fs.open(f"event/events/{index}.json").read(),
+					range(5),
+				)),
+				[str(index) for index in range(5)],
+			)
+
+	def test_migrate(self):
+		srcDir = join(self.tmpDir, "src")
+		srcFs = DefaultFileSystem(srcDir)
+		srcFs.makeDir("event/events")
+		with srcFs.open("event/events/5.json", "w") as fp:
+			fp.write("{}")
+		_hash = saveBsonObject({"a": 1}, srcFs)
+		self.assertEqual(migrateToSqlite(srcFs, self.fs), 2)
+		self.assertEqual(self.fs.listdir("event/events"), ["5.json"])
+		self.assertEqual(loadBsonObject(_hash, self.fs), {"a": 1})
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -22,14 +22,17 @@ log = logger.get()
 import time
 from time import localtime, mktime
 from time import time as now
-from datetime import datetime
+from datetime import datetime, timedelta
+from bisect import bisect_right
+from array import array
 
-from typing import Optional, Tuple, List, Dict, Union
+from typing import Optional, Tuple, List, Dict, Union, Iterable
 
 import natz
 
 from scal3.cal_types.gregorian import J0001, J1970, J0001_epoch
 from scal3.cal_types.gregorian import jd_to as jd_to_g
+from scal3.cal_types.gregorian import to_jd as to_jd_g
 from scal3.utils import ifloor, iceil
 
 # getEpochFromJd(gregorian.to_jd(10000, 1, 1))
@@ -53,9 +56,15 @@ TZ = Optional[natz.TimeZone]
 # function time.time() having the same name as its module is problematic
 # don't use time.time() directly again (other than once)
 
-utcOffsetByJdCache = {}
-# utcOffsetByJdCache: {tzStr => {jd => utcOffset}}
-# utcOffsetByJdCacheSize # FIXME
+dayLen = 24 * 3600
+
+# see TzTransitionTable
+tzProbeStep = 7 * dayLen
+tzBlockSize = 366 * dayLen
+
+# UTC offset of local epochs out of this range is 0
+J0001_localEpoch = (J0001 - J1970) * dayLen
+G10000_localEpoch = (to_jd_g(10000, 1, 1) - J1970) * dayLen
 
 
 class HMS:
@@ -99,19 +108,136 @@ class HMS:
 		return pyfmt.format(h=self.h, m=self.m, s=self.s)
 
 
+class TzTransitionTable:
+	"""
+		UTC offset of a time zone, by epoch or by local epoch
+		(epoch + offset, like a naive local datetime)
+
+		transitions are found by probing tz every tzProbeStep seconds,
+		so a change that is undone in less than that is missed
+		they are calculated and cached in blocks of tzBlockSize seconds,
+		each block has transitions of [start - dayLen, end + dayLen),
+		so local epochs near edges of block are handled by the same block
+
+		a local epoch in a gap or overlap (DST start or end) gets the
+		offset before transition, so start of a day that begins in a gap
+		(like DST start at 00:00) is the first existing moment of that day
+	"""
+
+	def __init__(self, tz: "datetime.tzinfo") -> None:
+		self.tz = tz
+		# block index -> (epochs, offsets, localEpochs)
+		# offsets[i] is offset before transition epochs[i]
+		# localEpochs[i] = epochs[i] + max(offsets[i], offsets[i + 1])
+		self.blocks = {}  # type: Dict[int, Tuple[List[int], List[int], List[int]]]
+
+	def probe(self, epoch: int) -> int:
+		epoch = min(max(epoch, J0001_epoch + dayLen), G10000_epoch - dayLen)
+		dt = (datetime(1970, 1, 1) + timedelta(seconds=epoch)).replace(
+			tzinfo=self.tz,
+		)
+		return int(self.tz.fromutc(dt).utcoffset().total_seconds())
+
+	def calcBlock(self, block: int) -> "Tuple[List[int], List[int], List[int]]":
+		start = block * tzBlockSize - dayLen
+		end = (block + 1) * tzBlockSize + dayLen
+		epochs = []
+		offsets = [self.probe(start)]
+		t = start
+		while t < end:
+			t2 = min(t + tzProbeStep, end)
+			offset2 = self.probe(t2)
+			while offset2 != offsets[-1]:
+				# find first epoch in (t, t2] with a different offset
+				low, high = t, t2
+				while high - low > 1:
+					mid = (low + high) // 2
+					if self.probe(mid) == offsets[-1]:
+						low = mid
+					else:
+						high = mid
+				epochs.append(high)
+				offsets.append(self.probe(high))
+				t = high
+			t = t2
+		localEpochs = [
+			epoch + max(offsets[index], offsets[index + 1])
+			for index, epoch in enumerate(epochs)
+		]
+		return epochs, offsets, localEpochs
+
+	def getBlock(self, block: int) -> "Tuple[List[int], List[int], List[int]]":
+		data = self.blocks.get(block)
+		if data is None:
+			data = self.blocks[block] = self.calcBlock(block)
+		return data
+
+	def getOffsetByEpoch(self, epoch: float) -> int:
+		epochs, offsets, _ = self.getBlock(int(epoch // tzBlockSize))
+		return offsets[bisect_right(epochs, epoch)]
+
+	def getOffsetByLocalEpoch(self, localEpoch: float) -> int:
+		_, offsets, localEpochs = self.getBlock(int(localEpoch // tzBlockSize))
+		return offsets[bisect_right(localEpochs, localEpoch)]
+
+	def getLocalRun(self, localEpoch: int) -> "Tuple[int, int]":
+		"""
+			returns (offset, untilLocalEpoch): offset is the same for all
+			local epochs from localEpoch to untilLocalEpoch
+		"""
+		block = localEpoch // tzBlockSize
+		_, offsets, localEpochs = self.getBlock(block)
+		index = bisect_right(localEpochs, localEpoch)
+		until = (block + 1) * tzBlockSize
+		if index < len(localEpochs):
+			until = min(until, localEpochs[index])
+		return offsets[index], until
+
+
+tzTables = {}  # type: Dict[str, TzTransitionTable]
+defaultTzTable = None  # type: Optional[TzTransitionTable]
+
+
+def getTzTable(tz: TZ = None) -> TzTransitionTable:
+	global defaultTzTable
+	if not tz:
+		if defaultTzTable is None:
+			defaultTzTable = getTzTable(natz.gettz())
+		return defaultTzTable
+	tzStr = str(tz)
+	table = tzTables.get(tzStr)
+	if table is None:
+		table = tzTables[tzStr] = TzTransitionTable(tz)
+	return table
+
+
+def clearTzTables(localTz: TZ = None) -> None:
+	"""
+		must be called after local time zone is changed
+		localTz: new local time zone, that is used when tz is not given
+			default: natz.gettz()
+	"""
+	global defaultTzTable
+	defaultTzTable = None
+	tzTables.clear()
+	if localTz:
+		defaultTzTable = getTzTable(localTz)
+
+
 def getUtcOffsetByEpoch(epoch: int, tz: TZ = None) -> int:
 	if epoch < J0001_epoch:
 		return 0
 	if epoch >= G10000_epoch:
 		return 0
-	if not tz:
-		tz = natz.gettz()
-	try:
-		dt = datetime.fromtimestamp(epoch)
-	except ValueError as e:
-		log.error(f"{epoch=}, error: {e}")
+	return getTzTable(tz).getOffsetByEpoch(epoch)
+
+
+def getUtcOffsetByLocalEpoch(localEpoch: int, tz: TZ = None) -> int:
+	if localEpoch < J0001_localEpoch:
 		return 0
-	return tz.utcoffset(dt).total_seconds()
+	if localEpoch >= G10000_localEpoch:
+		return 0
+	return getTzTable(tz).getOffsetByLocalEpoch(localEpoch)
 
 
 def getUtcOffsetByGDate(year: int, month: int, day: int, tz: TZ = None) -> int:
@@ -119,34 +245,14 @@ def getUtcOffsetByGDate(year: int, month: int, day: int, tz: TZ = None) -> int:
 		return 0
 	if year >= 10000:
 		return 0
-	if not tz:
-		tz = natz.gettz()
-	try:
-		dt = datetime(year, month, day)
-	except ValueError as e:
-		log.error(f"getUtcOffsetByGDate: {year=}, error: {e}")
-		return 0
-	return tz.utcoffset(dt).total_seconds()
+	return getUtcOffsetByLocalEpoch(
+		(to_jd_g(year, month, day) - J1970) * dayLen,
+		tz,
+	)
 
 
 def getUtcOffsetByJd(jd: int, tz: TZ = None) -> int:
-	if not tz:
-		tz = natz.gettz()
-	tzStr = str(tz)
-	# utcOffsetByJdCache: {tzStr => {jd => utcOffset}}
-	if jd >= J1970:
-		tzDict = utcOffsetByJdCache.get(tzStr)
-		if tzDict is None:
-			tzDict = utcOffsetByJdCache[tzStr] = {}
-		offset = tzDict.get(jd)
-		if offset is None:
-			y, m, d = jd_to_g(jd)
-			offset = tzDict[jd] = getUtcOffsetByGDate(y, m, d, tz)
-	else:
-		y, m, d = jd_to_g(jd)
-		offset = getUtcOffsetByGDate(y, m, d, tz)
-
-	return offset
+	return getUtcOffsetByLocalEpoch((jd - J1970) * dayLen, tz)
 
 
 def getUtcOffsetCurrent(tz: TZ = None) -> int:
@@ -166,9 +272,48 @@ def getJdFromEpoch(epoch, tz: TZ = None) -> int:
 
 
 def getEpochFromJd(jd, tz: TZ = None) -> int:
-	localEpoch = (jd - J1970) * 24 * 3600
-	year, month, day = jd_to_g(jd)  # jd or jd-1? FIXME
-	return localEpoch - getUtcOffsetByGDate(year, month, day, tz)
+	localEpoch = (jd - J1970) * dayLen
+	return localEpoch - getUtcOffsetByLocalEpoch(localEpoch, tz)
+
+
+def getEpochArrayFromJdRange(
+	startJd: int,
+	endJd: int,
+	tz: TZ = None,
+) -> "array":
+	"""
+		returns array of getEpochFromJd(jd, tz) for jd in range(startJd, endJd)
+		with one table lookup for each UTC offset change
+	"""
+	result = array("q")
+	table = getTzTable(tz)
+	jd = startJd
+	while jd < endJd:
+		localEpoch = (jd - J1970) * dayLen
+		if not J0001_localEpoch <= localEpoch < G10000_localEpoch:
+			result.append(localEpoch)
+			jd += 1
+			continue
+		offset, until = table.getLocalRun(localEpoch)
+		# first jd with localEpoch >= until
+		runEnd = min(endJd, J1970 - (-until // dayLen))
+		for jd2 in range(jd, max(runEnd, jd + 1)):
+			result.append((jd2 - J1970) * dayLen - offset)
+		jd = max(runEnd, jd + 1)
+	return result
+
+
+def getJdArrayFromEpochs(epochs: "Iterable[float]", tz: TZ = None) -> "array":
+	"""
+		returns array of getJdFromEpoch(epoch, tz) for epochs
+	"""
+	table = getTzTable(tz)
+	result = array("q")
+	for epoch in epochs:
+		if J0001_epoch <= epoch < G10000_epoch:
+			epoch += table.getOffsetByEpoch(epoch)
+		result.append(ifloor(epoch / dayLen) + J1970)
+	return result
 
 
 def roundEpochToDay(epoch: int) -> int:
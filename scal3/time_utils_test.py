@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+import random
+from os.path import dirname, abspath
+from datetime import datetime, timedelta
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+import natz
+
+from scal3.cal_types import gregorian
+from scal3.time_utils import (
+	clearTzTables,
+	getUtcOffsetByEpoch,
+	getUtcOffsetByGDate,
+	getEpochFromJd,
+	getJdFromEpoch,
+	getEpochArrayFromJdRange,
+	getJdArrayFromEpochs,
+)
+
+tzNames = (
+	"Asia/Tehran",
+	"America/New_York",
+	"Australia/Lord_Howe",
+	"UTC",
+)
+
+
+def getOffsetByDateutil(epoch, tz):
+	dt = (datetime(1970, 1, 1) + timedelta(seconds=epoch)).replace(tzinfo=tz)
+	return tz.fromutc(dt).utcoffset().total_seconds()
+
+
+class TestTzTransitionTable(unittest.TestCase):
+	def test_getUtcOffsetByEpoch(self):
+		rand = random.Random(0)
+		for tzName in tzNames:
+			tz = natz.gettz(tzName)
+			for _ in range(2000):
+				epoch = rand.randint(-2000000000, 4000000000)
+				self.assertEqual(
+					getUtcOffsetByEpoch(epoch, tz),
+					getOffsetByDateutil(epoch, tz),
+					msg=f"{tzName=}, {epoch=}",
+				)
+
+	def test_gapAndOverlap(self):
+		tz = natz.gettz("America/New_York")
+		# 2021-03-14 02:30 does not exist, 2021-11-07 01:30 is ambiguous
+		jd = gregorian.to_jd(2021, 3, 14)
+		self.assertEqual(getUtcOffsetByGDate(2021, 3, 13, tz), -5 * 3600)
+		self.assertEqual(getUtcOffsetByGDate(2021, 3, 15, tz), -4 * 3600)
+		self.assertEqual(getEpochFromJd(jd, tz), 1615698000)
+		self.assertEqual(getEpochFromJd(jd + 1, tz) - getEpochFromJd(jd, tz), 23 * 3600)
+		jd = gregorian.to_jd(2021, 11, 7)
+		self.assertEqual(getEpochFromJd(jd + 1, tz) - getEpochFromJd(jd, tz), 25 * 3600)
+		# DST started at 00:00, so day starts at 01:00
+		tz = natz.gettz("Asia/Tehran")
+		jd = gregorian.to_jd(1979, 5, 27)
+		self.assertEqual(getJdFromEpoch(getEpochFromJd(jd, tz), tz), jd)
+		self.assertEqual(getEpochFromJd(jd + 1, tz) - getEpochFromJd(jd, tz), 23 * 3600)
+
+	def test_roundTrip(self):
+		for tzName in tzNames:
+			tz = natz.gettz(tzName)
+			for jd in range(gregorian.to_jd(1950, 1, 1), gregorian.to_jd(2050, 1, 1), 7):
+				self.assertEqual(getJdFromEpoch(getEpochFromJd(jd, tz), tz), jd)
+
+	def test_bulk(self):
+		rand = random.Random(1)
+		for tzName in tzNames:
+			tz = natz.gettz(tzName)
+			startJd = gregorian.to_jd(1900, 1, 1)
+			endJd = gregorian.to_jd(2100, 1, 1)
+			self.assertEqual(
+				list(getEpochArrayFromJdRange(startJd, endJd, tz)),
+				[getEpochFromJd(jd, tz) for jd in range(startJd, endJd)],
+			)
+			epochs = [rand.randint(-2000000000, 4000000000) for _ in range(1000)]
+			self.assertEqual(
+				list(getJdArrayFromEpochs(epochs, tz)),
+				[getJdFromEpoch(epoch, tz) for epoch in epochs],
+			)
+		self.assertEqual(list(getEpochArrayFromJdRange(10, 10)), [])
+
+	def test_clearTzTables(self):
+		epoch = 1600000000  # 2020-09-13
+		jd = gregorian.to_jd(2020, 9, 13)
+		localOffset = getOffsetByDateutil(epoch, natz.gettz())
+		self.assertEqual(getUtcOffsetByEpoch(epoch), localOffset)
+		try:
+			for tzName in tzNames:
+				tz = natz.gettz(tzName)
+				clearTzTables(tz)
+				self.assertEqual(getUtcOffsetByEpoch(epoch), getOffsetByDateutil(epoch, tz))
+				self.assertEqual(getEpochFromJd(jd), getEpochFromJd(jd, tz))
+		finally:
+			clearTzTables()
+		self.assertEqual(getUtcOffsetByEpoch(epoch), localOffset)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -16,16 +16,19 @@
 # You should have received a copy of the GNU Affero General Public License along
 # with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
 
-import logging
 from scal3 import logger
 log = logger.get()
-debugMode = log.level <= logging.DEBUG
 
-from time import time as now
+from cachetools import LRUCache
 
 from scal3.locale_man import tr as _
 from scal3 import ui
+from scal3 import instrument
+from scal3.utils import ifloor, iceil
+from scal3.time_utils import getJdArrayFromEpochs
+from scal3.graph_utils import IntervalColoring, splitIntervalComponents
 from scal3.timeline import tl
+from scal3.timeline.utils import dayLen
 
 
 movableEventTypes = (
@@ -73,6 +76,11 @@ class Box:
 		####
 		self.hasBorder = False
 		self.tConflictBefore = []
+		# level of box in timeline (color in interval graph of boxes)
+		# is set once and kept while panning, see EventBoxLayout
+		self.level = None
+		# for density bars: height relative to du, from 0 to 1
+		self.density = None
 
 	def mt_key(self):
 		return self.mt
@@ -87,99 +95,134 @@ class Box:
 		self.w = (self.t1 - self.t0) * pixelPerSec
 		self.y = beforeBoxH + maxBoxH * self.u0
 		self.h = maxBoxH * self.du
+		if self.density is not None:
+			h = self.h * self.density
+			if not tl.boxReverseGravity:
+				self.y += self.h - h
+			self.h = h
 
 	def contains(self, px, py):
 		return 0 <= px - self.x < self.w and 0 <= py - self.y < self.h
 
 
-def makeIntervalGraph(boxes):
-	try:
-		from scal3.graph_utils import Graph
-	except ImportError:
-		return
-	g = Graph()
-	n = len(boxes)
-	g.add_vertices(n)
-	g.vs["name"] = list(range(n))
-	####
-	points = []  # List[(time: int, isStart: bool, boxIndex: int)]
-	for boxI, box in enumerate(boxes):
-		points += [
-			(box.t0, True, boxI),
-			(box.t1, False, boxI),
-		]
-	points.sort()
-	openBoxes = set()
-	for t, isStart, boxI in points:
-		if isStart:
-			g.add_edges([
-				(boxI, oboxI) for oboxI in openBoxes
-			])
-			openBoxes.add(boxI)
-		else:
-			openBoxes.remove(boxI)
-	return g
-
-
-def renderBoxesByGraph(boxes, graph, minColor, minU):
-	colorCount = max(graph.vs["color"]) - minColor + 1
-	if colorCount < 1:
+def layoutBoxes(boxes: "List[Box]") -> None:
+	"""
+		sets u0 and du of boxes based on box.level
+		levels that are not used by any of boxes do not take space
+		boxes of the lowest level are placed first, then each connected
+		component of the rest of boxes is placed in the remaining space
+	"""
+	levels = sorted({box.level for box in boxes})
+	levelColor = {level: color for color, level in enumerate(levels)}
+	colors = [levelColor[box.level] for box in boxes]
+	coloring = IntervalColoring()
+	for box, color in zip(boxes, colors):
+		coloring.add(color, box.t0, box.t1)
+	heights = [
+		coloring.getHeight(color, box.t0, box.t1)
+		for box, color in zip(boxes, colors)
+	]
+	stack = [(
+		sorted(range(len(boxes)), key=lambda i: boxes[i].t0),
+		0,  # minColor
+		0.0,  # minU
+	)]
+	while stack:
+		indices, minColor, minU = stack.pop()
+		colorCount = max(colors[i] for i in indices) - minColor + 1
+		du = (1.0 - minU) / colorCount
+		rest = []  # List[(t0, t1, boxIndex)]
+		for i in indices:
+			box = boxes[i]
+			if colors[i] != minColor:
+				rest.append((box.t0, box.t1, i))
+				continue
+			box.du = du * heights[i]
+			box.u0 = minU if tl.boxReverseGravity else 1 - minU - box.du
+		for component in splitIntervalComponents(rest):
+			stack.append((component, minColor + 1, minU + du))
+
+
+def onOccurDensityReady() -> None:
+	# called from a thread of EventGroup.getOccurDensity
+	if boxCache.onChange is not None:
+		boxCache.onChange()
+
+
+def isDensityGroup(group: "EventGroup", pixelPerSec: float) -> bool:
+	"""
+		False if density of group is not ready yet (in lazyOccurrence mode)
+		then boxes of occurrences are used until it's ready
+	"""
+	if dayLen * pixelPerSec >= tl.lodDayPixel:
+		return False
+	density = group.getOccurDensity(onReady=onOccurDensityReady)
+	if density is None:
+		return False
+	return density.getTotal() >= tl.lodMinOccurCount
+
+
+def calcDensityBars(
+	group: "EventGroup",
+	startTm: float,
+	endTm: float,
+	pixelPerSec: float,
+) -> "Iterator[Box]":
+	"""
+		yields density bars of group between startTm and endTm
+		from group.getOccurDensity(), without searching occurrences
+		bars are aligned to multiples of their time width, so they
+		do not change while panning
+	"""
+	density = group.getOccurDensity()
+	barTm = tl.lodBarWidth / pixelPerSec
+	maxCount = density.getMaxCount(iceil(barTm / dayLen))
+	if maxCount == 0:
 		return
-	du = (1.0 - minU) / colorCount
-	min_vertices = graph.vs.select(color_eq=minColor)  # a VertexSeq
-	for v in min_vertices:
-		box = boxes[v["name"]]
-		box_du = du * v["box_height"]
-		box.u0 = minU if tl.boxReverseGravity else 1 - minU - box_du
-		box.du = box_du
-	graph.delete_vertices(min_vertices)
-	for subGraph in graph.decompose():
-		renderBoxesByGraph(
-			boxes,
-			subGraph,
-			minColor + 1,
-			minU + du,
+	edges = [
+		i * barTm
+		for i in range(ifloor(startTm / barTm), ifloor(endTm / barTm) + 2)
+	]
+	jds = getJdArrayFromEpochs(edges)
+	for i in range(len(edges) - 1):
+		count = density.getCount(jds[i], jds[i + 1])
+		if count == 0:
+			continue
+		box = Box(
+			edges[i],
+			edges[i + 1],
+			barTm,
+			0,
+			1,
+			color=group.color,
+			lineW=0,
 		)
+		box.density = min(1.0, count / maxCount)
+		yield box
 
 
-def calcEventBoxes(
-	timeStart,
-	timeEnd,
-	pixelPerSec,
-	borderTm,
-):
-	try:
-		from scal3.graph_utils import (
-			Graph,
-			colorGraph,
-			addBoxHeightToColoredGraph,
-		)
-	except ImportError:
-		errorBoxH = 0.8  # FIXME
-		return [
-			Box(
-				timeStart,
-				timeEnd,
-				timeEnd - timeStart,
-				1 - errorBoxH,  # u0
-				errorBoxH,  # du
-				text="Install \"python3-igraph\" to see events",
-				color=(128, 0, 0),  # FIXME
-				lineW=2 * tl.boxLineWidth,
-			)
-		]
+def searchBoxes(
+	startTm: float,
+	endTm: float,
+	pixelPerSec: float,
+	borderTm: float,
+) -> "Dict[Tuple[int, float, float], List[Box]]":
+	"""
+		returns boxes of occurrences between startTm and endTm
+		keyed by (groupIndex, t0, t1)
+	"""
 	boxesDict = {}
-	# timeMiddle = (timeStart + timeEnd) / 2.0
 	for groupIndex in range(len(ui.eventGroups)):
 		group = ui.eventGroups.byIndex(groupIndex)
 		if not group.enable:
 			continue
 		if not group.showInTimeLine:
 			continue
-		for t0, t1, eid, odt in group.occur.search(
-			timeStart - borderTm,
-			timeEnd + borderTm,
-		):
+		if isDensityGroup(group, pixelPerSec):
+			for box in calcDensityBars(group, startTm, endTm, pixelPerSec):
+				boxesDict[(groupIndex, box.t0, box.t1)] = [box]
+			continue
+		for t0, t1, eid, odt in group.occur.search(startTm, endTm):
 			pixBoxW = (t1 - t0) * pixelPerSec
 			if pixBoxW < tl.boxSkipPixelLimit:
 				continue
@@ -187,10 +230,6 @@ def calcEventBoxes(
 			# 	log.error(f"----- bad eid from search: {eid!r}")
 			# 	continue
 			event = group[eid]
-			eventIndex = group.index(eid)
-			if t0 <= timeStart and timeEnd <= t1:
-				# Fills Range, FIXME
-				continue
 			lineW = tl.boxLineWidth
 			if lineW >= 0.5 * pixBoxW:
 				lineW = 0
@@ -212,54 +251,183 @@ def calcEventBoxes(
 				boxesDict[boxValue] = [box]
 			else:
 				boxesDict[boxValue].append(box)
+	return boxesDict
 
-	###
-	if debugMode:
-		t0 = now()
-	boxes = []
-	for boxValue, boxGroup in sorted(boxesDict.items()):
-		if len(boxGroup) < 4:
-			boxes += boxGroup
-		else:
-			box = boxGroup[0]
-			box.text = _("{eventCount} events").format(
-				eventCount=_(len(boxGroup)),
-			)
-			box.ids = None
-			# log.debug(f"{len(boxGroup) = }")
-			# log.debug(f"{box.t1 - box.t0} secs")
-			boxes.append(box)
-	del boxesDict
-	#####
-	if not boxes:
-		return []
-	#####
-	if debugMode:
-		t1 = now()
-	###
-	graph = makeIntervalGraph(boxes)
-	if debugMode:
-		log.debug(f"makeIntervalGraph: {now() - t1:e}")
-	#####
-
-	def boxSortKeyFunc(i: int) -> "Tuple":
-		# the last item should be i
-		# the first item should be -g.degree(i) to have less number of colors/levels,
-		# and give higher colors to more isolated vertices/boxes
-		# adding -boxes[i].odt before i does not seem very effective or useful
-		# should I add groupIndex before i?
+
+def mergeBoxGroup(boxGroup: "List[Box]") -> "List[Box]":
+	if len(boxGroup) < 4:
+		return boxGroup
+	box = boxGroup[0]
+	box.text = _("{eventCount} events").format(
+		eventCount=_(len(boxGroup)),
+	)
+	box.ids = None
+	# log.debug(f"{len(boxGroup) = }")
+	# log.debug(f"{box.t1 - box.t0} secs")
+	return [box]
+
+
+class EventBoxLayout:
+	"""
+		event boxes of one zoom level, for time range [startTm, endTm)
+		that is already searched
+		panning only searches the newly exposed time range and sets
+		level of new boxes, level of other boxes is kept
+	"""
+
+	def __init__(self):
+		self.startTm = None
+		self.endTm = None
+		# key: (groupIndex, t0, t1), value: List[Box]
+		self.boxesByValue = {}
+		self.coloring = IntervalColoring()
+
+	def canExtend(self, startTm: float, endTm: float, maxWidth: float) -> bool:
+		if self.startTm is None:
+			return True
 		return (
-			-graph.degree(i),
-			i,
+			startTm <= self.endTm and
+			self.startTm <= endTm and
+			max(endTm, self.endTm) - min(startTm, self.startTm) <= maxWidth
 		)
 
-	# TODO: assign same color to subsequent events / boxes
-	# (box2.t0 == box1.t1)
+	def addRange(
+		self,
+		startTm: float,
+		endTm: float,
+		pixelPerSec: float,
+		borderTm: float,
+	) -> None:
+		for boxValue, boxGroup in searchBoxes(
+			startTm,
+			endTm,
+			pixelPerSec,
+			borderTm,
+		).items():
+			if boxValue in self.boxesByValue:
+				continue
+			self.boxesByValue[boxValue] = mergeBoxGroup(boxGroup)
 
-	colorGraph(graph, boxSortKeyFunc)
-	addBoxHeightToColoredGraph(graph)
-	renderBoxesByGraph(boxes, graph, 0, 0)
-	if debugMode:
-		log.debug(f"box placing time:  {now() - t0:e}")
-		log.debug("")
+	def extend(
+		self,
+		startTm: float,
+		endTm: float,
+		pixelPerSec: float,
+		borderTm: float,
+	) -> None:
+		if self.startTm is None:
+			self.addRange(startTm, endTm, pixelPerSec, borderTm)
+			self.startTm = startTm
+			self.endTm = endTm
+			return
+		if startTm < self.startTm:
+			self.addRange(startTm, self.startTm, pixelPerSec, borderTm)
+			self.startTm = startTm
+		if endTm > self.endTm:
+			self.addRange(self.endTm, endTm, pixelPerSec, borderTm)
+			self.endTm = endTm
+
+	def getBoxes(
+		self,
+		timeStart: float,
+		timeEnd: float,
+		startTm: float,
+		endTm: float,
+	) -> "List[Box]":
+		boxes = []
+		for boxValue in sorted(self.boxesByValue):
+			_groupIndex, t0, t1 = boxValue
+			if t1 < startTm or t0 > endTm:
+				continue
+			if t0 <= timeStart and timeEnd <= t1:
+				# Fills Range, FIXME
+				continue
+			boxes += self.boxesByValue[boxValue]
+		if not boxes:
+			return []
+		for box in sorted(
+			(box for box in boxes if box.level is None),
+			key=lambda box: (box.t0, -box.t1),
+		):
+			box.level = self.coloring.addFirstFit(box.t0, box.t1)
+		layoutBoxes(boxes)
+		return boxes
+
+
+class EventBoxCache:
+	"""
+		EventBoxLayout objects by zoom level (pixelPerSec and borderTm)
+		is cleared by onEventUpdate (EventUpdateQueue consumer)
+
+		`onChange` is called (from another thread) when cached boxes are
+		outdated for another reason, like when density of a group is
+		ready, so the caller must clear it (in main thread) and redraw
+	"""
+
+	# max width of cached time range, relative to width of window
+	maxWidthFactor = 20
+
+	def __init__(self, maxsize: int = 4) -> None:
+		self.layouts = LRUCache(maxsize=maxsize)
+		self.onChange = None  # type: Optional[Callable[[], None]]
+
+	def clear(self) -> None:
+		self.layouts.clear()
+
+	def onEventUpdate(self, record: "EventUpdateRecord") -> None:
+		self.clear()
+
+	def getKey(self, pixelPerSec: float, borderTm: float) -> "Tuple":
+		return (
+			pixelPerSec,
+			borderTm,
+			tl.boxSkipPixelLimit,
+			tl.boxLineWidth,
+			tuple(
+				(group.id, group.enable, group.showInTimeLine)
+				for group in ui.eventGroups
+			),
+		)
+
+	def getBoxes(
+		self,
+		timeStart: float,
+		timeEnd: float,
+		pixelPerSec: float,
+		borderTm: float,
+	) -> "List[Box]":
+		startTm = timeStart - borderTm
+		endTm = timeEnd + borderTm
+		key = self.getKey(pixelPerSec, borderTm)
+		layout = self.layouts.get(key)
+		if layout is None or not layout.canExtend(
+			startTm,
+			endTm,
+			self.maxWidthFactor * (endTm - startTm),
+		):
+			layout = self.layouts[key] = EventBoxLayout()
+		layout.extend(startTm, endTm, pixelPerSec, borderTm)
+		return layout.getBoxes(timeStart, timeEnd, startTm, endTm)
+
+
+# read by timeline in main thread, updates are delivered in main thread
+# (see EventUpdateQueue.uiDispatch)
+boxCache = EventBoxCache()
+ui.eventUpdateQueue.registerConsumer(boxCache)
+
+
+@instrument.timed("calcEventBoxes")
+def calcEventBoxes(
+	timeStart,
+	timeEnd,
+	pixelPerSec,
+	borderTm,
+):
+	boxes = boxCache.getBoxes(
+		timeStart,
+		timeEnd,
+		pixelPerSec,
+		borderTm,
+	)
+	instrument.count("calcEventBoxes.boxes", len(boxes))
 	return boxes
@@ -47,6 +47,7 @@ from scal3.locale_man import (
 )
 
 from scal3 import core
+from scal3 import instrument
 from scal3.core import jd_to_primary, primary_to_jd
 
 from scal3.color_utils import hslToRgb
@@ -84,9 +85,15 @@ def getNum10Pow(n):
 	return getNum10FactPow(n)[1]
 
 
-def getYearRangeTickValues(u0, y1, minStepYear):
+def getYearRangeTickValues(u0, y1, minStepYear, stepRange=None):
+	"""
+		stepRange: number of years that step is calculated based on,
+		default: y1 - u0
+	"""
 	data = {}
-	step = 10 ** max(0, ifloor(log10(y1 - u0)) - 1)
+	if stepRange is None:
+		stepRange = y1 - u0
+	step = 10 ** max(0, ifloor(log10(stepRange)) - 1)
 	u0 = step * (u0 // step)
 	for y in range(u0, y1, step):
 		n = 10 ** getNum10Pow(y)
@@ -134,13 +141,24 @@ def formatYear(y, prettyPower=False):
 #		hue += dh
 
 
-def calcTimeLineData(timeStart, timeWidth, pixelPerSec, borderTm):
+@instrument.timed("calcTimeLineBgData")
+def calcTimeLineBgData(timeStart, timeWidth, pixelPerSec, viewTimeWidth=None):
+	"""
+		returns holidays and ticks of time range, pixel positions are
+		relative to timeStart
+		viewTimeWidth: width of time line window (in seconds), that
+		decides which ticks and labels are shown, default: timeWidth
+		so that ticks of a part of window (a tile) are the same as
+		ticks of the whole window
+	"""
 	# from time import time as now
 	# funcTimeStart = now()
+	if viewTimeWidth is None:
+		viewTimeWidth = timeWidth
 	timeEnd = timeStart + timeWidth
 	jd0 = getJdFromEpoch(timeStart)
 	jd1 = getJdFromEpoch(timeEnd)
-	widthDays = timeWidth / dayLen
+	widthDays = viewTimeWidth / dayLen
 	dayPixel = dayLen * pixelPerSec ## px
 	# log.debug(f"{dayPixel = } px")
 
@@ -172,6 +190,7 @@ def calcTimeLineData(timeStart, timeWidth, pixelPerSec, borderTm):
 		year0,
 		year1 + 1,
 		minStepYear,
+		stepRange=int(viewTimeWidth / minYearLenSec) + 1,
 	):
 		tmEpoch = getEpochFromDate(year, 1, 1, calTypes.primary)
 		if tmEpoch in tickEpochSet:
@@ -237,7 +256,7 @@ def calcTimeLineData(timeStart, timeWidth, pixelPerSec, borderTm):
 			# tickEpochSet.add(tmEpoch)
 	# print(f"week day: count: {len(tickEpochSet)}, {len(ticks)}, dt={now()-funcTimeStart:.5f}")
 	# ########## Day of Month
-	hasMonthName = timeWidth < 5 * dayLen
+	hasMonthName = viewTimeWidth < 5 * dayLen
 	minDayUnit = minStep / dayLen  # days
 
 	def addDayOfMonthTick(jd, month, day, dayUnit):
@@ -257,7 +276,7 @@ def calcTimeLineData(timeStart, timeWidth, pixelPerSec, borderTm):
 		))
 		tickEpochSet.add(tmEpoch)
 
-	if minDayUnit <= 1 and jd1 - jd0 < 70:
+	if minDayUnit <= 1 and widthDays < 70:
 		for jd in range(jd0, jd1 + 1):
 			year, month, day = jd_to_primary(jd)
 			if day in (1, 16):
@@ -336,13 +355,17 @@ def calcTimeLineData(timeStart, timeWidth, pixelPerSec, borderTm):
 				))
 				tickEpochSet.add(tmEpoch)
 	# print(f"total: count: {len(tickEpochSet)}, {len(ticks)}, dt={now()-funcTimeStart:.5f}\n")
-	# ###################### Event Boxes
-	data = {
+	return {
 		"holidays": holidays,
 		"ticks": ticks,
-		"boxes": [],
 	}
-	###
+
+
+@instrument.timed("calcTimeLineData")
+def calcTimeLineData(timeStart, timeWidth, pixelPerSec, borderTm):
+	timeEnd = timeStart + timeWidth
+	data = calcTimeLineBgData(timeStart, timeWidth, pixelPerSec)
+	# ###################### Event Boxes
 	data["boxes"] = calcEventBoxes(
 		timeStart,
 		timeEnd,
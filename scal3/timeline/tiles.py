@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from math import floor
+
+from cachetools import LRUCache
+
+from scal3 import instrument
+
+# Offscreen tiles of timeline, anchored to time
+# tile `index` of a zoom level (pixelPerSec) covers time range
+# [index * tileTm, (index + 1) * tileTm), where tileTm = tileWidth / pixelPerSec
+# so panning only moves tiles, and only renders the newly exposed ones
+#
+# each tile keeps a signature of its content that is not fixed by
+# zoom level and index (event boxes), tile is rendered again when
+# signature is changed, for example after an event is edited
+
+tileWidth = 256  # pixel
+
+
+def getBoxesSignature(boxes: "List[Box]") -> "Tuple":
+	return tuple(
+		(
+			box.t0,
+			box.t1,
+			box.u0,
+			box.du,
+			box.text,
+			box.color,
+			box.lineW,
+			box.hasBorder,
+			box.density,
+		)
+		for box in boxes
+	)
+
+
+class TileCache:
+	def __init__(self, maxsize: int = 64) -> None:
+		# key: (zoomKey, index), value: (surface, signature)
+		self.tiles = LRUCache(maxsize=maxsize)
+
+	def clear(self) -> None:
+		self.tiles.clear()
+
+	@staticmethod
+	def getTileRange(
+		timeStart: float,
+		timeEnd: float,
+		pixelPerSec: float,
+	) -> "range":
+		tileTm = tileWidth / pixelPerSec
+		return range(
+			floor(timeStart / tileTm),
+			floor(timeEnd / tileTm) + 1,
+		)
+
+	@staticmethod
+	def getTileStart(index: int, pixelPerSec: float) -> float:
+		return index * tileWidth / pixelPerSec
+
+	def getTile(
+		self,
+		zoomKey: "Tuple",
+		index: int,
+		signature: "Tuple",
+		render: "Callable[[], Any]",
+	) -> "Any":
+		"""
+			returns the cached surface of tile, or calls render() to make
+			it if it's missing or its signature is changed
+		"""
+		key = (zoomKey, index)
+		tile = self.tiles.get(key)
+		if tile is not None and tile[1] == signature:
+			instrument.count("TileCache.hit")
+			return tile[0]
+		instrument.count("TileCache.miss")
+		surface = render()
+		self.tiles[key] = (surface, signature)
+		return surface
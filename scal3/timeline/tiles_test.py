@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import unittest
+
+import sys
+from os.path import dirname, abspath
+
+rootDir = dirname(dirname(dirname(abspath(__file__))))
+sys.path.insert(0, rootDir)
+
+from scal3.timeline.tiles import (
+	TileCache,
+	tileWidth,
+)
+
+
+class TestTileCache(unittest.TestCase):
+	def test_getTileRange(self):
+		pixelPerSec = tileWidth / 100  # each tile is 100 seconds
+		self.assertEqual(TileCache.getTileRange(0, 250, pixelPerSec), range(0, 3))
+		self.assertEqual(TileCache.getTileRange(-50, 99, pixelPerSec), range(-1, 1))
+		self.assertEqual(TileCache.getTileStart(-1, pixelPerSec), -100)
+		self.assertEqual(TileCache.getTileStart(3, pixelPerSec), 300)
+
+	def test_getTile(self):
+		rendered = []
+
+		def render(index):
+			rendered.append(index)
+			return f"surface{index}"
+
+		cache = TileCache(maxsize=2)
+		self.assertEqual(cache.getTile(1, 5, (), lambda: render(5)), "surface5")
+		self.assertEqual(cache.getTile(1, 5, (), lambda: render(5)), "surface5")
+		self.assertEqual(rendered, [5])
+		# signature is changed (an event box is edited)
+		cache.getTile(1, 5, ("box",), lambda: render(5))
+		self.assertEqual(rendered, [5, 5])
+		# another zoom level
+		cache.getTile(2, 5, ("box",), lambda: render(5))
+		cache.getTile(2, 6, (), lambda: render(6))
+		self.assertEqual(rendered, [5, 5, 5, 6])
+		self.assertEqual(len(cache.tiles), 2)
+		cache.clear()
+		cache.getTile(2, 6, (), lambda: render(6))
+		self.assertEqual(rendered, [5, 5, 5, 6, 6])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -69,6 +69,9 @@ confParams = (
 	"boxReverseGravity",
 	"boxSkipPixelLimit",
 	"rotateBoxLabel",
+	"lodDayPixel",
+	"lodMinOccurCount",
+	"lodBarWidth",
 	#####################
 	"enableAnimation",
 	"movingStaticStepKeyboard",
@@ -168,6 +171,13 @@ rotateBoxLabel = -1
 # 1: 90 deg CCW (if needed)
 # -1: 90 deg CW (if needed)
 
+# level of detail: when a day is narrower than lodDayPixel, groups
+# with at least lodMinOccurCount occurrences are shown as density bars
+# (number of occurrences by time) instead of a box for each occurrence
+lodDayPixel = 1.0  # pixel
+lodMinOccurCount = 100
+lodBarWidth = 4  # pixel
+
 #############################################
 
 enableAnimation = False
@@ -53,6 +53,8 @@ from scal3.locale_man import numDecode
 
 
 from scal3 import core
+from scal3 import instrument
+from scal3 import plugin_man
 
 from scal3 import event_lib
 from scal3.event_update_queue import EventUpdateQueue
@@ -365,9 +367,7 @@ class Cell(CellType):
 	"""
 	status and information of a cell
 	"""
-	# ocTimeMax = 0
-	# ocTimeCount = 0
-	# ocTimeSum = 0
+	@instrument.timed("Cell.__init__")
 	def __init__(self, jd: int):
 		self._eventsData = None  # type: Optional[List[Dict]]
 		self._pluginsText = []  # type: List[List[str]]
@@ -401,7 +401,8 @@ class Cell(CellType):
 			plug = core.allPlugList[k]
 			if plug:
 				try:
-					plug.updateCell(self)
+					with instrument.timer("plugin.updateCell"):
+						plug.updateCell(self)
 				except Exception:
 					log.exception("")
 		###################
@@ -433,12 +434,13 @@ class Cell(CellType):
 	def getEventsData(self):
 		if self._eventsData is not None:
 			return self._eventsData
-		# t0 = now()
-		self._eventsData = event_lib.getDayOccurrenceData(
-			self.jd,
-			eventGroups,
-			tfmt=eventDayViewTimeFormat,
-		)
+		with instrument.timer("Cell.getEventsData"):
+			self._eventsData = event_lib.getDayOccurrenceData(
+				self.jd,
+				eventGroups,
+				tfmt=eventDayViewTimeFormat,
+				cache=dayOccurCache,
+			)
 		return self._eventsData
 		"""
 		self._eventsData is a list, each item is a dictionary
@@ -453,10 +455,6 @@ class Cell(CellType):
 			show: tuple of 3 bools (showInDCal, showInWCal, showInMCal)
 			showInStatusIcon: bool
 		"""
-		# dt = now() - t0
-		# Cell.ocTimeSum += dt
-		# Cell.ocTimeCount += 1
-		# Cell.ocTimeMax = max(Cell.ocTimeMax, dt)
 
 	def format(
 		self,
@@ -523,6 +521,7 @@ class CellCache:
 	def clear(self) -> None:
 		global cell, todayCell
 		self.resetCache()
+		dayOccurCache.clear()
 		cell = self.getCell(cell.jd)
 		todayCell = self.getCell(todayCell.jd)
 
@@ -556,7 +555,9 @@ class CellCache:
 	def getCell(self, jd: int) -> CellType:
 		c = self.jdCells.get(jd)
 		if c is not None:
+			instrument.count("CellCache.hit")
 			return c
+		instrument.count("CellCache.miss")
 		return self.buildCell(jd)
 
 	def getTmpCell(self, jd: int) -> CellType:
@@ -589,13 +590,17 @@ class CellCache:
 		cells = self.getCellGroup("WeekCal", absWeekNumber)
 		wEventData = self.weekEvents.get(absWeekNumber)
 		if wEventData is None:
+			instrument.count("CellCache.weekEvents.miss")
 			wEventData = event_lib.getWeekOccurrenceData(
 				absWeekNumber,
 				eventGroups,
 				tfmt=eventWeekViewTimeFormat,
+				cache=dayOccurCache,
 			)
 			self.weekEvents[absWeekNumber] = wEventData
 			# log.info(f"weekEvents cache: {len(self.weekEvents)}")
+		else:
+			instrument.count("CellCache.weekEvents.hit")
 		return cells, wEventData
 
 	# def getMonthData(self, year, month):  # needed? FIXME
@@ -719,11 +724,34 @@ def initFonts(fontDefaultNew: Tuple[str, bool, bool, float]) -> None:
 
 
 def getHolidaysJdList(startJd: int, endJd: int) -> List[int]:
+	"""
+		same as checking cell.holiday for each jd, without building cells
+		unless an enabled plugin overrides updateCell without hasHolidays
+		(it may set cell.holiday)
+	"""
+	plugs = []
+	for k in core.plugIndex:
+		plug = core.allPlugList[k]
+		if not plug:
+			continue
+		if plug.hasHolidays:
+			plugs.append(plug)
+			continue
+		if type(plug).updateCell is not plugin_man.BasePlugin.updateCell:
+			return [
+				jd for jd in range(startJd, endJd)
+				if cellCache.getTmpCell(jd).holiday
+			]
+	holidayWeekDays = core.holidayWeekDays
 	jdList = []
 	for jd in range(startJd, endJd):
-		tmpCell = cellCache.getTmpCell(jd)
-		if tmpCell.holiday:
+		if core.jwday(jd) in holidayWeekDays:
 			jdList.append(jd)
+			continue
+		for plug in plugs:
+			if plug.isHolidayJd(jd):
+				jdList.append(jd)
+				break
 	return jdList
 
 
@@ -821,6 +849,10 @@ def init() -> None:
 	core.init()
 
 	fs = core.fs
+	if isfile(eventDbPath):
+		from scal3.sqlite_fs import SqliteFileSystem
+		log.info(f"using event database {eventDbPath}")
+		fs = SqliteFileSystem(eventDbPath, confDir)
 	event_lib.init(fs)
 	# Load accounts, groups and trash? FIXME
 	eventAccounts = event_lib.EventAccountsHolder.load(fs)
@@ -1232,6 +1264,13 @@ def iterAllEvents():  # dosen"t include orphan events
 
 eventUpdateQueue = EventUpdateQueue()
 
+# occurrences of eventGroups bucketed by jd, shared by day and week views
+# it's read by gtk widgets, and it reads group.occur, so it's updated in
+# main thread, and registered before widgets, so it's updated before they
+# re-read event data
+dayOccurCache = event_lib.DayOccurrenceCache()
+eventUpdateQueue.registerConsumer(dayOccurCache)
+
 
 # def updateEventTagsUsage():  # FIXME where to use?
 # 	tagsDict = getEventTagsDict()
@@ -39,6 +39,7 @@ from scal3.locale_man import (
 )
 from scal3.locale_man import tr as _
 from scal3 import ui
+from scal3 import instrument
 from scal3.drawing import getAbsPos
 from scal3.monthcal import getCurrentMonthStatus
 from scal3.season import getSeasonNamePercentFromJd
@@ -784,6 +785,7 @@ class DayCal(gtk.DrawingArea, CalBase):
 		cr.move_to(xc - font_w / 2, yc - font_h / 2)
 		show_layout(cr, layout)
 
+	@instrument.timed("DayCal.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context", cursor: bool):
 		#gevent = gtk.get_current_event()
 		w = self.get_allocation().width
@@ -17,12 +17,12 @@
 # with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
 
 from scal3 import core
+from scal3 import event_lib
 from scal3.locale_man import tr as _
 
 from scal3.ui_gtk import *
 from scal3.ui_gtk.utils import set_tooltip
 from scal3.ui_gtk.mywidgets import MyColorButton, TextFrame
-from scal3.ui_gtk.mywidgets.multi_spin.integer import IntSpinButton
 from scal3.ui_gtk.mywidgets.icon import IconSelectButton
 from scal3.ui_gtk.event import common
 
@@ -123,13 +123,30 @@ class BaseWidgetClass(gtk.Box):
 		pack(self, hbox)
 		#####
 		hbox = HBox()
-		label = gtk.Label(label=_("Event Cache Size"))
+		label = gtk.Label(label=_("Occurrence Index"))
 		label.set_xalign(0)
 		pack(hbox, label)
 		self.sizeGroup.add_widget(label)
-		self.cacheSizeSpin = IntSpinButton(0, 9999)
-		pack(hbox, self.cacheSizeSpin)
+		self.occurEngineCombo = gtk.ComboBoxText()
+		self.occurEngineCombo.append_text(_("Tree"))
+		self.occurEngineCombo.append_text(_("Compact Array"))
+		pack(hbox, self.occurEngineCombo)
+		pack(hbox, gtk.Label(), 1, 1)
+		pack(self, hbox)
+		set_tooltip(hbox, _(
+			"Compact Array uses less memory for groups with many occurrences"
+		))
+		#####
+		hbox = HBox()
+		self.lazyOccurrenceCheck = gtk.CheckButton(
+			label=_("Calculate Occurrences On Demand"),
+		)
+		pack(hbox, self.lazyOccurrenceCheck)
 		pack(self, hbox)
+		set_tooltip(hbox, _(
+			"Only calculate occurrences of the dates that are viewed" +
+			", makes startup faster for large groups"
+		))
 		#####
 		hbox = HBox()
 		label = gtk.Label(label=_("Event Text Separator"))
@@ -186,7 +203,10 @@ class BaseWidgetClass(gtk.Box):
 		self.showInMCalCheck.set_active(self.group.showInMCal)
 		self.showInTimeLineCheck.set_active(self.group.showInTimeLine)
 		self.showInStatusIconCheck.set_active(self.group.showInStatusIcon)
-		self.cacheSizeSpin.set_value(self.group.eventCacheSize)
+		self.occurEngineCombo.set_active(
+			event_lib.occurEngineNames.index(self.group.occurEngine)
+		)
+		self.lazyOccurrenceCheck.set_active(self.group.lazyOccurrence)
 		self.sepInput.set_text(self.group.eventTextSep)
 		#self.showFullEventDescCheck.set_active(self.group.showFullEventDesc)
 		if self.userCanAddEvents:
@@ -206,7 +226,10 @@ class BaseWidgetClass(gtk.Box):
 		self.group.showInMCal = self.showInMCalCheck.get_active()
 		self.group.showInTimeLine = self.showInTimeLineCheck.get_active()
 		self.group.showInStatusIcon = self.showInStatusIconCheck.get_active()
-		self.group.eventCacheSize = int(self.cacheSizeSpin.get_value())
+		self.group.occurEngine = event_lib.occurEngineNames[
+			self.occurEngineCombo.get_active()
+		]
+		self.group.lazyOccurrence = self.lazyOccurrenceCheck.get_active()
 		self.group.eventTextSep = self.sepInput.get_text()
 		#self.group.showFullEventDesc = self.showFullEventDescCheck.get_active()
 		if self.userCanAddEvents:
@@ -397,6 +397,12 @@ class EventManagerDialog(gtk.Dialog, MyDialog, ud.BaseCalObj):  # FIXME
 		self.showDescItem.set_active(eventManShowDescription)
 		self.showDescItem.connect("toggled", self.showDescItemToggled)
 		viewMenu.append(self.showDescItem)
+		##
+		viewMenu.append(gtk.SeparatorMenuItem())
+		##
+		cacheStatsItem = MenuItem(_("Event Cache Statistics"))
+		cacheStatsItem.connect("activate", self.onMenuBarCacheStatsClick)
+		viewMenu.append(cacheStatsItem)
 		####
 		# testItem = MenuItem(_("Test"))
 		# testMenu = Menu()
@@ -1632,6 +1638,26 @@ class EventManagerDialog(gtk.Dialog, MyDialog, ud.BaseCalObj):  # FIXME
 	def onMenuBarOrphanClick(self, menuItem: gtk.MenuItem) -> None:
 		self.waitingDo(self._do_checkForOrphans)
 
+	def onMenuBarCacheStatsClick(self, menuItem: gtk.MenuItem) -> None:
+		cache = lib.eventCache
+		cache.logStats()
+		stats = cache.getStats()
+		lines = [
+			_("Cached Events") + f": {stats['count']}",
+			_("Memory") + f": {stats['size'] / 1024:.0f} / " +
+			f"{stats['maxSize'] / 1024:.0f} KiB",
+			_("Hits") + f": {stats['hits']}",
+			_("Misses") + f": {stats['misses']}",
+			_("Hit Rate") + f": {stats['hitRate']:.1%}",
+			_("Evictions") + f": {stats['evictions']}",
+			"",
+		]
+		counts = cache.getCountByParent()
+		for group in ui.eventGroups:
+			if group in counts:
+				lines.append(f"{group.title}: {counts[group]}")
+		showInfo("\n".join(lines), transient_for=self)
+
 	def getSelectedPath(self) -> Optional[List[int]]:
 		_iter = self.treev.get_selection().get_selected()[1]
 		if _iter is None:
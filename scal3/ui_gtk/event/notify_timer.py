@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+from scal3 import logger
+log = logger.get()
+
+from time import time as now
+from typing import Optional, Iterator
+
+from scal3 import event_lib
+from scal3 import ui
+from scal3.event_notify import NotificationScheduler
+from scal3.ui_gtk import timeout_add, source_remove
+
+# GLib timeout is in milliseconds and must fit in 32-bit int
+maxTimeoutSec = 24 * 3600
+
+
+def setNotifyFuncs():
+	"""
+		sets notify method of notifier classes from their gtk modules
+		like event.setActionFuncs for groups
+	"""
+	for cls in event_lib.classes.notifier:
+		try:
+			module = __import__(
+				f"scal3.ui_gtk.event.notifier.{cls.name}",
+				fromlist=["notify"],
+			)
+		except Exception:
+			log.exception("")
+			continue
+		func = getattr(module, "notify", None)
+		if func is not None:
+			cls.notify = func
+
+
+class NotificationTimer:
+	"""
+		sleeps until the next due notification of NotificationScheduler,
+		instead of checking events periodically
+	"""
+
+	def __init__(self) -> None:
+		self.sourceId = None
+		self.rebuildIter = None  # type: Optional[Iterator[None]]
+		self.scheduler = NotificationScheduler(
+			ui.eventGroups,
+			onChange=self.onSchedulerChange,
+		)
+
+	def start(self) -> None:
+		"""
+			must be called after main window is shown, events are scanned
+			(for notifiers) step by step in main loop
+		"""
+		setNotifyFuncs()
+		# scheduler reads group.occur, so it's updated in main thread
+		ui.eventUpdateQueue.registerConsumer(self.scheduler)
+		self.rebuildIter = self.scheduler.iterRebuild()
+		timeout_add(0, self.rebuildStep)
+
+	def rebuildStep(self) -> bool:
+		try:
+			next(self.rebuildIter)
+		except StopIteration:
+			self.rebuildIter = None
+			self.reschedule()
+			return False
+		except Exception:
+			log.exception("")
+			self.rebuildIter = None
+			return False
+		return True  # for GLib.timeout_add, to be called again
+
+	def onSchedulerChange(self) -> None:
+		timeout_add(0, self.reschedule)
+
+	def reschedule(self) -> bool:
+		if self.sourceId is not None:
+			source_remove(self.sourceId)
+			self.sourceId = None
+		nextTime = self.scheduler.getNextTime()
+		if nextTime is None:
+			return False
+		delay = min(max(nextTime - now(), 0), maxTimeoutSec)
+		self.sourceId = timeout_add(int(delay * 1000) + 1, self.onTimeout)
+		return False
+
+	def onTimeout(self) -> bool:
+		self.sourceId = None
+		for gid, eid in self.scheduler.popDue():
+			try:
+				event = ui.eventGroups[gid][eid]
+			except Exception:
+				log.exception("")
+				continue
+			log.info(f"notifying event: {gid=}, {eid=}, {event.summary!r}")
+			event.notify(lambda: None)
+		self.reschedule()
+		return False
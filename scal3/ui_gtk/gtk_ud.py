@@ -26,7 +26,7 @@ log = logger.get()
 import time
 from os.path import join
 
-from typing import Callable
+from typing import Callable, List
 
 from scal3.path import *
 from scal3.json_utils import *
@@ -225,6 +225,11 @@ class IntegatedWindowList(BaseCalObj):
 		ui.cellCache.clearEventsData()
 		self.onDateChange()
 
+	def onEventUpdateBatch(self, records: "List[EventUpdateRecord]") -> None:
+		# redraw once for the whole batch
+		ui.cellCache.clearEventsData()
+		self.onDateChange()
+
 	def onConfigChange(self, *a, **ka):
 		ui.cellCache.clear()
 		settings.set_property(
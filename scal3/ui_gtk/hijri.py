@@ -24,6 +24,7 @@ log = logger.get()
 import os
 from os.path import isfile
 
+from scal3 import cal_types
 from scal3.cal_types import calTypes, jd_to, to_jd
 from scal3.cal_types import hijri
 
@@ -170,6 +171,7 @@ class EditDbDialog(gtk.Dialog):
 		if isfile(hijri.monthDb.userDbPath):
 			os.remove(hijri.monthDb.userDbPath)
 		hijri.monthDb.load()
+		cal_types.clearCache()
 		self.updateWidget()
 		return True
 
@@ -288,7 +290,9 @@ class EditDbDialog(gtk.Dialog):
 			hijri.monthDb.endJd += mLen
 
 		hijri.monthDb.expJd = hijri.monthDb.endJd
+		hijri.monthDb.updateIndex()
 		hijri.monthDb.save()
+		cal_types.clearCache()
 
 	def run(self):
 		hijri.monthDb.load()
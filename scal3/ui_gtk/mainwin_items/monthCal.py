@@ -35,6 +35,7 @@ from scal3.core import log
 from scal3.locale_man import rtl, rtlSgn
 from scal3.locale_man import tr as _
 from scal3 import ui
+from scal3 import instrument
 from scal3.monthcal import getCurrentMonthStatus
 
 from gi.repository import GdkPixbuf
@@ -268,6 +269,7 @@ class CalObj(gtk.DrawingArea, CalBase):
 		finally:
 			win.end_draw_frame(dctx)
 
+	@instrument.timed("MonthCal.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context", cursor: bool):
 		# gevent = gtk.get_current_event()
 		# FIXME: must enhance (only draw few cells, not all cells)
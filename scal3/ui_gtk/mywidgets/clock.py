@@ -24,6 +24,7 @@ from time import time as now
 
 from scal3.time_utils import clockWaitMilliseconds
 from scal3 import ui
+from scal3 import instrument
 
 from gi.repository import GdkPixbuf
 
@@ -147,6 +148,7 @@ class FClockWidget(gtk.DrawingArea): ## Time is in Local
 		finally:
 			win.end_draw_frame(dctx)
 
+	@instrument.timed("FClockWidget.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context"):
 		text = self.text
 		fillColor(cr, ui.bgColor)
@@ -19,6 +19,8 @@
 import time
 from time import time as now
 
+from scal3 import instrument
+
 from scal3.ui_gtk import *
 from scal3.ui_gtk.decorators import *
 from scal3.ui_gtk.drawing import *
@@ -128,6 +130,7 @@ class FloatingMsg(gtk.DrawingArea):
 		finally:
 			win.end_draw_frame(dctx)
 
+	@instrument.timed("FloatingMsg.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context"):
 		cr.rectangle(0, 0, screenWidth, self.height)
 		setColor(cr, self.bgColor)
@@ -197,6 +200,7 @@ class MyLabel(gtk.DrawingArea):
 		finally:
 			win.end_draw_frame(dctx)
 
+	@instrument.timed("MyLabel.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context"):
 		cr.rectangle(0, 0, self.width, self.height)
 		setColor(cr, self.bgColor)
@@ -26,6 +26,7 @@ import os
 from os.path import join
 
 from scal3.path import *
+from scal3 import cal_types
 from scal3.cal_types import calTypes
 from scal3 import core
 from scal3 import locale_man
@@ -1312,6 +1313,7 @@ class PreferencesWindow(gtk.Window):
 		######
 		ui.cellCache.clear()  # Very important
 		# ^ specially when calTypes.primary will be changed
+		cal_types.clearCache()
 		######
 		ud.updateFormatsBin()
 		# ###################### Saving Preferences #######################
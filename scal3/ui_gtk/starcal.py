@@ -85,6 +85,7 @@ from scal3.ui_gtk.customize import (
 from scal3.ui_gtk.layout import WinLayoutBox, WinLayoutObj
 from scal3.ui_gtk.layout_utils import moduleObjectInitializer
 from scal3.ui_gtk.event.utils import checkEventsReadOnly
+from scal3.ui_gtk.event.notify_timer import NotificationTimer
 from scal3.ui_gtk import hijri as hijri_gtk
 from scal3.ui_gtk.mainwin_items import mainWinItemsDesc
 
@@ -710,10 +711,6 @@ class MainWin(gtk.ApplicationWindow, ud.BaseCalObj):
 				core.allPlugList[core.plugIndex[j]].date_change_after(*date)
 			except AttributeError:
 				pass
-		# log.debug(
-		# 	f"Occurrence Time: max={ui.Cell.ocTimeMax:e}, " +
-		# 	f"avg={ui.Cell.ocTimeSum/ui.Cell.ocTimeCount:e}"
-		# )
 
 	def getEventAddToMenuItem(self) -> Optional[gtk.MenuItem]:
 		from scal3.ui_gtk.drawing import newColorCheckPixbuf
@@ -1662,6 +1659,8 @@ def main():
 	ui.init()
 	###############################
 	pixcache.cacheSaveStart()
+	# deliver event updates to widgets in main thread
+	ui.eventUpdateQueue.uiDispatch = lambda func: timeout_add(0, func)
 	ui.eventUpdateQueue.startLoop()
 	###############################
 	listener.dateChange.add(hijri_gtk.HijriMonthsExpirationListener())
@@ -1683,6 +1682,7 @@ def main():
 		mainWin.present()
 	if ui.showDesktopWidget:
 		mainWin.dayCalWinShow()
+	NotificationTimer().start()
 	# ud.rootWindow.set_cursor(gdk.Cursor.new(gdk.CursorType.LEFT_PTR))
 	# FIXME: ^
 	# mainWin.app.run(None)
@@ -27,6 +27,8 @@ from datetime import datetime, timedelta
 import math
 from math import pi
 
+import cairo
+
 from scal3.utils import iceil
 from scal3.time_utils import (
 	getUtcOffsetByJd,
@@ -40,11 +42,18 @@ from scal3.locale_man import tr as _
 from scal3.locale_man import rtl
 from scal3.locale_man import localTz
 from scal3 import ui
+from scal3 import instrument
 
 from scal3.timeline import tl
 from scal3.timeline.utils import *
+from scal3.timeline.box import boxCache, calcEventBoxes
 from scal3.timeline.funcs import (
-	calcTimeLineData,
+	calcTimeLineBgData,
+)
+from scal3.timeline.tiles import (
+	TileCache,
+	tileWidth,
+	getBoxesSignature,
 )
 
 from scal3.ui_gtk import *
@@ -134,6 +143,7 @@ class TimeLine(gtk.DrawingArea, ud.BaseCalObj):
 		self.connect("button-release-event", self.buttonRelease)
 		self.connect("key-press-event", self.onKeyPress)
 		# self.connect("event", show_event)
+		boxCache.onChange = lambda: timeout_add(0, self.onBoxCacheChange)
 		self.currentTime = now()
 		self.timeWidth = dayLen
 		self.timeStart = self.currentTime - self.timeWidth / 2.0
@@ -141,6 +151,7 @@ class TimeLine(gtk.DrawingArea, ud.BaseCalObj):
 		self.updateMovementButtons()
 		# zoom in and zoom out buttons FIXME
 		self.data = None
+		self.tileCache = TileCache()
 		########
 		self.movingLastPress = 0
 		self.movingV = 0
@@ -357,12 +368,22 @@ class TimeLine(gtk.DrawingArea, ud.BaseCalObj):
 		width = self.get_allocation().width
 		self.pixelPerSec = width / self.timeWidth  # pixel/second
 		self.borderTm = tl.boxEditBorderWidth / self.pixelPerSec  # second
-		self.data = calcTimeLineData(
+		# boxes are calculated for the time range of visible tiles
+		# so they do not change while panning inside a tile
+		tileRange = self.tileCache.getTileRange(
 			self.timeStart,
-			self.timeWidth,
+			self.timeStart + self.timeWidth,
 			self.pixelPerSec,
-			self.borderTm,
 		)
+		self.data = {
+			"tileRange": tileRange,
+			"boxes": calcEventBoxes(
+				self.tileCache.getTileStart(tileRange.start, self.pixelPerSec),
+				self.tileCache.getTileStart(tileRange.stop, self.pixelPerSec),
+				self.pixelPerSec,
+				self.borderTm,
+			),
+		}
 
 	def drawTick(self, cr, tick, maxTickHeight):
 		tickH = tick.height
@@ -438,33 +459,108 @@ class TimeLine(gtk.DrawingArea, ud.BaseCalObj):
 		)
 		cr.fill()
 
-	def drawAll(self, cr):
-		timeStart = self.timeStart
-		timeWidth = self.timeWidth
-		timeEnd = timeStart + timeWidth
-		####
-		width = self.get_allocation().width
+	def drawTile(self, cr, tileStart, boxes):
+		"""
+			draws background, holidays, ticks and boxes of the tile
+			that starts at tileStart, on its own surface
+		"""
 		height = self.get_allocation().height
 		pixelPerSec = self.pixelPerSec
 		dayPixel = dayLen * pixelPerSec  # pixel
 		maxTickHeight = tl.maxTickHeightRatio * height
 		#####
-		cr.rectangle(0, 0, width, height)
+		cr.rectangle(0, 0, tileWidth, height)
 		fillColor(cr, tl.bgColor)
 		#####
+		# labels of ticks near the edges are partly in this tile
+		padding = tl.maxLabelWidth  # pixel
+		padTm = padding / pixelPerSec
+		data = calcTimeLineBgData(
+			tileStart - padTm,
+			(tileWidth + 2 * padding) / pixelPerSec,
+			pixelPerSec,
+			viewTimeWidth=self.timeWidth,
+		)
+		cr.save()
+		cr.translate(-padding, 0)
 		setColor(cr, tl.holidayBgBolor)
-		for x in self.data["holidays"]:
+		for x in data["holidays"]:
 			cr.rectangle(x, 0, dayPixel, height)
 			cr.fill()
 		#####
-		for tick in self.data["ticks"]:
+		for tick in data["ticks"]:
 			self.drawTick(cr, tick, maxTickHeight)
+		cr.restore()
+		######
+		beforeBoxH = maxTickHeight  # FIXME
+		maxBoxH = height - beforeBoxH
+		for box in boxes:
+			box.setPixelValues(tileStart, pixelPerSec, beforeBoxH, maxBoxH)
+			self.drawBox(cr, box)
+
+	def renderTile(self, tileStart, boxes) -> "cairo.ImageSurface":
+		height = self.get_allocation().height
+		scale = self.get_scale_factor()
+		surface = cairo.ImageSurface(
+			cairo.FORMAT_RGB24,
+			tileWidth * scale,
+			height * scale,
+		)
+		surface.set_device_scale(scale, scale)
+		self.drawTile(cairo.Context(surface), tileStart, boxes)
+		return surface
+
+	def drawTiles(self, cr):
+		"""
+			draws tiles of visible time range, tiles are rendered only
+			when they are not cached or their boxes are changed
+		"""
+		height = self.get_allocation().height
+		pixelPerSec = self.pixelPerSec
+		tileRange = self.data["tileRange"]
+		boxes = self.data["boxes"]
+		# timeWidth affects ticks (like month names) of background
+		zoomKey = (pixelPerSec, self.timeWidth, height, self.get_scale_factor())
+		tileX = round(
+			(self.tileCache.getTileStart(tileRange.start, pixelPerSec) - self.timeStart)
+			* pixelPerSec
+		)
+		for index in tileRange:
+			tileStart = self.tileCache.getTileStart(index, pixelPerSec)
+			tileEnd = self.tileCache.getTileStart(index + 1, pixelPerSec)
+			tileBoxes = [
+				box for box in boxes
+				if box.t0 < tileEnd and box.t1 > tileStart
+			]
+			surface = self.tileCache.getTile(
+				zoomKey,
+				index,
+				getBoxesSignature(tileBoxes),
+				lambda: self.renderTile(tileStart, tileBoxes),
+			)
+			cr.set_source_surface(surface, tileX, 0)
+			cr.rectangle(tileX, 0, tileWidth, height)
+			cr.fill()
+			tileX += tileWidth
+
+	def drawAll(self, cr):
+		timeStart = self.timeStart
+		timeWidth = self.timeWidth
+		timeEnd = timeStart + timeWidth
+		####
+		width = self.get_allocation().width
+		height = self.get_allocation().height
+		pixelPerSec = self.pixelPerSec
+		maxTickHeight = tl.maxTickHeightRatio * height
+		#####
+		self.drawTiles(cr)
 		######
+		# pixel values of boxes in window, used by drawBoxEditingHelperLines
+		# and for finding the box under mouse pointer
 		beforeBoxH = maxTickHeight  # FIXME
 		maxBoxH = height - beforeBoxH
 		for box in self.data["boxes"]:
 			box.setPixelValues(timeStart, pixelPerSec, beforeBoxH, maxBoxH)
-			self.drawBox(cr, box)
 		self.drawBoxEditingHelperLines(cr)
 		# #### Show (possible) Daylight Saving change
 		if timeStart > 0 and 2 * 3600 < timeWidth < 30 * dayLen:
@@ -516,15 +612,14 @@ class TimeLine(gtk.DrawingArea, ud.BaseCalObj):
 		finally:
 			win.end_draw_frame(dctx)
 
+	@instrument.timed("TimeLine.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context"):
-		# t0 = now()
 		if not self.boxEditing:
-			self.updateData()
+			with instrument.timer("TimeLine.updateData"):
+				self.updateData()
 			self.currentTimeUpdate(restart=True, draw=False)
-		# t1 = now()
-		self.drawAll(cr)
-		# t2 = now()
-		# log.debug(f"drawing time / data calc time: {(t2-t1)/(t1-t0):.2f}")
+		with instrument.timer("TimeLine.drawAll"):
+			self.drawAll(cr)
 
 	def getLastScrollDir(self) -> "":
 		"""
@@ -695,14 +790,23 @@ class TimeLine(gtk.DrawingArea, ud.BaseCalObj):
 			event.afterModify()
 			event.save()
 			self.boxEditing = None
+			boxCache.clear()
+			ui.eventUpdateQueue.put("e", event, self)
 		if self.pressingButton is not None:
 			self.pressingButton.onRelease()
 			self.pressingButton = None
 		self.get_window().set_cursor(gdk.Cursor.new(gdk.CursorType.LEFT_PTR))
 		self.queue_draw()
 
+	def onBoxCacheChange(self) -> bool:
+		boxCache.clear()
+		self.queue_draw()
+		return False  # for GLib.timeout_add
+
 	def onConfigChange(self, *a, **kw):
 		ud.BaseCalObj.onConfigChange(self, *a, **kw)
+		boxCache.clear()
+		self.tileCache.clear()
 		self.queue_draw()
 
 	def onEditEventClick(self, menu, winTitle, event, gid):
@@ -32,6 +32,7 @@ from scal3.locale_man import getMonthName
 from scal3.season import getSpringJdAfter
 
 from scal3 import ui
+from scal3 import instrument
 
 from scal3.ui_gtk import *
 from scal3.ui_gtk.decorators import *
@@ -146,6 +147,7 @@ class YearWheel(gtk.DrawingArea, ud.BaseCalObj):
 		finally:
 			win.end_draw_frame(dctx)
 
+	@instrument.timed("YearWheel.drawWithContext")
 	def drawWithContext(self, cr: "cairo.Context"):
 		width = float(self.get_allocation().width)
 		height = float(self.get_allocation().height)
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 import unittest
+from scal3 import core
+from scal3 import plugin_man
+from scal3 import ui
 from scal3.ui import parseDroppedDate
 
 class TestParseDroppedDate(unittest.TestCase):
@@ -23,5 +26,43 @@ class TestParseDroppedDate(unittest.TestCase):
         self.case("13/2/2012", (2012, 2, 13))  # European
 
 
+class ExternalHolidayPlugin(plugin_man.BasePlugin):
+	"""
+		sets cell.holiday in updateCell, without hasHolidays
+	"""
+	def __init__(self):
+		plugin_man.BasePlugin.__init__(self, "external-holiday.json")
+		self.enable = True
+
+	def updateCell(self, c):
+		if c.jd % 10 == 3:
+			c.holiday = True
+
+
+class TestGetHolidaysJdList(unittest.TestCase):
+	def getHolidaysBaseline(self, startJd, endJd):
+		return [
+			jd for jd in range(startJd, endJd)
+			if ui.Cell(jd).holiday
+		]
+
+	def test_external(self):
+		startJd = core.getCurrentJd()
+		endJd = startJd + 100
+		self.assertEqual(
+			ui.getHolidaysJdList(startJd, endJd),
+			self.getHolidaysBaseline(startJd, endJd),
+		)
+		core.allPlugList.append(ExternalHolidayPlugin())
+		core.plugIndex.append(len(core.allPlugList) - 1)
+		try:
+			holidays = ui.getHolidaysJdList(startJd, endJd)
+			self.assertEqual(holidays, self.getHolidaysBaseline(startJd, endJd))
+			self.assertIn(startJd + (3 - startJd) % 10, holidays)
+		finally:
+			core.plugIndex.pop()
+			core.allPlugList.pop()
+
+
 if __name__ == "__main__":
 	unittest.main()
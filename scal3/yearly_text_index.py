@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Saeed Rasooli <saeed.gnu@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/agpl.txt>.
+
+from scal3 import logger
+log = logger.get()
+
+import os
+import mmap
+import struct
+from hashlib import sha1
+from os.path import join, split, splitext, abspath
+from typing import Optional, Dict, Tuple
+
+# Compiled index of data file of yearly text plugins
+#
+# <cacheDir>/plugins/<name>-<hash>.idx:
+# 	header, then (offset, size) of text of each (month, day) slot
+# 	(mdMonths * mdDays slots, size=0 for no text)
+# 	then sorted (key, offset, size) of texts of (year, month, day) dates
+# 	then utf-8 texts, one after another
+#
+# header contains mtime and size of data file, so index is re-compiled
+# when data file is changed
+
+indexVersion = 1
+indexMagic = b"SCYI"
+# magic, version, data file mtime_ns, data file size, ymd count
+headerStruct = struct.Struct("<4sIqqI")
+mdEntryStruct = struct.Struct("<II")  # offset, size
+ymdEntryStruct = struct.Struct("<qII")  # key, offset, size
+mdMonths = 13
+mdDays = 32
+
+
+def ymdKey(y: int, m: int, d: int) -> int:
+	return y * 512 + m * 32 + d
+
+
+def parseDataFile(fpath: str) -> "Tuple[Dict[Tuple[int, int], str], Dict[Tuple[int, int, int], str]]":
+	"""
+		parses a yearly text data file (.txt)
+		first line is ignored, other lines are "mm/dd\ttext" or "yyyy/mm/dd\ttext"
+		returns (mdTexts, ymdTexts)
+	"""
+	mdTexts = {}
+	ymdTexts = {}
+	with open(fpath, encoding="utf-8") as fp:
+		lines = fp.read().split("\n")
+	for line in lines[1:]:
+		line = line.strip()
+		if not line:
+			continue
+		if line[0] == "#":
+			continue
+		parts = line.split("\t")
+		if len(parts) < 2:
+			log.error(f"bad plugin data line: {line}")
+			continue
+		date = parts[0].split("/")
+		text = "\t".join(parts[1:])
+		if len(date) == 3:
+			ymdTexts[(int(date[0]), int(date[1]), int(date[2]))] = text
+		elif len(date) == 2:
+			m = int(date[0])
+			d = int(date[1])
+			if not (0 < m <= mdMonths and 0 < d <= mdDays):
+				log.error(f"bad date in plugin data line: {line}")
+				continue
+			mdTexts[(m, d)] = text
+		else:
+			raise IOError(f"Bad line in data file {fpath}:\n{line}")
+	return mdTexts, ymdTexts
+
+
+def compileIndex(
+	mdTexts: "Dict[Tuple[int, int], str]",
+	ymdTexts: "Dict[Tuple[int, int, int], str]",
+	mtime: int = 0,
+	size: int = 0,
+) -> bytes:
+	blob = bytearray()
+
+	def addText(text: str) -> "Tuple[int, int]":
+		data = text.encode("utf-8")
+		offset = len(blob)
+		blob.extend(data)
+		return offset, len(data)
+
+	mdTable = bytearray(mdEntryStruct.size * mdMonths * mdDays)
+	for (m, d), text in sorted(mdTexts.items()):
+		mdEntryStruct.pack_into(
+			mdTable,
+			mdEntryStruct.size * ((m - 1) * mdDays + d - 1),
+			*addText(text),
+		)
+	ymdTable = bytearray()
+	for key, text in sorted(
+		(ymdKey(*date), text) for date, text in ymdTexts.items()
+	):
+		ymdTable += ymdEntryStruct.pack(key, *addText(text))
+	header = headerStruct.pack(
+		indexMagic,
+		indexVersion,
+		mtime,
+		size,
+		len(ymdTexts),
+	)
+	return header + bytes(mdTable) + bytes(ymdTable) + bytes(blob)
+
+
+def getIndexPath(cacheDir: str, dataFile: str) -> str:
+	fileHash = sha1(abspath(dataFile).encode("utf-8")).hexdigest()[:16]
+	fname = splitext(split(dataFile)[1])[0]
+	return join(cacheDir, f"{fname}-{fileHash}.idx")
+
+
+def mapIndexFile(fpath: str) -> "Optional[mmap.mmap]":
+	try:
+		with open(fpath, "rb") as fp:
+			return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+	except FileNotFoundError:
+		return None
+	except (OSError, ValueError):
+		log.exception(f"error mapping yearly text index {fpath}")
+		return None
+
+
+class YearlyTextIndex:
+	"""
+		read-only view of compiled index, `data` is bytes or mmap
+		getMonthDayText and getDateText do not load anything else
+		from data
+	"""
+
+	def __init__(self, data: "bytes | mmap.mmap") -> None:
+		if len(data) < headerStruct.size:
+			raise ValueError("yearly text index is too short")
+		magic, version, mtime, size, ymdCount = headerStruct.unpack_from(data, 0)
+		if magic != indexMagic:
+			raise ValueError("invalid yearly text index")
+		if version != indexVersion:
+			raise ValueError(f"unsupported yearly text index version {version}")
+		self.data = data
+		self.mtime = mtime
+		self.size = size
+		self.ymdCount = ymdCount
+		self.mdOffset = headerStruct.size
+		self.ymdOffset = self.mdOffset + mdEntryStruct.size * mdMonths * mdDays
+		self.blobOffset = self.ymdOffset + ymdEntryStruct.size * ymdCount
+		if len(data) < self.blobOffset:
+			raise ValueError("yearly text index is truncated")
+
+	def getText(self, offset: int, size: int) -> str:
+		if size == 0:
+			return ""
+		start = self.blobOffset + offset
+		return self.data[start:start + size].decode("utf-8")
+
+	def getMonthDayText(self, month: int, day: int) -> str:
+		if not (0 < month <= mdMonths and 0 < day <= mdDays):
+			return ""
+		return self.getText(*mdEntryStruct.unpack_from(
+			self.data,
+			self.mdOffset + mdEntryStruct.size * ((month - 1) * mdDays + day - 1),
+		))
+
+	def getDateText(self, year: int, month: int, day: int) -> str:
+		key = ymdKey(year, month, day)
+		data = self.data
+		entrySize = ymdEntryStruct.size
+		base = self.ymdOffset
+		low = 0
+		high = self.ymdCount
+		while low < high:
+			mid = (low + high) // 2
+			midKey, offset, size = ymdEntryStruct.unpack_from(
+				data,
+				base + entrySize * mid,
+			)
+			if midKey < key:
+				low = mid + 1
+			elif midKey > key:
+				high = mid
+			else:
+				return self.getText(offset, size)
+		return ""
+
+	def close(self) -> None:
+		if isinstance(self.data, mmap.mmap):
+			self.data.close()
+
+
+def loadIndex(cacheDir: str, dataFile: str) -> "YearlyTextIndex":
+	"""
+		memory-maps the compiled index of dataFile, compiles it
+		(and writes it in cacheDir) if it's missing or outdated
+		if writing fails, compiled index is kept in memory
+	"""
+	st = os.stat(dataFile)
+	indexPath = getIndexPath(cacheDir, dataFile)
+	data = mapIndexFile(indexPath)
+	if data is not None:
+		try:
+			index = YearlyTextIndex(data)
+		except ValueError as e:
+			log.info(f"re-compiling yearly text index {indexPath}: {e}")
+			data.close()
+		else:
+			if index.mtime == st.st_mtime_ns and index.size == st.st_size:
+				return index
+			index.close()
+	mdTexts, ymdTexts = parseDataFile(dataFile)
+	compiled = compileIndex(mdTexts, ymdTexts, st.st_mtime_ns, st.st_size)
+	tmpPath = indexPath + ".tmp"
+	try:
+		os.makedirs(cacheDir, exist_ok=True)
+		with open(tmpPath, "wb") as fp:
+			fp.write(compiled)
+		os.replace(tmpPath, indexPath)
+	except Exception:
+		log.exception(f"error saving yearly text index {indexPath}")
+		return YearlyTextIndex(compiled)
+	data = mapIndexFile(indexPath)
+	if data is None:
+		return YearlyTextIndex(compiled)
+	return YearlyTextIndex(data)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import unittest
+
+import os
+import sys
+import tempfile
+from os.path import dirname, abspath, join
+
+rootDir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, rootDir)
+
+from scal3.yearly_text_index import (
+	YearlyTextIndex,
+	compileIndex,
+	loadIndex,
+	parseDataFile,
+)
+
+
+class TestYearlyTextIndex(unittest.TestCase):
+	def test_compileIndex(self):
+		index = YearlyTextIndex(compileIndex(
+			{
+				(1, 1): "first",
+				(12, 31): "last",
+				(13, 5): "سلام",
+			},
+			{
+				(2000, 1, 1): "y2k",
+				(-10, 12, 31): "negative",
+				(1400, 1, 1): "a\tb",
+			},
+		))
+		self.assertEqual(index.getMonthDayText(1, 1), "first")
+		self.assertEqual(index.getMonthDayText(12, 31), "last")
+		self.assertEqual(index.getMonthDayText(13, 5), "سلام")
+		self.assertEqual(index.getMonthDayText(1, 2), "")
+		self.assertEqual(index.getMonthDayText(14, 1), "")
+		self.assertEqual(index.getDateText(2000, 1, 1), "y2k")
+		self.assertEqual(index.getDateText(-10, 12, 31), "negative")
+		self.assertEqual(index.getDateText(1400, 1, 1), "a\tb")
+		self.assertEqual(index.getDateText(2001, 1, 1), "")
+		with self.assertRaises(ValueError):
+			YearlyTextIndex(b"SCYX" + bytes(100))
+
+	def test_loadIndex(self):
+		with tempfile.TemporaryDirectory() as tmpDir:
+			dataFile = join(tmpDir, "data.txt")
+			cacheDir = join(tmpDir, "cache")
+			with open(dataFile, "w", encoding="utf-8") as fp:
+				fp.write("ignored line\n# comment\n01/02\tmd text\n1399/12/30\tymd\n")
+			self.assertEqual(
+				parseDataFile(dataFile),
+				({(1, 2): "md text"}, {(1399, 12, 30): "ymd"}),
+			)
+			index = loadIndex(cacheDir, dataFile)
+			self.assertEqual(index.getMonthDayText(1, 2), "md text")
+			self.assertEqual(index.getDateText(1399, 12, 30), "ymd")
+			self.assertEqual(len(os.listdir(cacheDir)), 1)
+			index.close()
+			# index file is re-compiled after data file is changed
+			with open(dataFile, "w", encoding="utf-8") as fp:
+				fp.write("ignored line\n01/02\tchanged text\n")
+			index = loadIndex(cacheDir, dataFile)
+			self.assertEqual(index.getMonthDayText(1, 2), "changed text")
+			self.assertEqual(index.getDateText(1399, 12, 30), "")
+			index.close()
+
+
+if __name__ == "__main__":
+	unittest.main()